@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Compares subprocess based copies with obr.core.fsops
+
+Converts the folders and linked fields of a decomposed case with many processor
+folders into copies, see link_folder_to_copy and modifies_file.
+
+Usage: python benchmarks/fsops.py [number of processor folders]
+"""
+import os
+import sys
+import shutil
+import tempfile
+
+from pathlib import Path
+from subprocess import check_output
+from time import perf_counter
+
+from obr.core.core import link_folder_to_copy, modifies_file
+
+FIELDS = ["U", "p", "k", "epsilon", "nut", "alphat"]
+MESH = ["points", "faces", "owner", "neighbour", "boundary"]
+
+
+def create_case(root: Path, num_procs: int) -> Path:
+    """Create a decomposed case like _link_path does for a child case, ie. with
+    copied processor folders, linked constant folders and linked files"""
+    parent = root / "parent"
+    case = root / "case"
+    payload = "0 " * 16 * 1024
+    for i in range(num_procs):
+        (parent / f"processor{i}/constant/polyMesh").mkdir(parents=True)
+        for fn in MESH:
+            (parent / f"processor{i}/constant/polyMesh" / fn).write_text(payload)
+        proc = case / f"processor{i}"
+        (proc / "0").mkdir(parents=True)
+        for fn in FIELDS:
+            (proc / "0" / fn).write_text(payload)
+        (proc / "constant").symlink_to(parent / f"processor{i}/constant")
+    for fold in ["system", "constant"]:
+        (parent / fold).mkdir()
+        (case / fold).mkdir()
+        for fn in ["controlDict", "fvSolution", "fvSchemes"]:
+            (parent / fold / fn).write_text(payload)
+            (case / fold / fn).symlink_to(parent / fold / fn)
+    return case
+
+
+def legacy_link_folder_to_copy(source: Path) -> Path:
+    """The former implementation spawning a process per file and folder"""
+    source_bck = str(source.absolute()) + ".bck"
+    check_output(["mv", source, source_bck])
+    check_output(["mkdir", source])
+    src_root, folder, files = next(os.walk(source_bck))
+    for fn in files:
+        check_output(["cp", Path(src_root) / fn, source / fn])
+    for fold in folder:
+        check_output(["cp", "-r", Path(src_root) / fold, source / fold])
+    return Path(source_bck)
+
+
+def legacy_modifies_file(fns: list[Path]):
+    """The former implementation of modifies_file spawning two processes per
+    file"""
+    for fn in fns:
+        if fn.is_symlink():
+            src = fn.resolve()
+            check_output(["rm", fn])
+            check_output(["cp", "-r", src, fn])
+
+
+def linked_fields(case: Path) -> list[Path]:
+    """Link the fields of all processor folders and return the links"""
+    links = []
+    for proc in case.glob("processor*"):
+        fields = proc / "0"
+        target = proc.parent / f"{proc.name}.orig"
+        fields.rename(target)
+        fields.mkdir()
+        for fn in FIELDS:
+            (fields / fn).symlink_to(target / fn)
+            links.append(fields / fn)
+    return links
+
+
+def run(func, setup, num_procs: int) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        args = setup(create_case(Path(tmp), num_procs))
+        start = perf_counter()
+        func(args)
+        elapsed = perf_counter() - start
+        shutil.rmtree(tmp, ignore_errors=True)
+    return elapsed
+
+
+def main(num_procs: int):
+    scenarios = [
+        (
+            "link_folder_to_copy",
+            lambda case: case,
+            legacy_link_folder_to_copy,
+            link_folder_to_copy,
+        ),
+        ("modifies_file", linked_fields, legacy_modifies_file, modifies_file),
+    ]
+    print(f"{num_procs} processor folders")
+    print(f"{'helper':24} {'subprocess [s]':>14} {'fsops [s]':>10} {'speedup':>8}")
+    for name, setup, legacy, new in scenarios:
+        t_legacy = run(legacy, setup, num_procs)
+        t_new = run(new, setup, num_procs)
+        print(f"{name:24} {t_legacy:14.3f} {t_new:10.3f} {t_legacy / t_new:8.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 512)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Compares the legacy query walk with the compiled QueryMatcher
+
+Usage: python benchmarks/query_engine.py [number of jobs]
+"""
+import sys
+import random
+
+from copy import deepcopy
+from time import perf_counter
+
+from obr.core.queries import (
+    build_filter_query,
+    query_flat_jobs,
+    query_flat_jobs_legacy,
+)
+
+
+def synthetic_job(i: int, depth: int = 3) -> dict:
+    """Create a merged statepoint and job document resembling an OBR job"""
+    parent: dict = {}
+    for level in range(depth):
+        parent = {
+            "keys": ["solver", "preconditioner"],
+            "operation": "fvSolution",
+            "solver": random.choice(["PCG", "PBiCGStab", "GKOCG"]),
+            "preconditioner": random.choice(["none", "IC", "DIC"]),
+            "maxIter": random.choice([1000, 3000, 5000]),
+            "parent": deepcopy(parent),
+        }
+    return {
+        "state": {
+            "global": random.choice(["completed", "failure", "incomplete"]),
+            "latestTime": random.random(),
+            "CourantNumber": random.random(),
+        },
+        "history": [
+            {"cmd": cmd, "state": "success", "timestamp": "2024-01-01_00:00:00"}
+            for cmd in ["blockMesh", "decomposePar", "pisoFoam"] * 5
+        ],
+        "cache": {
+            "md5sum": {f"system/file{j}": [f"{i}{j}", 0.0] for j in range(20)},
+        },
+        "data": [],
+        **parent,
+    }
+
+
+def timed(func, *args):
+    start = perf_counter()
+    ret = func(*args)
+    return perf_counter() - start, ret
+
+
+def main(num_jobs: int):
+    random.seed(42)
+    jobs = {f"{i:032x}": synthetic_job(i) for i in range(num_jobs)}
+    filters = [
+        ["global==completed"],
+        ["maxIter>=3000", "preconditioner==IC"],
+        ["latestTime", "CourantNumber<0.5"],
+    ]
+
+    print(f"{'queries':40} {'legacy [s]':>12} {'compiled [s]':>12} {'speedup':>8}")
+    for filt in filters:
+        queries = build_filter_query(filt)
+        t_legacy, legacy = timed(
+            query_flat_jobs_legacy, jobs, queries, False, True, False
+        )
+        t_compiled, compiled = timed(query_flat_jobs, jobs, queries, False, True, False)
+        if [(r.id, r.result) for r in legacy] != [(r.id, r.result) for r in compiled]:
+            raise AssertionError(f"Results differ for {filt}")
+        print(
+            f"{' '.join(filt):40} {t_legacy:12.3f} {t_compiled:12.3f}"
+            f" {t_legacy / t_compiled:8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -1,12 +1,22 @@
 #!/usr/bin/env python3
 
 from ..core.core import modifies_file
-from typing import TYPE_CHECKING, Any, Optional
-from subprocess import check_output
-import sys
+from ..core.hashing import md5sum
+from collections import Counter
+from typing import TYPE_CHECKING, Any, Optional, Union
+import os
+import re
+import shutil
 from pathlib import Path
 
 
+COMMENT_REGEX = re.compile(r"//[^\n]*|/\*.*?\*/", re.S)
+# hex (0 1 2 3 4 5 6 7) zone (20 20 1) simpleGrading (1 1 1)
+BLOCK_REGEX = re.compile(
+    r"hex\s*\([\d\s]+\)\s*(?:\w+\s*)?(\(\s*(\d+)\s+(\d+)\s+(\d+)\s*\))"
+)
+CELLS_REGEX = re.compile(r"\(\s*(\d+)\s+(\d+)\s+(\d+)\s*\)")
+
 if TYPE_CHECKING:
 
     class OpenFOAMCase:
@@ -14,64 +24,181 @@ if TYPE_CHECKING:
         controlDict: Any
         system_folder: Any
         _exec_operation: Any
+        job: Any
 
     _Base = OpenFOAMCase
 else:
     _Base = object
 
 
-def calculate_simple_partition(nSubDomains, decomp):
+def prime_factors(n: int) -> list[int]:
+    """Returns the prime factors of n in ascending order"""
+    factors = []
+    while n % 2 == 0 and n > 1:
+        factors.append(2)
+        n //= 2
+    factor = 3
+    # only factors up to sqrt(n) need to be tested
+    while factor * factor <= n:
+        while n % factor == 0:
+            factors.append(factor)
+            n //= factor
+        factor += 2
+    if n > 1:
+        factors.append(n)
+    return factors
+
+
+def divisors(n: int) -> list[int]:
+    """Returns all divisors of n in ascending order"""
+    ret = [1]
+    for factor, multiplicity in Counter(prime_factors(n)).items():
+        ret = [d * factor**k for d in ret for k in range(multiplicity + 1)]
+    return sorted(ret)
+
+
+def calculate_simple_partition(
+    nSubDomains: int, cells: Optional[tuple[int, int, int]] = None
+) -> list[int]:
     """Calculates a simple domain decomposition based on nSubDomains
 
+    The decomposition (nx, ny, nz) with the smallest inter-processor surface
+    of a mesh with the given number of cells per direction is chosen, ie. the
+    number of faces between subdomains. Directions are not split into more
+    subdomains than cells, thus 2D meshes are only split in plane. Without
+    cells a cube is assumed, which yields the most balanced decomposition.
+
     Returns:
     --------
-        number of subdomains
+        number of subdomains per direction
     """
+    cx, cy, cz = cells if cells else (1, 1, 1)
 
-    def next_position(x):
-        if x[0] == x[1]:
-            return 0
-        if x[1] == x[2]:
-            return 1
-        return 2
-
-    def isPrime(n):
-        for i in range(2, n):
-            if n % i == 0:
-                return False, i  # i at this iteration is equal to the smallest factor
-        return True, n
-
-    i = next_position(decomp)
-    is_prime, factor = isPrime(nSubDomains)
-
-    if is_prime:
-        decomp[i] *= factor
-        return decomp
-    if nSubDomains > 0:
-        decomp[i] *= factor
-        return calculate_simple_partition(int(nSubDomains / factor), decomp)
-    else:
-        return decomp
-
-
-def sed(fn, in_reg_exp, out_reg_exp, inline=True):
-    """wrapper around sed"""
-    if sys.platform == "darwin":
-        ret = check_output(
-            ["sed", "-i", "", "s/" + in_reg_exp + "/" + out_reg_exp + "/g", fn]
-        )
-    else:
-        ret = check_output(
-            ["sed", "-i", "s/" + in_reg_exp + "/" + out_reg_exp + "/g", fn]
+    def surface(decomp: tuple[int, int, int]) -> int:
+        nx, ny, nz = decomp
+        return (nx - 1) * cy * cz + (ny - 1) * cx * cz + (nz - 1) * cx * cy
+
+    candidates = [
+        (nx, ny, nSubDomains // nx // ny)
+        for nx in divisors(nSubDomains)
+        for ny in divisors(nSubDomains // nx)
+    ]
+    if cells:
+        feasible = [c for c in candidates if c[0] <= cx and c[1] <= cy and c[2] <= cz]
+        candidates = feasible or candidates
+    # on ties prefer splitting the first directions
+    return list(min(candidates, key=lambda c: (surface(c), [-n for n in c])))
+
+
+class BlockMeshDict:
+    """In memory editor of the blocks of a blockMeshDict
+
+    All modifications are applied to the content in memory, write replaces
+    the file atomically.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.text = self.path.read_text()
+
+    def _block_cells(self) -> tuple[list[re.Match], int]:
+        """Returns the matches of all blocks with numeric cell counts and the
+        number of blocks in total"""
+        # blank out comments, which keeps the offsets of the remaining text
+        masked = COMMENT_REGEX.sub(lambda m: " " * len(m.group()), self.text)
+        match = re.search(r"\bblocks\s*\(", masked)
+        if not match:
+            return [], 0
+        # the blocks section ends at the matching parenthesis
+        depth, end = 1, match.end()
+        while depth and end < len(masked):
+            depth += {"(": 1, ")": -1}.get(masked[end], 0)
+            end += 1
+        section = masked[match.end() : end]
+        return (
+            list(BLOCK_REGEX.finditer(masked, match.end(), end)),
+            len(re.findall(r"\bhex\b", section)),
         )
 
+    @property
+    def blocks(self) -> list[tuple[int, int, int]]:
+        """Number of cells per direction of all blocks, blocks with cell counts
+        given by macros are skipped"""
+        return [
+            (int(m.group(2)), int(m.group(3)), int(m.group(4)))
+            for m in self._block_cells()[0]
+        ]
+
+    @property
+    def n_cells(self) -> Optional[int]:
+        """Total number of cells or None if not all cell counts are numeric"""
+        matches, total = self._block_cells()
+        if not total or len(matches) != total:
+            return None
+        return sum(nx * ny * nz for nx, ny, nz in self.blocks)
+
+    def set_cells(self, old_cells: str, new_cells: str) -> int:
+        """Replace old_cells by new_cells, eg. (20 20 1) by (40 40 1)
+
+        If both are cell counts only the cell counts of blocks are replaced,
+        otherwise all occurrences of old_cells in the file.
+
+        Returns: the number of replacements
+        """
+        old, new = CELLS_REGEX.fullmatch(old_cells), CELLS_REGEX.fullmatch(new_cells)
+        if not old or not new:
+            count = self.text.count(old_cells)
+            self.text = self.text.replace(old_cells, new_cells)
+            return count
+        new_text, pos, count = [], 0, 0
+        for match in self._block_cells()[0]:
+            if match.groups()[1:] != old.groups():
+                continue
+            new_text.append(self.text[pos : match.start(1)])
+            new_text.append(f"({' '.join(new.groups())})")
+            pos = match.end(1)
+            count += 1
+        self.text = "".join(new_text) + self.text[pos:]
+        return count
+
+    def write(self) -> None:
+        """Write the content atomically, via a temporary file"""
+        tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}")
+        tmp.write_text(self.text)
+        shutil.copymode(self.path, tmp)
+        os.replace(tmp, self.path)
+
+
+def read_blocks(blockMeshDict: Union[str, Path]) -> list[tuple[int, int, int]]:
+    """Returns the number of cells per direction of all blocks of a
+    blockMeshDict, blocks with cell counts given by macros are skipped"""
+    return BlockMeshDict(blockMeshDict).blocks
+
+
+def mesh_shape(blocks: list[tuple[int, int, int]]) -> Optional[tuple[int, int, int]]:
+    """Returns the number of cells per direction of a mesh
+
+    For meshes with several blocks the shape is estimated by the largest
+    number of cells per direction of any block, since the arrangement of the
+    blocks is not considered.
+    """
+    if not blocks:
+        return None
+    return (
+        max(b[0] for b in blocks),
+        max(b[1] for b in blocks),
+        max(b[2] for b in blocks),
+    )
+
 
 def set_cells(blockMeshDict, old_cells, new_cells):
-    """ """
-    sed(blockMeshDict, old_cells, new_cells)
+    """Replace old_cells by new_cells in the blockMeshDict, see
+    BlockMeshDict.set_cells"""
+    editor = BlockMeshDict(blockMeshDict)
+    editor.set_cells(old_cells, new_cells)
+    editor.write()
 
 
-# TODO use FileParse as a base for modifying the blockMeshDict
 class BlockMesh(_Base):
     """A mixin class to add block mesh functionalities and wrapper"""
 
@@ -99,11 +226,19 @@ class BlockMesh(_Base):
             self.constant_folder / "polyMesh" / "neighbour",
         ]
 
+    @property
+    def mesh_shape(self) -> Optional[tuple[int, int, int]]:
+        """Number of cells per direction as defined by the blockMeshDict"""
+        fn = self.blockMeshDict
+        if not fn:
+            return None
+        return mesh_shape(read_blocks(fn))
+
     def blockMeshDictmd5sum(self) -> Optional[str]:
         fn = self.blockMeshDict
         if not fn:
             return None
-        return check_output(["md5sum", str(fn)], text=True)
+        return md5sum(fn)
 
     def refineMesh(self, args: dict):
         """ """
@@ -114,19 +249,24 @@ class BlockMesh(_Base):
             self.controlDict.set({"deltaT": deltaT / 2.0})
         self._exec_operation(["refineMesh", "-overwrite"])
 
-    def modifyBlockMesh(self, args: dict):
+    def modifyBlockMesh(self, args: dict) -> Optional[int]:
+        """Apply the modifyBlock rules, ie. old_cells->new_cells, to the
+        blockMeshDict
+
+        Returns: the resulting number of cells if known
+        """
         modifies_file(self.blockMeshDict)
         blocks = args["modifyBlock"]
         if isinstance(blocks, str):
             blocks = [blocks]
 
+        # all modifications are applied in memory and written at once
+        editor = BlockMeshDict(self.blockMeshDict)
         for block in blocks:
             orig_block, target_block = block.split("->")
-            set_cells(
-                self.blockMeshDict,
-                orig_block,
-                target_block,
-            )
+            editor.set_cells(orig_block, target_block)
+        editor.write()
+        return editor.n_cells
 
     def blockMesh(self, args: dict = {}):
         # TODO replace this with writes_file and clean polyMesh folder
@@ -138,6 +278,10 @@ class BlockMesh(_Base):
         if args.get("modifyBlock"):
             self.modifyBlockMesh(args)
         self._exec_operation(["blockMesh"])
+        if self.blockMeshDict and (
+            n_cells := BlockMeshDict(self.blockMeshDict).n_cells
+        ):
+            self.job.doc["cache"]["nCells"] = n_cells
 
     def checkMesh(self, args: dict = {}):
         # TODO replace this with writes_file and clean polyMesh folder
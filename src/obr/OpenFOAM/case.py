@@ -1,11 +1,12 @@
 #!/usr/bin/env python3
 import os
-import re
 import logging
+import threading
 
-from typing import Union, Generator, Tuple, Any
+from typing import Union, Generator, Tuple, Any, Literal, Optional
+from collections import OrderedDict
+from functools import cached_property
 from pathlib import Path
-from subprocess import check_output
 from signac.job import Job
 from datetime import datetime
 from Owls.parser.FoamDict import FileParser
@@ -20,20 +21,23 @@ from ..core.core import (
     DelinkFolder,
     find_time_folder,
 )
+from ..core.hashing import MD5_CACHE, fingerprint, md5sum, md5sums
+from ..core.parse_cache import PARSE_CACHE
 from .BlockMesh import BlockMesh, calculate_simple_partition
+from .failure import Failure, classify_failure
+from .header import has_openfoam_header
+from .solver_log import LogState, follow_log
 
 logger = logging.getLogger("OBR")
 
-OF_HEADER_REGEX = r"""(/\*--------------------------------\*- C\+\+ -\*----------------------------------\*\\
-(\||)\s*=========                 \|(\s*\||)
-(\||)\s*\\\\      /  F ield         \| (OpenFOAM:|foam-extend:)\s*[\d\w\W]*\s*(\||)
-(\||)\s*\\\\    /   O peration     \| (Version:|Website:)\s*[\d\w\W]*\s*(\||)
-(\||)\s*\\\\  /    A nd           \| (Web:|Version:|Website)\s*[\d\w\W]*\s*(\||)
-(\||)\s*\\\\/     M anipulation  \|(\s*\||)
-\\\*---------------------------------------------------------------------------\*/)"""
-
 
 class File(FileParser):
+    # File instances shared by all cases of a process, see File.shared
+    shared_files: "OrderedDict[tuple[str, str], File]" = OrderedDict()
+    max_shared_files = 4096
+    # cases of different jobs might be processed by concurrent threads
+    shared_lock = threading.Lock()
+
     def __init__(self, **kwargs):
         # forwards all unused arguments
         self._file = kwargs["file"]
@@ -47,29 +51,64 @@ class File(FileParser):
         super().__init__(**kwargs, skip_update=True)
         self._md5sum = None
 
+    @classmethod
+    def shared(cls, folder: Union[str, Path], file: str, job: Job) -> "File":
+        """Returns a File instance which is shared within the process
+
+        Missing files are not shared since they might be created later on
+        """
+        key = (str(Path(folder) / file), getattr(job, "id", ""))
+        with cls.shared_lock:
+            if (ret := cls.shared_files.get(key)) is not None:
+                cls.shared_files.move_to_end(key)
+                return ret
+        ret = cls(folder=folder, file=file, job=job)
+        if not getattr(ret, "missing", False):
+            with cls.shared_lock:
+                cls.shared_files[key] = ret
+                if len(cls.shared_files) > cls.max_shared_files:
+                    cls.shared_files.popitem(last=False)
+        return ret
+
+    def parsed(self) -> FileParser:
+        """Returns a parser holding the current content of the file
+
+        The parser is taken from the process wide PARSE_CACHE, hence it is
+        shared by all files with the same real path, eg. symlinked files of
+        child cases, and only re-parsed if the file changed.
+        """
+
+        def parse(real_path: str) -> FileParser:
+            parser = FileParser(path=Path(real_path), skip_update=True)
+            parser.update()
+            return parser
+
+        return PARSE_CACHE.get(self.path, parse)
+
     def get(self, name: str):
         """Get a value from an OpenFOAM dictionary file"""
         # TODO replace with a safer option
         # also consider moving that to Owls
-        self.update()
+        value = self.parsed().get(name)
         try:
-            return eval(super().get(name))
+            return eval(value)
         except:
-            return super().get(name)
+            return value
 
     def md5sum(self, refresh=False) -> str:
         """Compute a files md5sum"""
         if not self.path.exists():
             raise FileNotFoundError(self.path)
         if not self._md5sum or refresh:
-            self._md5sum = check_output(["md5sum", str(self.path)], text=True)
+            if refresh:
+                MD5_CACHE.invalidate(self.path)
+            self._md5sum = md5sum(self.path)
         return self._md5sum
 
     def is_modified(self) -> bool:
         if not self._md5sum:
             return False
-        current_md5sum = check_output(["md5sum", str(self.path)], text=True)
-        return self._md5sum != current_md5sum
+        return self._md5sum != md5sum(self.path)
 
     # @decorator_modifies_file
     def set(self, args: dict):
@@ -85,14 +124,15 @@ class File(FileParser):
         if self.job:
             logged_func(
                 self.set_key_value_pairs,
-                # FIXME add job.doc reference
-                self.job.doc,
+                self.job,
                 dictionary=args_copy,
             )
         else:
             self.set_key_value_pairs(args_copy)
 
         self.update()
+        # the mtime might not change if the file is modified quickly
+        PARSE_CACHE.invalidate(self.path)
         self.md5sum(refresh=True)
 
 
@@ -104,31 +144,42 @@ class OpenFOAMCase(BlockMesh):
     def __init__(self, path, job):
         self.path_ = Path(path)
         self.job: Job = job
+        # NOTE files are discovered and parsed on first access only, see
+        # config_file_tree and File.shared
+        self.file_dict: dict[str, File] = dict()
 
-        # Non-optional files system folder files
-        self.controlDict = File(folder=self.system_folder, file="controlDict", job=job)
-        self.fvSolution = File(folder=self.system_folder, file="fvSolution", job=job)
-        self.fvSchemes = File(folder=self.system_folder, file="fvSchemes", job=job)
+    def _file(self, folder: Path, file: str) -> File:
+        return File.shared(folder=folder, file=file, job=self.job)
 
-        self.transportProperties = File(
-            folder=self.constant_folder, file="transportProperties", job=job
-        )
+    # Non-optional files system folder files
+    @cached_property
+    def controlDict(self) -> File:
+        return self._file(self.system_folder, "controlDict")
 
-        # optional but commonly used files
-        self.decomposeParDict = False
-        if Path(self.system_folder / "decomposeParDict").exists():
-            self.decomposeParDict = File(
-                folder=self.system_folder, file="decomposeParDict", job=job
-            )
+    @cached_property
+    def fvSolution(self) -> File:
+        return self._file(self.system_folder, "fvSolution")
 
-        self.turbulenceProperties = False
-        if Path(self.constant_folder / "turbulenceProperties").exists():
-            self.turbulenceProperties = File(
-                folder=self.constant_folder, file="turbulenceProperties", job=job
-            )
+    @cached_property
+    def fvSchemes(self) -> File:
+        return self._file(self.system_folder, "fvSchemes")
 
-        self.file_dict: dict[str, File] = dict()
-        self.config_file_tree
+    @cached_property
+    def transportProperties(self) -> File:
+        return self._file(self.constant_folder, "transportProperties")
+
+    # optional but commonly used files
+    @cached_property
+    def decomposeParDict(self) -> Union[File, Literal[False]]:
+        if not Path(self.system_folder / "decomposeParDict").exists():
+            return False
+        return self._file(self.system_folder, "decomposeParDict")
+
+    @cached_property
+    def turbulenceProperties(self) -> Union[File, Literal[False]]:
+        if not Path(self.constant_folder / "turbulenceProperties").exists():
+            return False
+        return self._file(self.constant_folder, "turbulenceProperties")
 
     @property
     def path(self) -> Path:
@@ -195,14 +246,13 @@ class OpenFOAMCase(BlockMesh):
                 if f_path.is_file() and not f_path.is_symlink():
                     if self.has_openfoam_header(f_path):
                         rel_path = str(f_path.relative_to(self.path))
-                        file_obj = File(folder=folder, file=f_path.name, job=self.job)
+                        file_obj = self._file(folder, f_path.name)
                         yield file_obj, rel_path
 
     @property
     def current_time(self) -> float:
         """Returns the current timestep of the simulation"""
-        self.fetch_latest_log()
-        return self.latest_log.latestTime.time
+        return self.latest_log_state.latestTime
 
     @property
     def progress(self) -> float:
@@ -224,11 +274,32 @@ class OpenFOAMCase(BlockMesh):
         self.latest_log_handle_ = LogFile(log, matcher=[])
         return self.latest_log_handle_
 
+    @property
+    def latest_log_state(self) -> LogState:
+        """Returns the parsed state of the latest log
+
+        The log is parsed incrementally, the state of the previous call is
+        stored in the job document cache and only appended bytes are parsed.
+        """
+        log = self.latest_solver_log_path
+        if not log or not log.exists():
+            raise ValueError("No Logfile found")
+        key = path_to_key(log.name)
+        cached = self.job.doc.get("cache", {}).get("logs", {}).get(key)
+        previous = LogState.from_dict(dict(cached)) if cached else None
+        state = follow_log(log, previous)
+        if not previous or previous.offset != state.offset:
+            if "cache" not in self.job.doc:
+                self.job.doc["cache"] = {}
+            # only the state of the latest log is kept
+            self.job.doc["cache"]["logs"] = {key: state.to_dict()}
+        return state
+
     @property
     def finished(self) -> bool:
         """check if the latest simulation run has finished gracefully"""
         if self.process_latest_time_stats():
-            return self.latest_log.footer.completed
+            return self.latest_log_state.completed
         return False
 
     @property
@@ -267,18 +338,15 @@ class OpenFOAMCase(BlockMesh):
         return list(self.file_dict.keys())
 
     def get(self, key: str) -> Union[File, None]:
+        if key not in self.file_dict:
+            self.config_file_tree
         return self.file_dict.get(key, None)
 
     def has_openfoam_header(self, path: Path) -> bool:
-        with path.open() as f:
-            try:
-                header = "".join(f.readlines()[:7])
-                return re.match(OF_HEADER_REGEX, header) is not None
-            except UnicodeDecodeError:
-                return False
+        return has_openfoam_header(path)
 
     def _exec_operation(self, operation) -> Path:
-        return logged_execute(operation, self.path, self.job.doc)
+        return logged_execute(operation, self.path, self.job)
 
     @property
     def esi_version(self) -> bool:
@@ -328,9 +396,7 @@ class OpenFOAMCase(BlockMesh):
                 fh.write("".join(self.controlDict.of_comment_header))
                 fh.write("".join(self.controlDict.of_header))
                 fh.write("\n")
-            self.decomposeParDict = File(
-                folder=self.system_folder, file="decomposeParDict", job=self.job
-            )
+            self.decomposeParDict = self._file(self.system_folder, "decomposeParDict")
 
         method = args["method"]
         numberSubDomains = int(args.get("numberOfSubdomains", 0))
@@ -341,7 +407,9 @@ class OpenFOAMCase(BlockMesh):
             else:
                 coeffs = args.get("coeffs", None)
                 if not coeffs:
-                    coeffs = calculate_simple_partition(numberSubDomains, [1, 1, 1])
+                    coeffs = calculate_simple_partition(
+                        numberSubDomains, self.mesh_shape
+                    )
 
             self.decomposeParDict.set({
                 "method": method,
@@ -378,6 +446,7 @@ class OpenFOAMCase(BlockMesh):
             folder=self.path_ / path.parents[0], file=path.parts[-1], job=self.job
         )
         file_handle.set_key_value_pairs(args)
+        PARSE_CACHE.invalidate(file_handle.path)
 
     def run(self, args: dict):
         solver = self.controlDict.get("application")
@@ -389,12 +458,14 @@ class OpenFOAMCase(BlockMesh):
         """
         if "md5sum" not in self.job.doc["cache"]:
             return False  # no md5sum has been calculated for this file
-        current_md5sum, last_modified = self.job.doc["cache"]["md5sum"].get(file)
+        entry = self.job.doc["cache"]["md5sum"].get(path_to_key(file))
+        if not entry:
+            return False
+        current_md5sum, last_modified = entry[0], entry[1]
         if os.path.getmtime(self.path / file) == last_modified:
             # if modification dates dont differ, the md5sums wont, either
             return False
-        md5sum = check_output(["md5sum", file], text=True)
-        return current_md5sum != md5sum
+        return current_md5sum != md5sum(self.path / file)
 
     def is_tree_modified(self) -> list[str]:
         """Iterates all files inside the case tree and returns a list of files that
@@ -406,56 +477,58 @@ class OpenFOAMCase(BlockMesh):
                 m_files.append(file)
         return m_files
 
-    def process_latest_time_stats(self) -> bool:
+    def process_latest_time_stats(
+        self, failures: Optional[dict[Path, Optional[Failure]]] = None
+    ) -> bool:
         """This function parses the latest time step log and stores the results in
         the job document.
 
+        Parameters:
+        failures -- failures of logs classified beforehand, see
+            obr.OpenFOAM.failure.classify_failures
+
         Return: A boolean indication whether processing was successful
         """
-        if not self.latest_log:
+        try:
+            log_state = self.latest_log_state
+        except ValueError:
             return False
 
-        # TODO eventually this should be part of OWLS
+        state = self.job.doc["state"]
         # Check for failure states
-        if "There are not enough slots available" in self.latest_log.footer.content:
-            self.job.doc["state"]["global"] = "failure"
-            self.job.doc["state"]["failureState"] = "MPI startup error"
-            # No reason for further parsing
+        log = self.latest_log_path_
+        if failures is not None and log in failures:
+            failure = failures[log]
+        else:
+            failure = classify_failure(log)
+        if failure:
+            state["global"] = "failure"
+            # failureState is kept a string for filters like
+            # failureState=="FOAM ERROR"
+            state["failureState"] = failure.type
+            state["failureDetails"] = failure.to_dict()
             return False
 
-        if "ERROR" in self.latest_log.footer.content:
-            self.job.doc["state"]["global"] = "failure"
-            self.job.doc["state"]["failureState"] = "FOAM ERROR"
-
-        if "error" in self.latest_log.footer.content:
-            self.job.doc["state"]["global"] = "failure"
-
-        try:
-            self.job.doc["state"]["global"] = "incomplete"
-            self.job.doc["state"]["latestTime"] = self.latest_log.latestTime.time
-            self.job.doc["state"][
-                "continuityErrors"
-            ] = self.latest_log.latestTime.continuity_errors
-            self.job.doc["state"][
-                "CourantNumber"
-            ] = self.latest_log.latestTime.Courant_number
-            self.job.doc["state"]["ExecutionTime"] = (
-                self.latest_log.latestTime.execution_time["ExecutionTime"]
-            )
-            self.job.doc["state"]["ClockTime"] = (
-                self.latest_log.latestTime.execution_time["ClockTime"]
-            )
-            if self.latest_log.footer.completed:
-                self.job.doc["state"]["global"] = "completed"
-            return True
-        except Exception:
-            # if parsing of log file fails, check failure handler
-            self.job.doc["state"]["global"] = "failure"
+        # if no time step could be parsed the solver failed during startup
+        if log_state.latestTime is None:
+            state["global"] = "failure"
             return False
 
-    def detailed_update(self):
+        state.update({
+            "global": "completed" if log_state.completed else "incomplete",
+            "latestTime": log_state.latestTime,
+            "continuityErrors": log_state.continuityErrors,
+            "CourantNumber": log_state.CourantNumber,
+            "ExecutionTime": log_state.ExecutionTime,
+            "ClockTime": log_state.ClockTime,
+        })
+        return True
+
+    def detailed_update(
+        self, failures: Optional[dict[Path, Optional[Failure]]] = None
+    ) -> None:
         """Perform a detailed update on the job doc state"""
-        self.process_latest_time_stats()
+        self.process_latest_time_stats(failures)
 
     def remove_solver_logs(self):
         """Search for solver logs and deletes them"""
@@ -466,19 +539,28 @@ class OpenFOAMCase(BlockMesh):
         """
         calculates md5sums for all case files. Primarily called from `dispatch_post_hooks`
         """
+        cache = self.job.doc["cache"]
+        stored = cache["md5sum"]() if "md5sum" in cache else {}
+        updated = dict(stored)
+        stale = {}
         for case_path in self.config_file_tree:
             case_file = Path(self.job.path) / "case" / case_path
-            md5sum = check_output(["md5sum", case_file], text=True)
-            if "md5sum" not in self.job.doc["cache"]:
-                self.job.doc["cache"]["md5sum"] = dict()
-            signac_friendly_path = path_to_key(
-                str(case_path)
-            )  # signac does not allow . inside paths or job.doc keys
+            # signac does not allow . inside paths or job.doc keys
+            signac_friendly_path = path_to_key(str(case_path))
+            current = list(fingerprint(case_file))
+            entry = stored.get(signac_friendly_path)
+            # NOTE entries store md5sum, mtime and size, mtime_ns, inode
+            if not entry or entry[2:] != current:
+                stale[case_file] = (signac_friendly_path, current)
+
+        for case_file, md5 in md5sums(stale).items():
+            signac_friendly_path, current = stale[case_file]
             last_modified = os.path.getmtime(case_file)
-            self.job.doc["cache"]["md5sum"][signac_friendly_path] = (
-                md5sum.split()[0],
-                last_modified,
-            )
+            updated[signac_friendly_path] = [md5, last_modified, *current]
+
+        # write the job document only once and only if something changed
+        if updated != stored:
+            self.job.doc["cache"]["md5sum"] = updated
 
     def was_successful(self) -> bool:
         """Returns True, if both its label and the last OBR operation returned successful, False otherwise."""
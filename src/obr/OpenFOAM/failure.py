@@ -0,0 +1,130 @@
+"""Classification of failed solver runs from the tail of their logs
+
+Logs are memory mapped and only a bounded window at the end of the log,
+starting after the last completed time step, is scanned with precompiled
+patterns. Thus the logs of many runs can be triaged concurrently without
+reading them into memory.
+"""
+
+import os
+import re
+import mmap
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+PathLike = Union[str, Path]
+
+TAIL_WINDOW = 256 * 2**10
+EXCERPT_LINES = 5
+MAX_EXCERPT_SIZE = 1024
+COUNT_CHUNK_SIZE = 16 * 2**20
+
+# patterns in order of precedence
+FAILURE_PATTERNS = [
+    ("MPI startup error", re.compile(rb"There are not enough slots available")),
+    ("FOAM ERROR", re.compile(rb"ERROR")),
+    # the banner reports trapping, ie. "trapFpe: Floating point exception
+    # trapping enabled" or "sigFpe : Enabling floating point exception
+    # trapping", hence only crash output and stack traces are matched
+    (
+        "floating point exception",
+        re.compile(rb"Floating point exception(?! trapping)|sigFpe::sigHandler"),
+    ),
+    ("segmentation fault", re.compile(rb"Segmentation fault|sigSegv::sigHandler")),
+    ("MPI abort", re.compile(rb"MPI_ABORT was invoked|mpirun noticed that process")),
+    ("error", re.compile(rb"^(?!time step continuity errors).*error", re.M)),
+]
+
+
+@dataclass
+class Failure:
+    """A failure found in a log
+
+    Parameters:
+    type -- the kind of failure, see FAILURE_PATTERNS
+    line -- line number of the first match, starting at 1
+    excerpt -- the matching line and the following lines
+    """
+
+    type: str
+    line: int
+    excerpt: str
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def _scan_start(mm: mmap.mmap, window: int) -> int:
+    """Returns the start of the window, ie. the begin of the line following
+    the last ExecutionTime line within the last window bytes"""
+    start = max(0, len(mm) - window)
+    last_step = mm.rfind(b"\nExecutionTime = ", start)
+    if last_step == -1:
+        return start
+    end_of_line = mm.find(b"\n", last_step + 1)
+    return len(mm) if end_of_line == -1 else end_of_line + 1
+
+
+def _line_number(mm: mmap.mmap, pos: int) -> int:
+    """Count the lines before pos in bounded chunks"""
+    lines = 1
+    for chunk_start in range(0, pos, COUNT_CHUNK_SIZE):
+        lines += mm[chunk_start : min(chunk_start + COUNT_CHUNK_SIZE, pos)].count(b"\n")
+    return lines
+
+
+def _excerpt(mm: mmap.mmap, pos: int) -> str:
+    start = mm.rfind(b"\n", 0, pos) + 1
+    end = start
+    for _ in range(EXCERPT_LINES):
+        end = mm.find(b"\n", end + 1)
+        if end == -1:
+            end = len(mm)
+            break
+    end = min(end, start + MAX_EXCERPT_SIZE)
+    return mm[start:end].decode("utf-8", errors="replace").strip()
+
+
+def classify_failure(path: PathLike, window: int = TAIL_WINDOW) -> Optional[Failure]:
+    """Scan the tail of a log for known failure patterns
+
+    Returns: the failure with the highest precedence or None
+    """
+    if os.path.getsize(path) == 0:
+        return None
+    with open(path, "rb") as fh:
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start = _scan_start(mm, window)
+            for failure_type, pattern in FAILURE_PATTERNS:
+                if match := pattern.search(mm, start):
+                    return Failure(
+                        failure_type,
+                        _line_number(mm, match.start()),
+                        _excerpt(mm, match.start()),
+                    )
+    return None
+
+
+def classify_failures(
+    paths: Iterable[PathLike],
+    window: int = TAIL_WINDOW,
+    max_workers: Optional[int] = None,
+) -> dict[PathLike, Optional[Failure]]:
+    """Classify the failures of many logs concurrently
+
+    A process pool is used since scanning memory mapped files holds the GIL
+    """
+    paths = list(paths)
+    if len(paths) < 2:
+        return {path: classify_failure(path, window) for path in paths}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        failures = executor.map(
+            classify_failure,
+            paths,
+            [window] * len(paths),
+            chunksize=max(1, len(paths) // (4 * (os.cpu_count() or 1))),
+        )
+        return dict(zip(paths, failures))
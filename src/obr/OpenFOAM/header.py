@@ -0,0 +1,47 @@
+"""Detection of OpenFOAM dictionary files by their header"""
+
+import re
+
+from functools import lru_cache
+from pathlib import Path
+from typing import Union
+
+OF_HEADER_REGEX = r"""(/\*--------------------------------\*- C\+\+ -\*----------------------------------\*\\
+(\||)\s*=========                 \|(\s*\||)
+(\||)\s*\\\\      /  F ield         \| (OpenFOAM:|foam-extend:)\s*[\d\w\W]*\s*(\||)
+(\||)\s*\\\\    /   O peration     \| (Version:|Website:)\s*[\d\w\W]*\s*(\||)
+(\||)\s*\\\\  /    A nd           \| (Web:|Version:|Website)\s*[\d\w\W]*\s*(\||)
+(\||)\s*\\\\/     M anipulation  \|(\s*\||)
+\\\*---------------------------------------------------------------------------\*/)"""
+
+# the header is expected within the first lines, thus only a bounded prefix of
+# a file is read, even for large tabulated data or mesh files
+HEADER_LINES = 7
+HEADER_PREFIX_SIZE = 8192
+BINARY_SUFFIXES = {".gz", ".bz2", ".xz", ".zip", ".tar", ".npy", ".npz", ".png"}
+
+
+def has_openfoam_header(path: Union[str, Path]) -> bool:
+    """Checks whether a file starts with an OpenFOAM header
+
+    The result is cached per path, mtime and size of the file
+    """
+    path = Path(path)
+    if path.suffix in BINARY_SUFFIXES:
+        return False
+    stat = path.stat()
+    return _has_openfoam_header(str(path), stat.st_mtime_ns, stat.st_size)
+
+
+@lru_cache(maxsize=8192)
+def _has_openfoam_header(path: str, mtime_ns: int, size: int) -> bool:
+    with open(path, "rb") as fh:
+        prefix = fh.read(HEADER_PREFIX_SIZE)
+    if b"\0" in prefix:
+        # binary file
+        return False
+    try:
+        lines = [line.decode("utf-8") for line in prefix.splitlines()[:HEADER_LINES]]
+    except UnicodeDecodeError:
+        return False
+    return re.match(OF_HEADER_REGEX, "\n".join(lines) + "\n") is not None
@@ -0,0 +1,155 @@
+"""Incremental parsing of OpenFOAM solver logs
+
+The state of a parsed log, ie. the byte offset up to which the log has been
+read and the values of the latest time step, is serializable and stored in
+the job document cache. Subsequent calls only parse newly appended bytes.
+The footer is not stored, instead its offset is stored and the footer is
+read from the log again.
+"""
+
+import os
+import hashlib
+
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Optional, Union
+
+READ_CHUNK_SIZE = 16 * 2**20
+# only the tail of the footer is kept to bound the size of the state
+MAX_FOOTER_SIZE = 64 * 2**10
+ANCHOR_SIZE = 256
+
+
+@dataclass
+class LogState:
+    """Parsed state of a solver log
+
+    The footer holds the lines after the last completed time step, ie. after
+    the last ExecutionTime line, which start at footer_offset.
+    """
+
+    offset: int = 0
+    inode: int = 0
+    # md5sum of the bytes before offset to detect replaced logs
+    anchor: str = ""
+    latestTime: Optional[float] = None
+    CourantNumber: dict = field(default_factory=dict)
+    continuityErrors: dict = field(default_factory=dict)
+    ExecutionTime: Optional[float] = None
+    ClockTime: Optional[float] = None
+    footer_offset: int = 0
+    footer: str = ""
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "LogState":
+        return cls(**{
+            k: v
+            for k, v in state.items()
+            if k in cls.__dataclass_fields__ and k != "footer"
+        })
+
+    def to_dict(self) -> dict:
+        """Returns the state without the footer, see follow_log"""
+        ret = asdict(self)
+        del ret["footer"]
+        return ret
+
+    @property
+    def completed(self) -> bool:
+        """A run is completed if the solver printed End after the last time step"""
+        return any(line.strip() == "End" for line in self.footer.splitlines())
+
+    def parse_line(self, line: str) -> None:
+        if line.startswith("ExecutionTime = "):
+            # ExecutionTime = 0.05 s  ClockTime = 0 s
+            parts = line.split()
+            self.ExecutionTime = float(parts[2])
+            self.ClockTime = float(parts[6])
+            self.footer = ""
+            return
+        self.footer += line + "\n"
+        if line.startswith("Time = "):
+            self.latestTime = float(line[7:].strip().rstrip("s"))
+        elif line.startswith("Courant Number mean: "):
+            # Courant Number mean: 0.222158 max: 0.852134
+            parts = line.split()
+            self.CourantNumber = {
+                "CourantNumber_mean": float(parts[3]),
+                "CourantNumber_max": float(parts[5]),
+            }
+        elif line.startswith("time step continuity errors : "):
+            # time step continuity errors : sum local = 8.8e-09, global = 5.1e-19,
+            # cumulative = 8.7e-19
+            values = [v.split("=")[1] for v in line.split(":", 1)[1].split(",")]
+            self.continuityErrors = {
+                "timeStepContErrors_sumLocal": float(values[0]),
+                "timeStepContErrors_global": float(values[1]),
+                "timeStepContErrors_cumulative": float(values[2]),
+            }
+
+
+def follow_log(path: Union[str, Path], state: Optional[LogState] = None) -> LogState:
+    """Parse the bytes appended to the log at path since state was created
+
+    If the log was replaced or truncated it is parsed from the start. Only
+    complete lines are parsed, a partially written last line is parsed by the
+    next call.
+    """
+    stat = os.stat(path)
+    if not state or state.inode != stat.st_ino or state.offset > stat.st_size:
+        state = LogState(inode=stat.st_ino)
+
+    with open(path, "rb") as fh:
+        fh.seek(max(0, state.offset - ANCHOR_SIZE))
+        tail = fh.read(min(state.offset, ANCHOR_SIZE))
+        if state.offset and _anchor(tail) != state.anchor:
+            # the log was overwritten in place
+            state = LogState(inode=stat.st_ino)
+            tail = b""
+            fh.seek(0)
+        if state.footer_offset < state.offset and not state.footer:
+            # the state was restored by from_dict
+            _read_footer(fh, state)
+        if state.offset == stat.st_size:
+            return state
+
+        rest = b""
+        while chunk := fh.read(READ_CHUNK_SIZE):
+            data = rest + chunk
+            end = data.rfind(b"\n") + 1
+            rest = data[end:]
+            for line in data[:end].decode("utf-8", errors="replace").splitlines():
+                try:
+                    state.parse_line(line)
+                except (ValueError, IndexError):
+                    # eg. truncated output of a crashing solver, lines other
+                    # than ExecutionTime are already part of the footer
+                    if line.startswith("ExecutionTime = "):
+                        state.footer += line + "\n"
+            line_start = data.rfind(b"\nExecutionTime = ", 0, end) + 1
+            if line_start or data.startswith(b"ExecutionTime = "):
+                state.footer_offset = state.offset + data.index(b"\n", line_start) + 1
+            state.offset += end
+            tail = (tail + data[:end])[-ANCHOR_SIZE:]
+            if len(state.footer) > MAX_FOOTER_SIZE:
+                state.footer = state.footer[-MAX_FOOTER_SIZE:]
+    state.anchor = _anchor(tail)
+    return state
+
+
+def _read_footer(fh, state: LogState) -> None:
+    """Read the footer of state from the log, the position of fh is kept"""
+    position = fh.tell()
+    start = max(state.footer_offset, state.offset - MAX_FOOTER_SIZE)
+    fh.seek(start)
+    data = fh.read(state.offset - start)
+    if start != state.footer_offset:
+        # drop the partial first line
+        data = data[data.find(b"\n") + 1 :]
+    lines = data.decode("utf-8", errors="replace").splitlines()
+    state.footer = "".join(line + "\n" for line in lines)
+    fh.seek(position)
+
+
+def _anchor(data: bytes) -> str:
+    return hashlib.md5(data, usedforsecurity=False).hexdigest()
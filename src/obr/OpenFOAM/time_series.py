@@ -0,0 +1,134 @@
+"""Extraction of per time step histories from OpenFOAM solver logs
+
+A solver log is streamed once and the residuals, Courant numbers, continuity
+errors and execution and clock times of every completed time step are stored
+as columns of a compressed NumPy archive next to the log, ie.
+icoFoam_<timestamp>.log -> icoFoam_<timestamp>.npz. Subsequent reads load the
+archive instead of tokenizing the log again.
+"""
+
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from pathlib import Path
+from typing import Union
+
+from ..core.log_catalog import is_solver_log
+from .solver_log import LogState
+
+PathLike = Union[str, Path]
+
+SERIES_SUFFIX = ".npz"
+
+# smoothSolver:  Solving for Ux, Initial residual = 1, Final residual = 8.9e-06,
+# No Iterations 19
+RESIDUAL_REGEX = re.compile(
+    r"^\w+:\s+Solving for (\w+), Initial residual = ([^,]+), "
+    r"Final residual = ([^,]+), No Iterations (\d+)"
+)
+
+
+def series_path(log: PathLike) -> Path:
+    """Returns the path of the time series archive of a log"""
+    return Path(log).with_suffix(SERIES_SUFFIX)
+
+
+def parse_time_series(log: PathLike) -> dict[str, np.ndarray]:
+    """Stream a solver log and return a column per quantity and a row per
+    completed time step
+
+    For fields solved several times per time step, eg. p in PISO loops, the
+    initial residual of the first solve, the final residual of the last solve
+    and the sum of the iterations are kept. Missing values are NaN.
+    """
+    state = LogState()
+    residuals: dict[str, float] = {}
+    rows: list[dict[str, float]] = []
+    with open(log, "rb") as fh:
+        for raw_line in fh:
+            line = raw_line.decode("utf-8", errors="replace").rstrip("\n")
+            if match := RESIDUAL_REGEX.match(line):
+                field, initial, final, iterations = match.groups()
+                try:
+                    residuals.setdefault(f"{field}_initialResidual", float(initial))
+                    residuals[f"{field}_finalResidual"] = float(final)
+                    residuals[f"{field}_iterations"] = residuals.get(
+                        f"{field}_iterations", 0
+                    ) + int(iterations)
+                except ValueError:
+                    pass
+                continue
+            try:
+                state.parse_line(line)
+            except (ValueError, IndexError):
+                continue
+            finally:
+                # the footer is not needed and would grow for logs without
+                # completed time steps
+                state.footer = ""
+            if line.startswith("ExecutionTime = "):
+                rows.append({
+                    "Time": state.latestTime,
+                    **state.CourantNumber,
+                    **state.continuityErrors,
+                    **residuals,
+                    "ExecutionTime": state.ExecutionTime,
+                    "ClockTime": state.ClockTime,
+                })
+                residuals = {}
+
+    columns: dict[str, None] = {}
+    for row in rows:
+        columns.update(dict.fromkeys(row))
+    return {
+        column: np.array([row.get(column, np.nan) for row in rows], dtype=np.float64)
+        for column in columns
+    }
+
+
+def extract_time_series(log: PathLike, force: bool = False) -> Path:
+    """Write the time series of a log to its archive
+
+    The log is only parsed if the archive is missing or older than the log.
+
+    Returns: path to the archive
+    """
+    target = series_path(log)
+    if (
+        not force
+        and target.exists()
+        and target.stat().st_mtime_ns >= Path(log).stat().st_mtime_ns
+    ):
+        return target
+    series = parse_time_series(log)
+    # write to a temporary file first such that readers never see a partial
+    # archive, np.savez appends the suffix if it is missing
+    tmp = target.with_name(f".{target.stem}.tmp{SERIES_SUFFIX}")
+    np.savez_compressed(tmp, **series)
+    os.replace(tmp, target)
+    return target
+
+
+def load_time_series(path: PathLike) -> pd.DataFrame:
+    """Load the archive at path, or of the log at path, into a DataFrame"""
+    with np.load(series_path(path)) as archive:
+        return pd.DataFrame({column: archive[column] for column in archive.files})
+
+
+def find_time_series(case_path: PathLike) -> list[Path]:
+    """Returns the time series archives of all solver logs of a case, oldest first
+
+    Since log names end with a timestamp the lexicographic order is the order
+    of the runs.
+    """
+    if not os.path.isdir(case_path):
+        return []
+    return sorted(
+        Path(case_path) / fn
+        for fn in os.listdir(case_path)
+        if fn.endswith(SERIES_SUFFIX)
+        and is_solver_log(fn[: -len(SERIES_SUFFIX)] + ".log")
+    )
@@ -22,10 +22,11 @@ import sys
 import logging
 import shutil
 import functools
+import hashlib
+import json
 
 from signac.job import Job
 from pathlib import Path
-from subprocess import check_output
 
 from git.repo import Repo
 from git.util import Actor
@@ -33,12 +34,20 @@ from git import InvalidGitRepositoryError
 from datetime import datetime
 from typing import Union, Optional, Any
 
-from .signac_wrapper.operations import OpenFOAMProject, needs_initialization
+from .signac_wrapper.operations import (
+    OpenFOAMProject,
+    ELIGIBILITY,
+    initialize_cases,
+    execute_shell_operations,
+    validate_states,
+)
 from .signac_wrapper.submit import submit_impl
-from .create_tree import create_tree
+from .create_tree import create_tree, plan_tree
 from .core.parse_yaml import read_yaml
 from .cli_impl import query_impl
-from .core.core import map_view_folder_to_job_id, profile_call
+from .core import fsops
+from .core.history import archived_document
+from .core.core import map_view_folder_to_job_id, profile_call, timed
 from .core.logger_setup import logger, setup_logging
 
 
@@ -89,15 +98,13 @@ def check_cli_operations(
     return True
 
 
-def is_valid_workspace(filters: list = []) -> bool:
+def is_valid_workspace(jobs: list[Job], filters: list = []) -> bool:
     """This function checks if:
     - the `workspace` folder is not empty, and
     - applying filters would return an empty list
     """
-    project: OpenFOAMProject = OpenFOAMProject.get_project()
-    jobs: list[Job] = project.filter_jobs(filters=filters)
     if len(jobs) == 0:
-        if filters == []:
+        if not filters:
             logger.warning("No jobs found in workspace folder!")
             return False
         logger.warning(
@@ -113,19 +120,24 @@ def cli_cmd_setup(kwargs: dict) -> tuple[OpenFOAMProject, Job]:
         os.chdir(kwargs["folder"])
         # ensure .obr exists
         Path(".obr").mkdir(parents=True, exist_ok=True)
-    setup_logging()
-    project = OpenFOAMProject.get_project()
-    filters: list[str] = kwargs.get("filter", [])
+    setup_logging(debug=kwargs.get("debug", False))
+    timings: dict[str, float] = {}
+    with timed("project setup", timings):
+        project = OpenFOAMProject.get_project()
+    filters: list[str] = list(kwargs.get("filter", []))
     if len(filters) > 0 and kwargs.get("job"):
         raise AssertionError("Filters and job flags are mutually exclusive")
 
-    if sel := kwargs.get("job"):
-        jobs = [job for job in project if sel == job.id]
-    else:
-        jobs = project.filter_jobs(filters=filters)
+    # NOTE all jobs, statepoints and labels are taken from a single snapshot
+    # of the workspace which is shared by all commands
+    snapshot = project.snapshot
+    snapshot.timings.update(timings)
+    jobs = snapshot.select(filters, kwargs.get("job"))
+    project.filtered_jobs = jobs
+    snapshot.log_timings()
 
     # check if given path points to valid project
-    if not is_valid_workspace(filters):
+    if not is_valid_workspace(jobs, filters):
         logger.warning("Workspace is not valid! Exiting.")
         sys.exit(1)
     return project, jobs
@@ -142,11 +154,22 @@ def copy_to_archive(
     logger.debug(f"cp \\\n\t{src_file}\n\t{target_file.resolve()}")
     if src_file.is_symlink():
         src_file = Path(os.path.realpath(src_file))
-    check_output(["cp", src_file, target_file])
+    fsops.copy_file(src_file, target_file)
     if use_git_repo and repo:
         repo.git.add(target_file)  # NOTE do _not_ do repo.git.add(all=True)
 
 
+def write_to_archive(
+    repo: Union[Repo, None], use_git_repo: bool, content: bytes, target_file: Path
+) -> None:
+    """Writes content to a file in the archive repo"""
+    target_file.parent.mkdir(parents=True, exist_ok=True)
+    logger.debug(f"write {target_file.resolve()}")
+    target_file.write_bytes(content)
+    if use_git_repo and repo:
+        repo.git.add(target_file)
+
+
 @click.group()
 @click.version_option()
 @click.option("--debug/--no-debug", default=False)
@@ -269,7 +292,12 @@ def submit(ctx: click.Context, **kwargs):
 )
 @click.option("-j", "--job")
 @click.option("--args", default="")
-@click.option("-t", "--tasks", default=-1)
+@click.option(
+    "-t",
+    "--tasks",
+    default=-1,
+    help="Number of tasks to run concurrently, eg. jobs executing shell steps.",
+)
 @click.option("-a", "--aggregate", is_flag=True)
 @click.option("--args", default="")
 @click.pass_context
@@ -312,19 +340,40 @@ def run(ctx: click.Context, **kwargs):
 
     if not kwargs.get("aggregate"):
 
-        GLOBAL_UNINIT_COUNT = 0
-        for job in jobs:
-            if job.sp().get("operation") in operations and needs_initialization(job):
-                GLOBAL_UNINIT_COUNT += 1
-        os.environ["GLOBAL_UNINIT_COUNT"] = str(GLOBAL_UNINIT_COUNT)
-
-        profile_call(
-            project.run,
-            names=operations,
-            jobs=jobs,
-            progress=True,
-            np=kwargs.get("tasks", -1),
-        )
+        # NOTE cases are initialized in an explicit phase before each run, since
+        # running operations can make further cases ready for initialization
+        # this is repeated until no case can be initialized anymore
+        ntasks = kwargs.get("tasks", -1)
+        operation_names = project.operation_names(operations)
+        max_workers = ntasks if ntasks > 0 else None
+        ELIGIBILITY.initialize = False
+        # ids of jobs whose shell operation was executed concurrently, these
+        # are not passed to flow, which would run failed ones again
+        executed: set[str] = set()
+        try:
+            initialize_cases(jobs, operation_names, max_workers)
+            while True:
+                # shell steps of many jobs are executed concurrently before
+                # the remaining operations are dispatched by flow
+                if "shell" in operation_names:
+                    executed.update(
+                        job.id
+                        for job in execute_shell_operations(
+                            [job for job in jobs if job.id not in executed],
+                            max_workers,
+                        )
+                    )
+                profile_call(
+                    project.run,
+                    names=operations,
+                    jobs=[job for job in jobs if job.id not in executed],
+                    progress=True,
+                    np=ntasks,
+                )
+                if not initialize_cases(jobs, operation_names, max_workers):
+                    break
+        finally:
+            ELIGIBILITY.initialize = True
     else:
         # calling for aggregates does not work with jobs
         profile_call(project.run, names=operations, np=kwargs.get("tasks", -1))
@@ -344,9 +393,37 @@ def run(ctx: click.Context, **kwargs):
     help="Number of tasks to run concurrently for generate call.",
 )
 @click.option("-u", "--url", default=None, help="Url to a configuration yaml")
+@click.option(
+    "--prune",
+    is_flag=True,
+    help=(
+        "Remove jobs of the variation tree of the base case which are no longer"
+        " part of the configuration and have not been run."
+    ),
+)
+@click.option(
+    "--force",
+    is_flag=True,
+    help="Together with --prune also remove jobs which have been run.",
+)
+@click.option(
+    "--plan",
+    is_flag=True,
+    help=(
+        "Expand the variation tree in memory and report the number of jobs, the"
+        " expected disk usage and cost without creating the workspace."
+    ),
+)
 @click.pass_context
 def init(ctx: click.Context, **kwargs):
 
+    if kwargs.get("plan"):
+        # nothing is written, hence only log to the console
+        setup_logging(log_to_file=False)
+        config = yaml.safe_load(read_yaml(kwargs).replace("\n\n", "\n"))
+        logger.info(plan_tree(config).report())
+        return
+
     # needs folder/.obr to exists before logger can be initialised
     ws_fold = kwargs.get("folder")
     if ws_fold:
@@ -375,7 +452,12 @@ def init(ctx: click.Context, **kwargs):
 
 @cli.command()
 @common_params
-@click.option("-d", "--detailed", is_flag=True)
+@click.option(
+    "-d",
+    "--detailed",
+    is_flag=True,
+    help="Update the state of all final jobs from their latest solver log.",
+)
 @click.option(
     "--filter",
     type=str,
@@ -391,6 +473,13 @@ def init(ctx: click.Context, **kwargs):
 def status(ctx: click.Context, **kwargs):
     project, jobs = cli_cmd_setup(kwargs)
 
+    if kwargs.get("detailed"):
+        with timed("validate states"):
+            updated = validate_states(jobs)
+        logger.info(f"Updated the state of {updated} jobs from their solver logs")
+        # labels are taken from the snapshot, which predates the update
+        project.snapshot_ = None
+
     # project.print_status(detailed=kwargs["detailed"], pretty=True)
     id_view_map = map_view_folder_to_job_id("view")
 
@@ -399,9 +488,12 @@ def status(ctx: click.Context, **kwargs):
     logger.info("Detailed overview:\n" + "=" * 90)
     for job in jobs:
         jobid = job.id
-        job.doc["state"]["view"] = id_view_map.get(jobid)
-        if view := id_view_map.get(jobid):
-            labels = project.labels(job)
+        view = id_view_map.get(jobid)
+        # avoid rewriting the job document if the view did not change
+        if job.doc["state"].get("view") != view:
+            job.doc["state"]["view"] = view
+        if view:
+            labels = project.snapshot.labels(job)
             max_view_len = max(len(view), max_view_len)
             if "finished" in labels:
                 finished.append((view, jobid, labels))
@@ -456,9 +548,8 @@ def query(ctx: click.Context, **kwargs):
     quiet: bool = kwargs.get("quiet", False)
     json_file: str = kwargs.get("export_to", "")
     validation_file: str = kwargs.get("validate_against", "")
-    filters: list[str] = kwargs.get("filter", [])
     profile_call(
-        query_impl, project, input_queries, filters, quiet, json_file, validation_file
+        query_impl, project, jobs, input_queries, quiet, json_file, validation_file
     )
 
 
@@ -638,18 +729,10 @@ def reset(ctx: click.Context, **kwargs):
 @click.pass_context
 def archive(ctx: click.Context, **kwargs):
     target_folder: Path = Path(kwargs.get("repo", "")).absolute()
-    if current_path := kwargs.get("folder", "."):
-        os.chdir(current_path)
-        current_path = Path(current_path).absolute()
-    setup_logging()
 
     # setup project and jobs
-    project = OpenFOAMProject().init_project()
-    filters: list[str] = list(kwargs.get("filter", ()))
-    # check if given path points to valid project
-    if not is_valid_workspace(filters):
-        return
-    jobs = project.filter_jobs(filters, False)
+    project, jobs = cli_cmd_setup(kwargs)
+    current_path = Path.cwd()
 
     dry_run = kwargs.get("dry_run", False)
     branch_name = None
@@ -726,14 +809,14 @@ def archive(ctx: click.Context, **kwargs):
                 logger.debug(f"{target_folder}, {signac_statepoint}")
                 copy_to_archive(repo, use_git_repo, signac_statepoint, target_file)
 
-            # copy signac state point
+            # copy signac job document, the history journal is folded into
+            # the archived document
             signac_job_document = Path(job.path) / "signac_job_document.json"
             if not signac_job_document.exists():
                 continue
 
-            md5sum = check_output(
-                ["md5sum", str(signac_job_document)], text=True
-            ).split()[0]
+            document = json.dumps(archived_document(job), indent=2).encode()
+            md5sum = hashlib.md5(document).hexdigest()
             target_file = (
                 target_folder / f"workspace/{job.id}/signac_job_document_{md5sum}.json"
             )
@@ -741,7 +824,7 @@ def archive(ctx: click.Context, **kwargs):
                 logger.info(f"Would copy {signac_job_document} to {target_file}.")
             else:
                 logger.debug(f"{target_folder}, {signac_job_document}")
-                copy_to_archive(repo, use_git_repo, signac_job_document, target_file)
+                write_to_archive(repo, use_git_repo, document, target_file)
 
             case_folder = Path(job.path) / "case"
             if not case_folder.exists():
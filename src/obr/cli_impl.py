@@ -1,18 +1,20 @@
 import json
 import logging
+import sys
 
 from copy import deepcopy
+from signac.job import Job
 
 from .signac_wrapper.operations import OpenFOAMProject
-from .core.queries import build_filter_query
+from .core.queries import build_filter_query, Query
 
 logger = logging.getLogger("OBR")
 
 
 def query_impl(
     project: OpenFOAMProject,
+    jobs: list[Job],
     input_queries: tuple[str],
-    filters: list[str],
     quiet: bool,
     json_file: str,
     validation_file: str,
@@ -21,7 +23,6 @@ def query_impl(
         logger.warning("--query argument cannot be empty!")
         return
     queries: list[Query] = build_filter_query(input_queries)
-    jobs = project.filter_jobs(filters=list(filters))
     query_results = project.query(jobs=jobs, query=queries)
     if not quiet:
         for job_id, query_res in deepcopy(query_results).items():
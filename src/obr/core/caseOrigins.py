@@ -4,7 +4,7 @@ import shutil
 from os import environ
 from os.path import expandvars, isdir
 from pathlib import Path
-from typing import Union
+from typing import Optional, Union
 from subprocess import check_output
 from git.repo import Repo
 
@@ -27,6 +27,11 @@ class MultiCase:
             return
         os.makedirs(os.path.join(path, "case"))
 
+    @property
+    def local_path(self) -> Optional[Path]:
+        """A MultiCase has no case files"""
+        return None
+
 
 class CaseOnDisk:
     """Copies an OpenFOAM case from disk and copies it into the workspace
@@ -38,6 +43,11 @@ class CaseOnDisk:
             origin = expandvars(origin)
         self.path = Path(origin).expanduser()
 
+    @property
+    def local_path(self) -> Optional[Path]:
+        """The folder the case is copied from or None if it does not exist"""
+        return self.path if isdir(self.path) else None
+
     def init(self, path: str):
         if not isdir(self.path):
             logger.warning(
@@ -98,6 +108,15 @@ class GitRepo:
         self.folder = folder
         self.cache_folder = cache_folder
 
+    @property
+    def local_path(self) -> Optional[Path]:
+        """The case in the cache folder or None if the repository has not been
+        cloned into the cache folder yet"""
+        if not self.cache_folder or not Path(self.cache_folder + "/.git").exists():
+            return None
+        path = Path(self.cache_folder) / (self.folder or "")
+        return path if isdir(path) else None
+
     def init(self, path):
         if self.cache_folder and Path(self.cache_folder).exists():
             # if cache folder has been cloned into before, check for new commits
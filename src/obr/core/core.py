@@ -4,24 +4,30 @@ import subprocess
 import re
 import logging
 import json
-import shutil
+import tempfile
 
+from contextlib import contextmanager
 from pathlib import Path
-from subprocess import check_output
-from typing import Union, Generator
+from typing import Union, Generator, Optional
 from datetime import datetime
+from time import perf_counter
 from signac.job import Job
-from copy import deepcopy
+
+from . import fsops
+from .history import history
 
 logger = logging.getLogger("OBR")
 
+# output of logged_execute up to this size is stored in the history, larger
+# output is written to a log file
+INLINE_LOG_LIMIT = 1000
+LOG_TAIL_SIZE = 1000
+STREAM_CHUNK_SIZE = 64 * 2**10
+
 # these are to be replaced with each other
 SIGNAC_PATH_TOKEN = "_dot_"
 PATH_TOKEN = "."
 
-GLOBAL_INIT_COUNT = 0
-GLOBAL_UNINIT_COUNT = 0
-
 
 def parse_variables_impl(in_str, args, domain):
     ocurrances = re.findall(r"\${{" + domain + r"\.(\w+)}}", in_str)
@@ -46,17 +52,63 @@ def key_to_path(sign_path: Union[str, Path]) -> str:
     return str(sign_path).replace(SIGNAC_PATH_TOKEN, PATH_TOKEN)
 
 
-def logged_execute(cmd, path, doc) -> Path:
-    """execute cmd and logs success
+class OutputSpool:
+    """Collects the output of a command with bounded memory
 
-    If cmd is a string, it will be interpreted as shell cmd
-    otherwise a callable function is expected
+    The output is kept in memory as long as it does not exceed
+    INLINE_LOG_LIMIT bytes, afterwards it is streamed to a temporary file in
+    folder. Only the head and the tail of the output are kept in memory.
+    """
+
+    def __init__(self, folder: Union[str, Path]):
+        self.folder = Path(folder)
+        self.head = b""
+        self.tail = b""
+        self.size = 0
+        self.fh = None
+
+    @property
+    def spooled(self) -> bool:
+        return self.fh is not None
+
+    def write(self, data: bytes) -> None:
+        if not self.spooled and self.size + len(data) > INLINE_LOG_LIMIT:
+            self.fh = tempfile.NamedTemporaryFile(
+                dir=self.folder, prefix=".obr_", suffix=".log", delete=False
+            )
+            # the head holds the complete output so far
+            self.fh.write(self.head)
+        if self.fh:
+            self.fh.write(data)
+        if len(self.head) < INLINE_LOG_LIMIT:
+            self.head += data[: INLINE_LOG_LIMIT - len(self.head)]
+        self.tail = (self.tail + data[-LOG_TAIL_SIZE:])[-LOG_TAIL_SIZE:]
+        self.size += len(data)
+
+    def close(self, fn: str) -> Optional[Path]:
+        """Move the spooled output to folder/fn
+
+        Returns: path to the log file or None if the output was not spooled
+        """
+        if not self.fh:
+            return None
+        self.fh.close()
+        log_path = self.folder / fn
+        os.replace(self.fh.name, log_path)
+        return log_path
+
+
+def logged_execute(cmd, path, job) -> Path:
+    """execute cmd and logs success to the history of the job
+
+    The output is streamed to a log file if it exceeds INLINE_LOG_LIMIT,
+    otherwise it is stored directly in the history. In the former case only
+    the head and tail of the output are stored in the history.
 
     Returns:
         path to log file
     """
 
-    d = doc["history"]
     cmd_str = " ".join(cmd)
     cmd_str = path_to_key(cmd_str).split()  # replace dots in cmd_str with _dot_'s
     if len(cmd_str) > 1:
@@ -64,58 +116,68 @@ def logged_execute(cmd, path, doc) -> Path:
     else:
         flags = []
     cmd_str = cmd_str[0]
+    spool = OutputSpool(path)
+    start = perf_counter()
     try:
-        ret = check_output(cmd, cwd=path, stderr=subprocess.STDOUT).decode("utf-8")
-        log = ret
-        state = "success"
-    except subprocess.SubprocessError as e:
-        log = e.output.decode("utf-8")
-        logging.error("SubprocessError:" + __file__ + __name__ + str(e) + log)
-        state = "failure"
+        with subprocess.Popen(
+            cmd, cwd=path, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+        ) as proc:
+            while chunk := proc.stdout.read1(STREAM_CHUNK_SIZE):
+                spool.write(chunk)
+        if proc.returncode == 0:
+            state = "success"
+        else:
+            logging.error(
+                "SubprocessError:"
+                + __file__
+                + __name__
+                + f" {cmd} returned {proc.returncode}\n"
+                + spool.tail.decode("utf-8", errors="replace")
+            )
+            state = "failure"
     except FileNotFoundError as e:
         logging.error(__file__ + __name__ + str(e))
-        log = cmd + " not found"
+        spool.write(f"{cmd[0]} not found".encode())
         state = "failure"
     except Exception as e:
-        logging.error(__file__ + __name__ + str(e))
-        logging.error("General Exception" + __file__ + __name__ + str(e) + e.output)
-        log = ret
+        logging.error("General Exception" + __file__ + __name__ + str(e))
         state = "failure"
 
+    duration = perf_counter() - start
     timestamp = datetime.now().strftime("%Y-%m-%d_%H:%M:%S")
-    log_path = None
+    entry = {
+        "cmd": cmd_str,
+        "type": "shell",
+        "log": spool.head.decode("utf-8", errors="replace"),
+        "state": state,
+        "flags": flags,
+        "timestamp": timestamp,
+        "duration": duration,
+        "user": os.environ.get("USER"),
+        "hostname": os.environ.get("HOST"),
+    }
 
     # Only write log files above a certain size
     # otherwise the log is stored directly in the job doc
-    if log and len(log) > 1000:
+    log_path = None
+    if spool.spooled:
         # the cmd_str might contain / for example if
         # shell scripts are called. Hence we sanitize
         # the script name
         cmd_str_san = key_to_path(cmd_str.split("/")[-1])
         fn = f"{cmd_str_san}_{timestamp}.log"
-        with open(path / fn, "w") as fh:
-            fh.write(log)
-        log = fn
-        log_path = path / fn
+        log_path = spool.close(fn)
+        entry["log"] = fn
+        entry["head"] = spool.head.decode("utf-8", errors="replace")
+        entry["tail"] = spool.tail.decode("utf-8", errors="replace")
 
-    d.append({
-        "cmd": cmd_str,
-        "type": "shell",
-        "log": log,
-        "state": state,
-        "flags": flags,
-        "timestamp": timestamp,
-        "user": os.environ.get("USER"),
-        "hostname": os.environ.get("HOST"),
-    })
-
-    doc["history"] = d
+    history(job).append(entry)
 
     return log_path
 
 
-def logged_func(func, doc, **kwargs):
-    """execute cmd and logs success
+def logged_func(func, job, **kwargs):
+    """execute cmd and logs success to the history of the job
 
     If cmd is a string, it will be interpreted as shell cmd
     otherwise a callable function is expected
@@ -140,7 +202,7 @@ def logged_func(func, doc, **kwargs):
         "user": os.environ.get("USER"),
         "hostname": os.environ.get("HOST"),
     }
-    doc["history"].append(res)
+    history(job).append(res)
 
 
 def get_mesh_stats(owner_path: str) -> dict:
@@ -181,17 +243,24 @@ def merge_job_documents(job: Job):
     files = [f for f in files if is_job_sub_document(f)]
     merged_data = []
     merged_history = []
+    seen_history = set()
     cache = None
-    for f in files:
+    for f in sorted(files):
         with open(Path(root) / f) as fh:
             job_doc = json.load(fh)
-            for record in job_doc["data"]:
+            for record in job_doc.get("data", []):
                 merged_data.append(record)
-            for record in job_doc["history"]:
+            # every archived document holds the full history up to the time
+            # it was archived, thus skip records of previous documents
+            for record in job_doc.get("history", []):
+                key = json.dumps(record, sort_keys=True)
+                if key in seen_history:
+                    continue
+                seen_history.add(key)
                 merged_history.append(record)
             # TODO handle inconsistent cache
             if not cache:
-                cache = job_doc["cache"]
+                cache = job_doc.get("cache")
     job.doc = {"data": merged_data, "history": merged_history, "cache": cache}
 
 
@@ -211,9 +280,8 @@ def get_latest_log(job: Job) -> str:
     case = OpenFOAMCase(case_path, job)
     solver = case.controlDict.get("application")
 
-    history = job.doc["history"]
-    for entry in history[::-1]:
-        if solver in entry().get("cmd", ""):
+    for entry in history(job)[::-1]:
+        if solver in entry.get("cmd", ""):
             log_path = case_path / entry["log"]
             if not log_path.exists():
                 continue
@@ -229,39 +297,15 @@ def get_timestamp_from_log(log) -> str:
 
 
 def find_solver_logs(job: Job) -> Generator[tuple, None, None]:
-    """Find and return all solver log files, campaign info and tags from job instances"""
-    case_path = Path(job.path)
-    if not case_path.exists():
-        return
-
-    root, campaigns, _ = next(os.walk(case_path))
-
-    def find_tags(path: Path, tags: list, tag_mapping):
-        """Recurses into subfolders of path until a system folder is found
-
-        Returns:
-          Dictionary mapping paths to tags -> tag
-        """
-        _, folder, _ = next(os.walk(path))
-        is_case = len(folder) == 0
-        if is_case:
-            tag_mapping[str(path)] = tags
-        else:
-            for f in folder:
-                tags_copy = deepcopy(tags)
-                tags_copy.append(f)
-                find_tags(path / f, tags_copy, tag_mapping)
-        return tag_mapping
+    """Find and return all solver log files, campaign info and tags from job instances
 
-    for campaign in campaigns:
-        # check if case folder
-        tag_mapping = find_tags(case_path / campaign, [], {})
+    See obr.core.log_catalog, use scan_solver_logs to find the logs of many
+    jobs at once.
+    """
+    from .log_catalog import scan_solver_logs
 
-        for path, tags in tag_mapping.items():
-            root, _, files = next(os.walk(path))
-            for file in files:
-                if "Foam" in file and file.endswith("log"):
-                    yield f"{root}/{file}", campaign, tags
+    for entry in scan_solver_logs([job]):
+        yield entry.path, entry.campaign, list(entry.tags)
 
 
 def execute_shell(steps: list[str], job) -> bool:
@@ -285,7 +329,7 @@ def execute_shell(steps: list[str], job) -> bool:
         if not step:
             continue
         step = parse_variables(step)
-        logged_execute(step.split(), path, job.doc)
+        logged_execute(step.split(), path, job)
     return True
 
 
@@ -294,17 +338,11 @@ def modifies_file(fns):
     and copy the file if it is a symlink
     """
 
-    def unlink(fn):
-        if Path(fn).is_symlink():
-            src = fn.resolve()
-            check_output(["rm", fn])
-            check_output(["cp", "-r", src, fn])
-
     if isinstance(fns, list):
         for fn in fns:
-            unlink(fn)
+            fsops.materialize(fn)
     else:
-        unlink(fns)
+        fsops.materialize(fns)
 
 
 def writes_files(fns):
@@ -314,8 +352,7 @@ def writes_files(fns):
 
     def unlink(fn):
         if Path(fn).is_symlink():
-            fn.resolve()
-            check_output(["rm", fn])
+            fsops.remove(fn)
 
     if isinstance(fns, list):
         for fn in fns:
@@ -358,12 +395,11 @@ def link_folder_to_copy(source: Path) -> Path:
     """
 
     source_bck = str(source.absolute()) + ".bck"
-    check_output(["mv", source, source_bck])
-    check_output(["mkdir", source])
+    fsops.move(source, source_bck)
+    fsops.makedirs(source)
     src_root, folder, files = next(os.walk(source_bck))
-    targ_root, _, _ = next(os.walk(source))
     src_root = Path(src_root)
-    targ_root = Path(targ_root)
+    targ_root = Path(source)
 
     # NOTE this can be improved by only moving the symlinks in the backup folder.
     # currently the implementation does unneeded copies of non symlink files
@@ -375,17 +411,10 @@ def link_folder_to_copy(source: Path) -> Path:
                 "Some openfoam versions refuse to decompose files if content of"
                 " zero folder are symlinks. Thus we temporarily copy this file."
             )
-            src_file_path = src_file_path.resolve()
-            target_file_path = targ_root / fn
-            check_output(["cp", src_file_path, target_file_path])
-        else:
-            target_file_path = targ_root / fn
-            check_output(["cp", src_file_path, target_file_path])
+    fsops.copy_files((src_root / fn, targ_root / fn) for fn in files)
 
     for fold in folder:
-        src_fold_path = src_root / fold
-        target_path = targ_root / fold
-        check_output(["cp", "-r", src_fold_path, target_path])
+        fsops.copy(src_root / fold, targ_root / fold)
     return Path(source_bck)
 
 
@@ -397,13 +426,13 @@ class TemporaryFolder:
         self.source = source
         self.target = target
         self.delink = delink
-        check_output(["cp", "-r", source, target])
+        fsops.copy(source, target)
 
         if self.delink:
             self.delink_folder = DelinkFolder(self.target)
 
     def __del__(self):
-        shutil.rmtree(str(self.target))
+        fsops.remove(self.target)
 
 
 class DelinkFolder:
@@ -416,8 +445,8 @@ class DelinkFolder:
 
     def tear_down(self):
         if self.source_bck.exists():
-            shutil.rmtree(str(self.source))
-            check_output(["mv", self.source_bck, self.source])
+            fsops.remove(self.source)
+            fsops.move(self.source_bck, self.source)
 
     def __del__(self):
         self.tear_down()
@@ -453,3 +482,20 @@ def profile_call(f, *args, **kwargs):
         stats.dump_stats(filename="obr_profile.prof")
     else:
         f(*args, **kwargs)
+
+
+@contextmanager
+def timed(name: str, timings: Optional[dict] = None):
+    """Measures the wall time of the enclosed block
+
+    The elapsed time is logged on debug level and, if given, accumulated in
+    timings[name]
+    """
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = perf_counter() - start
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + elapsed
+        logger.debug(f"{name} took {elapsed:.3f}s")
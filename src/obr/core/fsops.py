@@ -0,0 +1,189 @@
+"""In-process file system primitives
+
+These replace calls to cp, mv, rm, mkdir and ln via subprocesses. File copies
+try a reflink first, then an in kernel copy via copy_file_range and finally
+fall back to shutil.copyfile, which uses sendfile on Linux. Copies of many
+files, eg. of decomposed cases with many processor folders, are batched and
+performed by a thread pool.
+"""
+
+import os
+import shutil
+
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional, Union
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore[assignment]
+
+PathLike = Union[str, Path]
+
+# ioctl request to clone a file on btrfs, xfs and other cow file systems
+FICLONE = 0x40049409
+COPY_CHUNK = 1 << 30
+# below this number of files copies are not dispatched to a thread pool
+BATCH_THRESHOLD = 16
+
+
+def _kernel_copy(src: PathLike, dst: PathLike) -> bool:
+    """Copy src to dst without passing the data through user space
+
+    Returns: False if neither reflinks nor copy_file_range are supported
+    """
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        src_fd, dst_fd = fsrc.fileno(), fdst.fileno()
+        if fcntl is not None:
+            try:
+                fcntl.ioctl(dst_fd, FICLONE, src_fd)
+                return True
+            except OSError:
+                pass
+        if not hasattr(os, "copy_file_range"):
+            return False
+        size = os.fstat(src_fd).st_size
+        copied = 0
+        try:
+            while True:
+                ret = os.copy_file_range(src_fd, dst_fd, COPY_CHUNK)
+                if not ret:
+                    break
+                copied += ret
+        except OSError:
+            return False
+        # some pseudo file systems report a size but copy nothing
+        return copied >= size
+
+
+def copy_file(src: PathLike, dst: PathLike) -> Path:
+    """Copy content and permission bits of the file src to dst, like cp
+
+    Symlinks in src are followed. If dst is a directory the file is copied into
+    it. If dst is a symlink, the link is replaced instead of writing to its
+    target.
+
+    Returns: path of the copied file
+    """
+    if os.path.isdir(dst):
+        dst = Path(dst) / Path(src).name
+    if os.path.islink(dst):
+        os.unlink(dst)
+    if not _kernel_copy(src, dst):
+        shutil.copyfile(src, dst)
+    shutil.copymode(src, dst)
+    return Path(dst)
+
+
+def copy_files(
+    pairs: Iterable[tuple[PathLike, PathLike]], max_workers: Optional[int] = None
+) -> int:
+    """Copy a batch of (src, dst) files, concurrently for large batches
+
+    Returns: the number of copied files
+    """
+    pairs = list(pairs)
+    if len(pairs) < BATCH_THRESHOLD:
+        for src, dst in pairs:
+            copy_file(src, dst)
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # consume the iterator to re-raise errors of the workers
+            list(executor.map(lambda pair: copy_file(*pair), pairs))
+    return len(pairs)
+
+
+def copy_tree(
+    src: PathLike,
+    dst: PathLike,
+    symlinks: bool = True,
+    max_workers: Optional[int] = None,
+) -> Path:
+    """Recursively copy the folder src to dst, like cp -r
+
+    Parameters:
+    symlinks -- recreate symlinks within src instead of copying their targets
+    max_workers -- number of threads used to copy the files
+
+    Returns: path of the copied folder
+    """
+    src, dst = str(src), str(dst)
+    if os.path.isdir(dst):
+        dst = os.path.join(dst, os.path.basename(src))
+    pairs = []
+    # NOTE plain string paths are used since pathlib adds a noticeable
+    # overhead for trees with many processor folders
+    for root, folders, files in os.walk(src, followlinks=not symlinks):
+        target = os.path.join(dst, os.path.relpath(root, src))
+        os.makedirs(target, exist_ok=True)
+        if symlinks:
+            files = files + [
+                f for f in folders if os.path.islink(os.path.join(root, f))
+            ]
+        for fn in files:
+            src_fn = os.path.join(root, fn)
+            if symlinks and os.path.islink(src_fn):
+                remove(os.path.join(target, fn), missing_ok=True)
+                os.symlink(os.readlink(src_fn), os.path.join(target, fn))
+            else:
+                pairs.append((src_fn, os.path.join(target, fn)))
+    copy_files(pairs, max_workers)
+    return Path(dst)
+
+
+def copy(src: PathLike, dst: PathLike, max_workers: Optional[int] = None) -> Path:
+    """Copy a file or a folder from src to dst, like cp -r
+
+    In contrast to copy_file a symlink src is not followed.
+    """
+    if os.path.islink(src):
+        # like cp -r symlinks are copied as links
+        dst = Path(dst) / Path(src).name if os.path.isdir(dst) else Path(dst)
+        os.symlink(os.readlink(src), dst)
+        return dst
+    if os.path.isdir(src):
+        return copy_tree(src, dst, max_workers=max_workers)
+    return copy_file(src, dst)
+
+
+def remove(path: PathLike, missing_ok: bool = False) -> None:
+    """Remove a file, symlink or folder, like rm -r. Symlinks are never followed"""
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+        return
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        if not missing_ok:
+            raise
+
+
+def move(src: PathLike, dst: PathLike) -> Path:
+    """Move src to dst, like mv"""
+    return Path(shutil.move(str(src), str(dst)))
+
+
+def makedirs(path: PathLike) -> Path:
+    """Create path and all missing parents, like mkdir -p"""
+    os.makedirs(path, exist_ok=True)
+    return Path(path)
+
+
+def symlink(target: PathLike, link: PathLike) -> Path:
+    """Create a symlink at link pointing to target, like ln -s"""
+    os.symlink(target, link)
+    return Path(link)
+
+
+def materialize(path: PathLike) -> bool:
+    """Replace a symlink by a copy of its target
+
+    Returns: True if path was a symlink
+    """
+    if not os.path.islink(path):
+        return False
+    src = Path(path).resolve()
+    os.unlink(path)
+    copy(src, path)
+    return True
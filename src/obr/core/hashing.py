@@ -0,0 +1,112 @@
+"""In-process md5 hashing of case files
+
+Files are hashed with hashlib in chunks. The results are cached per process
+by the real path of a file together with its size, mtime and inode, thus
+unchanged files and files linked from a parent case are hashed only once.
+Batches of files are hashed concurrently, hashlib releases the GIL while
+hashing.
+"""
+
+import os
+import hashlib
+import threading
+
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional, Union
+
+PathLike = Union[str, Path]
+
+CHUNK_SIZE = 1 << 20
+
+
+def fingerprint(path: PathLike) -> tuple[int, int, int]:
+    """Returns size, mtime in ns and inode of a file, symlinks are followed"""
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns, stat.st_ino
+
+
+def compute_md5sum(path: PathLike) -> str:
+    """Hash the content of a file without any caching"""
+    md5 = hashlib.md5(usedforsecurity=False)
+    buffer = bytearray(CHUNK_SIZE)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as fh:
+        while size := fh.readinto(buffer):
+            md5.update(view[:size])
+    return md5.hexdigest()
+
+
+class Md5Cache:
+    """Process wide cache of md5sums of files"""
+
+    def __init__(self):
+        self._entries: dict[str, tuple[tuple[int, int, int], str]] = {}
+        self._lock = threading.Lock()
+
+    def _lookup(self, path: PathLike) -> tuple[str, tuple[int, int, int], str]:
+        """Returns real path, current fingerprint and cached md5sum of path"""
+        real_path = os.path.realpath(path)
+        current = fingerprint(real_path)
+        with self._lock:
+            entry = self._entries.get(real_path)
+        return real_path, current, entry[1] if entry and entry[0] == current else ""
+
+    def _store(self, real_path: str, current: tuple[int, int, int], md5sum: str):
+        with self._lock:
+            self._entries[real_path] = (current, md5sum)
+
+    def md5sum(self, path: PathLike) -> str:
+        """Returns the md5sum of path, the file is only read if it changed"""
+        real_path, current, md5sum = self._lookup(path)
+        if not md5sum:
+            md5sum = compute_md5sum(real_path)
+            self._store(real_path, current, md5sum)
+        return md5sum
+
+    def md5sums(
+        self, paths: Iterable[PathLike], max_workers: Optional[int] = None
+    ) -> dict[PathLike, str]:
+        """Returns the md5sums of all paths, changed files are hashed concurrently"""
+        ret: dict[PathLike, str] = {}
+        # stale files by real path, links to the same file are hashed once
+        stale: dict[str, tuple[tuple[int, int, int], list[PathLike]]] = {}
+        for path in paths:
+            real_path, current, ret[path] = self._lookup(path)
+            if not ret[path]:
+                stale.setdefault(real_path, (current, []))[1].append(path)
+        real_paths = list(stale)
+        if len(real_paths) > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                hashes = list(executor.map(compute_md5sum, real_paths))
+        else:
+            hashes = [compute_md5sum(real_path) for real_path in real_paths]
+        for real_path, md5sum in zip(real_paths, hashes):
+            current, stale_paths = stale[real_path]
+            self._store(real_path, current, md5sum)
+            for path in stale_paths:
+                ret[path] = md5sum
+        return ret
+
+    def invalidate(self, path: Optional[PathLike] = None) -> None:
+        """Drop the cached md5sum of path or of all files if no path is given"""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(os.path.realpath(path), None)
+
+
+MD5_CACHE = Md5Cache()
+
+
+def md5sum(path: PathLike) -> str:
+    """Returns the md5sum of a file using the process wide cache"""
+    return MD5_CACHE.md5sum(path)
+
+
+def md5sums(
+    paths: Iterable[PathLike], max_workers: Optional[int] = None
+) -> dict[PathLike, str]:
+    """Returns the md5sums of many files using the process wide cache"""
+    return MD5_CACHE.md5sums(paths, max_workers)
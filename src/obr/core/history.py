@@ -0,0 +1,109 @@
+"""Append-only journal of the commands executed on a job
+
+Every history entry is a json line in obr_history.jsonl in the job folder.
+Appending an entry writes a single line, in contrast to assigning
+job.doc["history"], which rewrites the whole job document. Entries of
+workspaces created before the journal existed remain in job.doc["history"]
+and are prepended to the journal entries by the History view.
+"""
+
+import os
+import json
+import logging
+
+from collections.abc import Sequence
+from pathlib import Path
+from signac.job import Job
+from typing import Callable, Optional, Union
+
+logger = logging.getLogger("OBR")
+
+JOURNAL = "obr_history.jsonl"
+TAIL_BLOCK_SIZE = 4096
+
+
+class History(Sequence):
+    """Lazy view of the history of a job
+
+    Parameters:
+    job_path -- the job folder
+    legacy -- returns the entries stored in the job document
+    """
+
+    def __init__(
+        self, job_path: Union[str, Path], legacy: Optional[Callable[[], list]] = None
+    ):
+        self.path = Path(job_path) / JOURNAL
+        self._legacy = legacy
+        self._entries: Optional[list] = None
+
+    def _load(self) -> list:
+        if self._entries is None:
+            entries = list(self._legacy()) if self._legacy else []
+            try:
+                with open(self.path) as fh:
+                    for line in fh:
+                        try:
+                            entries.append(json.loads(line))
+                        except ValueError:
+                            logger.warning(f"Skipping corrupt entry in {self.path}")
+            except FileNotFoundError:
+                pass
+            self._entries = entries
+        return self._entries
+
+    def __getitem__(self, idx):
+        return self._load()[idx]
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def append(self, entry: dict) -> None:
+        """Append an entry to the journal"""
+        line = json.dumps(entry) + "\n"
+        # a single write to a file opened in append mode, thus concurrent
+        # writers do not interleave
+        with open(self.path, "a") as fh:
+            fh.write(line)
+        if self._entries is not None:
+            self._entries.append(json.loads(line))
+
+    def last(self) -> Optional[dict]:
+        """Returns the latest entry by reading only the tail of the journal"""
+        if self._entries is not None:
+            return self._entries[-1] if self._entries else None
+        try:
+            with open(self.path, "rb") as fh:
+                size = fh.seek(0, os.SEEK_END)
+                block = TAIL_BLOCK_SIZE
+                while size:
+                    start = max(0, size - block)
+                    fh.seek(start)
+                    lines = fh.read(size - start).rstrip(b"\n").rsplit(b"\n", 1)
+                    if len(lines) == 2 or start == 0:
+                        return json.loads(lines[-1])
+                    block *= 2
+        except (FileNotFoundError, ValueError):
+            pass
+        legacy = self._legacy() if self._legacy else []
+        return legacy[-1] if legacy else None
+
+
+def history(job: Job) -> History:
+    """Returns the history of a job"""
+    return History(job.path, lambda: job.doc.get("history", []))
+
+
+def archived_document(job: Job) -> dict:
+    """Returns the job document with the journal folded into its history
+
+    The journal is a separate file in the job folder, thus archives which
+    only hold the job document would lose all entries of the journal.
+    """
+    doc = job.doc()
+    legacy = doc.get("history", [])
+    doc["history"] = list(History(job.path, lambda: legacy))
+    return doc
@@ -0,0 +1,218 @@
+"""Persistent index of flattened job statepoints and documents
+
+The index is a sqlite database stored in .obr/index. For every job it holds
+the nodes of the merged statepoint and job document as produced by
+flatten_doc, together with the mtime and size of the signac json files. Jobs
+are only re-read if these fingerprints change, thus filtering and querying an
+unchanged workspace does not open any per job json file.
+"""
+
+import os
+import json
+import sqlite3
+import logging
+
+from pathlib import Path
+from signac.job import Job
+from typing import Iterable, Optional, Union
+
+from .history import JOURNAL, History
+from .statepoint import resolved_path
+from .query_engine import FlatTable, flatten_doc
+
+logger = logging.getLogger("OBR")
+
+INDEX_FOLDER = Path(".obr") / "index"
+INDEX_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    fingerprint TEXT
+);
+CREATE TABLE IF NOT EXISTS nodes (
+    job_id TEXT,
+    top_idx INTEGER,
+    ord INTEGER,
+    key TEXT,
+    path TEXT,
+    value TEXT
+);
+CREATE INDEX IF NOT EXISTS nodes_key ON nodes (key);
+CREATE INDEX IF NOT EXISTS nodes_job_id ON nodes (job_id);
+"""
+
+
+def index_enabled() -> bool:
+    """The index can be disabled by setting OBR_DISABLE_INDEX"""
+    return not os.environ.get("OBR_DISABLE_INDEX")
+
+
+def job_fingerprint(job_path: Union[str, Path]) -> str:
+    """Returns mtime and size of the statepoint, job document and history
+    journal of a job"""
+    ret = []
+    for fn in (Job.FN_STATE_POINT, Job.FN_DOCUMENT, JOURNAL):
+        try:
+            stat = os.stat(os.path.join(job_path, fn))
+            ret.append(f"{stat.st_mtime_ns}:{stat.st_size}")
+        except FileNotFoundError:
+            ret.append("")
+    return "|".join(ret)
+
+
+def read_flat_job(job_path: Union[str, Path]) -> dict:
+    """Merge job document and resolved statepoint of a job, like flatten_jobs
+    does, but reading the json files directly
+
+    Since the index only holds the latest entry of lists only the latest
+    history entry is read from the history journal.
+    """
+    ret: dict = {}
+    try:
+        with open(os.path.join(job_path, Job.FN_DOCUMENT)) as fh:
+            ret.update(json.load(fh))
+    except FileNotFoundError:
+        pass
+    ret.update(resolved_path(job_path))
+    latest = History(job_path, lambda: ret.get("history", [])).last()
+    if latest is not None:
+        ret["history"] = [latest]
+    return ret
+
+
+class JobIndex:
+    """Handle to the persistent job index of an OBR workspace
+
+    Parameters:
+    root -- the project root, ie. the folder containing the workspace folder
+    """
+
+    def __init__(self, root: Union[str, Path]):
+        self.path = Path(root) / INDEX_FOLDER / "jobs.sqlite"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # NOTE the default rollback journal is used since WAL mode does not
+        # work on network file systems commonly found on clusters
+        self.con = sqlite3.connect(str(self.path), timeout=60)
+        self.con.executescript(SCHEMA)
+        version = self.con.execute(
+            "SELECT value FROM meta WHERE key='version'"
+        ).fetchone()
+        if not version or int(version[0]) != INDEX_VERSION:
+            self.clear()
+
+    def __enter__(self) -> "JobIndex":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.con.close()
+
+    def clear(self) -> None:
+        """Remove all entries from the index"""
+        with self.con:
+            self.con.execute("DELETE FROM nodes")
+            self.con.execute("DELETE FROM jobs")
+            self.con.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('version', ?)",
+                (str(INDEX_VERSION),),
+            )
+
+    def update(self, jobs: Iterable[Job], prune: bool = False) -> int:
+        """Re-index all jobs whose statepoint or job document changed
+
+        Parameters:
+        jobs -- jobs to bring up to date
+        prune -- remove all other jobs from the index
+
+        Returns: the number of re-indexed jobs
+        """
+        known = dict(self.con.execute("SELECT job_id, fingerprint FROM jobs"))
+        stale = []
+        seen = set()
+        for job in jobs:
+            seen.add(job.id)
+            fingerprint = job_fingerprint(job.path)
+            if known.get(job.id) != fingerprint:
+                stale.append((job.id, job.path, fingerprint))
+        removed = [job_id for job_id in known if job_id not in seen] if prune else []
+
+        if not stale and not removed:
+            return 0
+
+        with self.con:
+            for job_id in removed + [job_id for job_id, _, _ in stale]:
+                self.con.execute("DELETE FROM nodes WHERE job_id=?", (job_id,))
+                self.con.execute("DELETE FROM jobs WHERE job_id=?", (job_id,))
+            for job_id, job_path, fingerprint in stale:
+                self.con.executemany(
+                    "INSERT INTO nodes VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        (
+                            job_id,
+                            top_idx,
+                            order,
+                            key,
+                            json.dumps(path),
+                            json.dumps(value),
+                        )
+                        for top_idx, order, key, path, value in flatten_doc(
+                            read_flat_job(job_path)
+                        )
+                    ),
+                )
+                self.con.execute(
+                    "INSERT INTO jobs VALUES (?, ?)", (job_id, fingerprint)
+                )
+        logger.debug(f"Re-indexed {len(stale)} and removed {len(removed)} jobs")
+        return len(stale)
+
+    def table(self, job_ids: list[str], keys: Optional[Iterable] = None) -> FlatTable:
+        """Load the indexed nodes of the given jobs into a FlatTable
+
+        Parameters:
+        job_ids -- jobs to load, defines the order of the jobs in the table
+        keys -- only load columns of the given keys, loads all keys if None
+        """
+        table = FlatTable()
+        table.job_ids = list(job_ids)
+        job_idx = {job_id: i for i, job_id in enumerate(table.job_ids)}
+
+        sql = "SELECT job_id, top_idx, ord, key, path, value FROM nodes"
+        params: tuple = ()
+        if keys is not None:
+            params = tuple(keys)
+            sql += f" WHERE key IN ({','.join('?' * len(params))})"
+
+        for job_id, top_idx, order, key, path, value in self.con.execute(sql, params):
+            idx = job_idx.get(job_id)
+            if idx is None:
+                continue
+            table.append(
+                idx, top_idx, order, key, tuple(json.loads(path)), json.loads(value)
+            )
+        return table
+
+
+def indexed_table(
+    jobs: Iterable[Job], keys: Optional[Iterable] = None, prune: bool = False
+) -> Optional[FlatTable]:
+    """Bring the index of the workspace up to date and load the given jobs
+
+    Returns: a FlatTable or None if the index is disabled or not usable
+    """
+    if not index_enabled():
+        return None
+    jobs = list(jobs)
+    if not jobs:
+        return FlatTable()
+    try:
+        with JobIndex(jobs[0].project.path) as index:
+            index.update(jobs, prune=prune)
+            return index.table([job.id for job in jobs], keys)
+    except (sqlite3.Error, OSError) as e:
+        logger.warning(f"Could not use job index, falling back to job documents: {e}")
+        return None
@@ -0,0 +1,229 @@
+"""Cached discovery of solver logs in job folders
+
+Below a job folder every sub folder is a campaign, and the folders between a
+campaign and a case folder, ie. a folder without sub folders, are the tags of
+the case. The catalog walks these trees of many jobs breadth first and lists
+all folders of a level concurrently. The listings are stored in a manifest in
+.obr/index/logs.json together with the mtime of each folder, later scans only
+list folders whose mtime changed. The catalog of a project is kept for the
+lifetime of the process and the manifest is only written if a scan changed
+it.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from signac.job import Job
+from typing import Iterable, Optional, Union
+
+from .index import INDEX_FOLDER
+
+logger = logging.getLogger("OBR")
+
+MANIFEST_VERSION = 1
+# listings of folders modified shortly before they were listed are not
+# trusted, since file systems with a coarse mtime resolution might not
+# register later modifications
+RACY_NS = 2 * 10**9
+
+
+def is_solver_log(fn: str) -> bool:
+    return "Foam" in fn and fn.endswith("log")
+
+
+@dataclass(frozen=True)
+class LogEntry:
+    job_id: str
+    campaign: str
+    tags: tuple[str, ...]
+    path: str
+    size: int
+    mtime_ns: int
+
+
+class LogCatalog:
+    """Handle to the solver log manifest of a workspace
+
+    Parameters:
+    root -- the project root, ie. the folder containing the workspace folder
+    max_workers -- number of threads used to list folders
+    """
+
+    def __init__(self, root: Union[str, Path], max_workers: Optional[int] = None):
+        self.path = Path(root) / INDEX_FOLDER / "logs.json"
+        self.max_workers = max_workers
+        self.dirs: dict[str, dict] = {}
+        self.logs: dict[str, list[dict]] = {}
+        # number of folders listed by the last scan
+        self.listed = 0
+        # whether dirs or logs differ from the manifest on disk
+        self.changed = False
+        self._lock = threading.Lock()
+        try:
+            with open(self.path) as fh:
+                manifest = json.load(fh)
+            if manifest.get("version") == MANIFEST_VERSION:
+                self.dirs = manifest["dirs"]
+                self.logs = manifest["logs"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def _list_dir(self, path: str) -> tuple[dict, bool]:
+        """Returns the listing of a folder and whether it was listed again"""
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            # removed while scanning
+            return {"mtime_ns": 0, "listed_ns": 0, "dirs": [], "logs": []}, False
+        cached = self.dirs.get(path)
+        if (
+            cached
+            and cached["mtime_ns"] == mtime_ns
+            and cached["listed_ns"] - mtime_ns > RACY_NS
+        ):
+            return cached, False
+        listed_ns = time.time_ns()
+        dirs, logs = [], []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    dirs.append(entry.name)
+                elif is_solver_log(entry.name):
+                    logs.append(entry.name)
+        return {
+            "mtime_ns": mtime_ns,
+            "listed_ns": listed_ns,
+            "dirs": sorted(dirs),
+            "logs": sorted(logs),
+        }, True
+
+    def scan(self, jobs: Iterable[Job], save: bool = True) -> list[LogEntry]:
+        """Find all solver logs of the given jobs and update the manifest
+
+        Size and mtime of the logs are always read since logs are appended
+        without changing the mtime of their folder.
+
+        Parameters:
+        jobs -- the jobs to scan
+        save -- write the manifest if it changed, otherwise call save() after
+            scanning all batches
+        """
+        with self._lock:
+            ret = self._scan(list(jobs))
+        if save:
+            self.save()
+        return ret
+
+    def _scan(self, jobs: list[Job]) -> list[LogEntry]:
+        # (job id, path, campaign, tags) of the folders of the current level,
+        # campaign is None for job folders
+        level = [
+            (job.id, job.path, None, ()) for job in jobs if os.path.isdir(job.path)
+        ]
+        found: list[tuple[str, str, tuple, str]] = []
+        self.listed = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while level:
+                listings = executor.map(lambda folder: self._list_dir(folder[1]), level)
+                next_level = []
+                for (job_id, path, campaign, tags), (listing, listed) in zip(
+                    level, listings
+                ):
+                    if self.dirs.get(path) != listing:
+                        self.dirs[path] = listing
+                        self.changed = True
+                    self.listed += listed
+                    for fn in listing["dirs"]:
+                        next_level.append((
+                            job_id,
+                            os.path.join(path, fn),
+                            fn if campaign is None else campaign,
+                            () if campaign is None else tags + (fn,),
+                        ))
+                    if campaign is not None and not listing["dirs"]:
+                        for fn in listing["logs"]:
+                            found.append(
+                                (job_id, campaign, tags, os.path.join(path, fn))
+                            )
+                level = next_level
+            stats = list(executor.map(_stat, [entry[3] for entry in found]))
+
+        ret = [
+            LogEntry(job_id, campaign, tags, path, stat[0], stat[1])
+            for (job_id, campaign, tags, path), stat in zip(found, stats)
+            if stat
+        ]
+        logs: dict[str, list[dict]] = {job.id: [] for job in jobs}
+        for entry in ret:
+            # tags as list, as read back from the manifest
+            logs[entry.job_id].append(dict(asdict(entry), tags=list(entry.tags)))
+        for job_id, entries in logs.items():
+            if self.logs.get(job_id) != entries:
+                self.logs[job_id] = entries
+                self.changed = True
+        return ret
+
+    def save(self) -> None:
+        """Write the manifest if it changed, a failure to write is not fatal"""
+        with self._lock:
+            if not self.changed:
+                return
+            self.changed = False
+            manifest = {
+                "version": MANIFEST_VERSION,
+                "dirs": self.dirs,
+                "logs": self.logs,
+            }
+            tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}")
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(tmp, "w") as fh:
+                    json.dump(manifest, fh)
+                os.replace(tmp, self.path)
+            except OSError as e:
+                logger.warning(f"Could not write log manifest {self.path}: {e}")
+
+
+def _stat(path: str) -> Optional[tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+CATALOGS: dict[str, LogCatalog] = {}
+
+
+def catalog(root: Union[str, Path]) -> LogCatalog:
+    """Returns the process wide log catalog of a project"""
+    key = os.path.abspath(root)
+    if key not in CATALOGS:
+        CATALOGS[key] = LogCatalog(key)
+    return CATALOGS[key]
+
+
+def scan_solver_logs(
+    jobs: Iterable[Job], max_workers: Optional[int] = None, save: bool = True
+) -> list[LogEntry]:
+    """Find the solver logs of all jobs using the manifest of their project
+
+    Parameters:
+    jobs -- the jobs to scan
+    max_workers -- number of threads used to list folders
+    save -- write the manifest if it changed, pass False when scanning many
+        batches and call catalog(root).save() afterwards
+    """
+    jobs = list(jobs)
+    if not jobs:
+        return []
+    log_catalog = catalog(jobs[0].project.path)
+    if max_workers is not None:
+        log_catalog.max_workers = max_workers
+    return log_catalog.scan(jobs, save)
@@ -16,7 +16,7 @@ def success(self, message, *args, **kws):
 logging.Logger.success = success
 
 
-def setup_logging(log_fold=""):
+def setup_logging(log_fold="", debug=False, log_to_file=True):
     grey = "\x1b[38;20m"
     yellow = "\x1b[33;20m"
     red = "\x1b[31;20m"
@@ -42,7 +42,7 @@ def setup_logging(log_fold=""):
         },
         "handlers": {
             "stdout_simple": {
-                "level": "INFO",
+                "level": "DEBUG" if debug else "INFO",
                 "class": "logging.StreamHandler",
                 "formatter": "colored_console",
                 "stream": "ext://sys.stdout",
@@ -57,8 +57,15 @@ def setup_logging(log_fold=""):
             },
         },
         "loggers": {
-            "OBR": {"level": "INFO", "handlers": ["stdout_simple", "file_detailed"]}
+            "OBR": {
+                "level": "DEBUG" if debug else "INFO",
+                "handlers": ["stdout_simple", "file_detailed"],
+            }
         },
     }
 
+    if not log_to_file:
+        del config_dict["handlers"]["file_detailed"]
+        config_dict["loggers"]["OBR"]["handlers"] = ["stdout_simple"]
+
     logging.config.dictConfig(config=config_dict)
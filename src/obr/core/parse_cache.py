@@ -0,0 +1,81 @@
+"""Per process LRU cache of parsed files
+
+Parsed files are keyed by their real path, thus symlinked files of child
+cases share the parse of the parent file. An entry is only reused as long as
+mtime and size of the file are unchanged. Memory is bounded by the number of
+entries and the total size of the parsed files.
+"""
+
+import os
+import threading
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Optional, Union
+
+PathLike = Union[str, Path]
+
+
+class ParseCache:
+    """LRU cache of parsed files
+
+    Parameters:
+    max_entries -- maximum number of cached files
+    max_bytes -- maximum accumulated size of the cached files
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 256 * 2**20):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[int, int, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, path: PathLike, parse: Callable[[str], Any]) -> Any:
+        """Returns the parsed content of path
+
+        Parameters:
+        path -- the file to parse
+        parse -- called with the real path of the file if no valid entry exists
+        """
+        real_path = os.path.realpath(path)
+        stat = os.stat(real_path)
+        with self._lock:
+            entry = self._entries.get(real_path)
+            if entry and entry[:2] == (stat.st_mtime_ns, stat.st_size):
+                self._entries.move_to_end(real_path)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+
+        parsed = parse(real_path)
+        with self._lock:
+            self._pop(real_path)
+            self._entries[real_path] = (stat.st_mtime_ns, stat.st_size, parsed)
+            self.size += stat.st_size
+            while self._entries and (
+                len(self._entries) > self.max_entries or self.size > self.max_bytes
+            ):
+                self._pop(next(iter(self._entries)))
+        return parsed
+
+    def _pop(self, real_path: str) -> None:
+        if entry := self._entries.pop(real_path, None):
+            self.size -= entry[1]
+
+    def invalidate(self, path: Optional[PathLike] = None) -> None:
+        """Drop the entry of path or all entries if no path is given"""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self.size = 0
+            else:
+                self._pop(os.path.realpath(path))
+
+
+PARSE_CACHE = ParseCache()
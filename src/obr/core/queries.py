@@ -3,12 +3,19 @@ import logging
 import pandas as pd
 
 from dataclasses import dataclass, field
+from pathlib import Path
 from typing import Any, Union, Callable, Iterable
 from copy import deepcopy
+from signac import Project
 from signac.job import Job
 from typing import TYPE_CHECKING, Union
 from enum import Enum
 
+from .history import history
+from .statepoint import resolved_statepoint
+from .query_engine import FlatTable, QueryMatcher
+from .index import indexed_table
+
 if TYPE_CHECKING:
     from obr.signac_wrapper.operations import OpenFOAMProject
 
@@ -152,21 +159,70 @@ def flatten_jobs(
     """convert a list of jobs to a dictionary"""
     docs: dict = {}
 
-    # merge job docs and statepoints
+    # merge job docs, history and resolved statepoints
     for job in jobs:
         docs[job.id] = {}
         for key, value in job.doc.items():
             docs[job.id].update({key: value})
-        docs[job.id].update(job.sp())
+        job_history = list(history(job))
+        if job_history:
+            docs[job.id]["history"] = job_history
+        docs[job.id].update(resolved_statepoint(job))
     return docs
 
 
+def jobs_to_table(
+    jobs: "Union[OpenFOAMProject, list[Job]]",
+    keys: Iterable,
+    latest_only=True,
+    prune=None,
+) -> FlatTable:
+    """Flatten a list of jobs into a FlatTable holding the columns of the given keys
+
+    Uses the persistent job index of the workspace if possible, see
+    obr.core.index. Otherwise the job documents are read and flattened.
+
+    Args:
+        prune: Remove jobs not in jobs from the index, defaults to True if jobs is
+        a project
+    """
+    if prune is None:
+        prune = isinstance(jobs, Project)
+    if latest_only:
+        table = indexed_table(jobs, keys, prune=prune)
+        if table is not None:
+            return table
+    return FlatTable.from_flat_jobs(flatten_jobs(jobs), latest_only, keys)
+
+
 def query_flat_jobs(
     jobs: dict[str, dict], queries: list[Query], output, latest_only, strict
 ) -> list[query_result]:
     """
     Execute queries over a dictionary where the job.id is the key and merged job.docs are the values
 
+    The queries are compiled into a single QueryMatcher which flattens the jobs
+    into a columnar table once, see obr.core.query_engine.
+
+    Parameters:
+    jobs -- a job dictionary ordered by job ids
+    queries -- list of queries to run
+    output -- Whether to print result to screen
+    latest_only -- Take only latest value if resulting value is a list
+    strict -- needs all queries to be successful to return a result
+    """
+    return QueryMatcher(queries)(jobs, latest_only, strict)
+
+
+def query_flat_jobs_legacy(
+    jobs: dict[str, dict], queries: list[Query], output, latest_only, strict
+) -> list[query_result]:
+    """
+    Execute queries over a dictionary where the job.id is the key and merged job.docs are the values
+
+    This is the reference implementation walking every job document per query
+    and top level key. It is kept to validate and benchmark the QueryMatcher.
+
     Parameters:
     jobs -- a job dictionary ordered by job ids
     queries -- list of queries to run
@@ -235,7 +291,8 @@ def query_to_dict(
 
     Flattens list of jobs to a dictionary with merged statepoints and job document first
     """
-    return query_flat_jobs(flatten_jobs(jobs), queries, output, latest_only, strict)
+    matcher = QueryMatcher(queries)
+    return matcher.evaluate(jobs_to_table(jobs, matcher.keys, latest_only), strict)
 
 
 def query_impl(
@@ -262,8 +319,9 @@ def query_to_records(
 
     Flattens list of jobs to a dictionary with merged statepoints and job document first
     """
-    query_results = query_flat_jobs(
-        flatten_jobs(jobs), queries, False, latest_only, strict
+    matcher = QueryMatcher(queries)
+    query_results = matcher.evaluate(
+        jobs_to_table(jobs, matcher.keys, latest_only), strict
     )
     ret = []
     for q in query_results:
@@ -280,6 +338,7 @@ def query_to_dataframe(
     strict: bool = False,
     index: list[str] = [],
     post_pro: Union[Callable, None] = None,
+    time_series: bool = False,
 ) -> pd.DataFrame:
     """Given a list jobs find all jobs for which a query matches
 
@@ -287,10 +346,14 @@ def query_to_dataframe(
     Args:
         index: A list of strings defining which columns should be used as index
         post_pro: Function to apply to the DataFrame before creating the index
+        time_series: Join the time series of the latest solver log of each job,
+        one row per time step, see the extractTimeSeries operation
     """
     ret = pd.DataFrame.from_records(
         query_to_records(jobs, queries, latest_only=latest_only, strict=strict)
     )
+    if time_series:
+        ret = join_time_series(jobs, ret)
     if post_pro:
         ret = post_pro(ret)
     if index:
@@ -298,6 +361,33 @@ def query_to_dataframe(
     return ret
 
 
+def join_time_series(
+    jobs: "Union[OpenFOAMProject, list[Job]]", records: pd.DataFrame
+) -> pd.DataFrame:
+    """Join the records of jobs with the time series of their latest solver log
+
+    Only the archives of the jobs present in records are loaded. Jobs without
+    an extracted time series keep a single row with missing values.
+    """
+    from ..OpenFOAM.time_series import find_time_series, load_time_series
+
+    if records.empty:
+        return records
+    paths = {} if isinstance(jobs, Project) else {job.id: job.path for job in jobs}
+    frames = []
+    for job_id in records["jobid"].unique():
+        path = paths.get(job_id) or jobs.open_job(id=job_id).path
+        archives = find_time_series(Path(path) / "case")
+        if not archives:
+            continue
+        frame = load_time_series(archives[-1])
+        frame["jobid"] = job_id
+        frames.append(frame)
+    if not frames:
+        return records
+    return records.merge(pd.concat(frames, ignore_index=True), on="jobid", how="left")
+
+
 def build_filter_query(filters: Iterable[str]) -> list[Query]:
     """This function builds a list of filter queries, where filter queries are queries that request a specific value and has to conform a predicate"""
     q: list[Query] = []
@@ -323,29 +413,18 @@ def build_filter_query(filters: Iterable[str]) -> list[Query]:
 
 
 def statepoint_get(statepoint: dict, key: str):
-    """This function performs a basic recursive query of the statepoint dictionary
-    if the key: value pair is not found in statepoint it recurses into statepoint["parent"] if present
-
+    """Returns the value of key of a resolved statepoint or False if the key is
+    not set, see obr.core.statepoint
     """
-    val = statepoint.get(key)
-    if val:
-        return val
-    else:
-        if statepoint.get("parent"):
-            return statepoint_get(statepoint["parent"], key)
-    return False
+    return statepoint.get(key) or False
 
 
 def statepoint_query(statepoint: dict, key: str, value, predicate="=="):
-    """This function performs a basic recursive query of the statepoint dictionary
-    if the key: value pair is not found in statepoint it recurses into statepoint["parent"] if present
-
+    """Checks whether key of a resolved statepoint equals value, see
+    obr.core.statepoint
     """
     if statepoint.get(key):
         return statepoint[key] == value
-    else:
-        if statepoint.get("parent"):
-            return statepoint_query(statepoint["parent"], key, value, predicate)
     return False
 
 
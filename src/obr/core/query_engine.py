@@ -0,0 +1,302 @@
+"""A compiled, columnar query engine
+
+The legacy query path walks the merged statepoint and job document of every job
+once per query and per top level key, deep copying the query at every level.
+This module instead flattens every job into a columnar table of key paths once
+and evaluates all queries as column comparisons.
+"""
+
+import logging
+import operator
+import numpy as np
+
+from dataclasses import dataclass, field
+from collections.abc import Mapping
+from typing import Any, Generator, Iterable, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from obr.core.queries import Query, query_result
+
+logger = logging.getLogger("OBR")
+
+PREDICATE_OPS = {
+    "eq": operator.eq,
+    "neq": operator.ne,
+    "gt": operator.gt,
+    "lt": operator.lt,
+    "geq": operator.ge,
+    "leq": operator.le,
+}
+
+
+@dataclass
+class Column:
+    """All occurrences of a single key over all jobs of a FlatTable
+
+    Every row describes one node of a job document with the column key, its
+    position inside the job document and its value.
+
+    Attributes:
+        job_idx: index of the job in FlatTable.job_ids
+        top_idx: index of the top level key under which the node was found
+        order: post-order position of the node in the job document
+        paths: keys of all parent nodes starting from the top level key
+        values: value of the node, lists are reduced to their latest entry
+    """
+
+    job_idx: list[int] = field(default_factory=list)
+    top_idx: list[int] = field(default_factory=list)
+    order: list[int] = field(default_factory=list)
+    paths: list[tuple] = field(default_factory=list)
+    values: list[Any] = field(default_factory=list)
+    _typed: Optional[dict] = field(default=None, repr=False)
+
+    def append(self, job_idx: int, top_idx: int, order: int, path: tuple, value):
+        self.job_idx.append(job_idx)
+        self.top_idx.append(top_idx)
+        self.order.append(order)
+        self.paths.append(path)
+        self.values.append(value)
+        self._typed = None
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def typed_rows(self) -> dict[type, tuple[np.ndarray, np.ndarray]]:
+        """Partition the column by value type
+
+        Numbers (including bools) are stored as float arrays, since queries
+        compare all numbers as floats. All other values are stored as object
+        arrays. The partition is cached until the next append.
+
+        Returns: a dictionary mapping type to (row indices, values)
+        """
+        if self._typed is not None:
+            return self._typed
+        rows: dict[type, list[int]] = {}
+        for i, value in enumerate(self.values):
+            type_ = float if isinstance(value, (int, float)) else type(value)
+            rows.setdefault(type_, []).append(i)
+
+        self._typed = {}
+        for type_, idx in rows.items():
+            if type_ is float:
+                values = np.fromiter(
+                    (self.values[i] for i in idx), dtype=float, count=len(idx)
+                )
+            else:
+                # fill element wise, otherwise numpy would unpack list values
+                values = np.empty(len(idx), dtype=object)
+                for j, i in enumerate(idx):
+                    values[j] = self.values[i]
+            self._typed[type_] = (np.asarray(idx, dtype=np.int64), values)
+        return self._typed
+
+
+class FlatTable:
+    """Columnar representation of merged job documents
+
+    Every node of a job document is stored in the column of its key, which
+    allows to look up all occurrences of a key without walking the job
+    documents again.
+    """
+
+    def __init__(self):
+        self.job_ids: list[str] = []
+        self.columns: dict[Any, Column] = {}
+
+    @classmethod
+    def from_flat_jobs(
+        cls,
+        jobs: dict[str, dict],
+        latest_only: bool = True,
+        keys: Optional[Iterable] = None,
+    ) -> "FlatTable":
+        """Build a table from a dictionary of merged job documents
+
+        Parameters:
+        jobs -- a job dictionary ordered by job ids, see flatten_jobs
+        latest_only -- Take only latest value if resulting value is a list
+        keys -- only store columns of the given keys, stores all keys if None
+        """
+        table = cls()
+        keys = set(keys) if keys is not None else None
+        for job_id, doc in jobs.items():
+            table.add_job(job_id, doc, latest_only, keys)
+        return table
+
+    def add_job(
+        self, job_id: str, doc: dict, latest_only: bool = True, keys=None
+    ) -> None:
+        """Flatten a single merged job document into the table"""
+        job_idx = len(self.job_ids)
+        self.job_ids.append(job_id)
+        for top_idx, order, key, path, value in flatten_doc(doc, latest_only, keys):
+            self.append(job_idx, top_idx, order, key, path, value)
+
+    def append(self, job_idx: int, top_idx: int, order: int, key, path: tuple, value):
+        """Append a single node to the column of its key"""
+        column = self.columns.get(key)
+        if column is None:
+            column = self.columns[key] = Column()
+        column.append(job_idx, top_idx, order, path, value)
+
+
+def flatten_doc(
+    doc: dict, latest_only: bool = True, keys=None
+) -> Generator[tuple[int, int, Any, tuple, Any], None, None]:
+    """Walk a merged job document once in post-order
+
+    Yields: (top_idx, order, key, path, value) for every node, or only for nodes
+    whose key is in keys
+    """
+    order = 0
+
+    def visit(key, value, path: tuple, top_idx: int):
+        nonlocal order
+        if isinstance(value, list) and latest_only and value:
+            value = value[-1]
+        if isinstance(value, Mapping):
+            sub_path = path + (key,)
+            for sub_key, sub_value in value.items():
+                yield from visit(sub_key, sub_value, sub_path, top_idx)
+        if keys is None or key in keys:
+            yield top_idx, order, key, path, value
+        order += 1
+
+    for top_idx, (key, value) in enumerate(doc.items()):
+        yield from visit(key, value, (), top_idx)
+
+
+def evaluate_column(query: "Query", column: Column) -> tuple[np.ndarray, list]:
+    """Evaluate the predicate of a query on all rows of a column
+
+    Mirrors Query.execute: if no value is requested every row matches,
+    otherwise the requested value is converted to the type of the stored
+    value, and numbers are compared as floats.
+
+    Returns: the matching row indices and the corresponding result values
+    """
+    if query.value is None and query.key:
+        return np.arange(len(column), dtype=np.int64), list(column.values)
+
+    predicate_op = PREDICATE_OPS[query.predicate]
+    matched_rows, matched_values = [], []
+    for type_, (rows, values) in column.typed_rows().items():
+        try:
+            rhs = type_(query.value)
+        except (TypeError, ValueError) as e:
+            logger.debug(f"Cannot compare {query.value} to values of {type_}: {e}")
+            continue
+        if type_ in (float, str):
+            mask = np.asarray(predicate_op(values, rhs), dtype=bool)
+        else:
+            # containers would be broadcasted by numpy, hence they are
+            # compared element wise
+            mask = np.zeros(len(values), dtype=bool)
+            for i, value in enumerate(values):
+                try:
+                    mask[i] = bool(predicate_op(value, rhs))
+                except TypeError as e:
+                    logger.error(f"{e}: Tried to compare {rhs} and {value}")
+        matched_rows.append(rows[mask])
+        matched_values.extend(values[mask].tolist())
+
+    if not matched_rows:
+        return np.empty(0, dtype=np.int64), []
+    return np.concatenate(matched_rows), matched_values
+
+
+class QueryMatcher:
+    """A list of queries compiled into a single matcher
+
+    The matcher reproduces the results of the legacy query_flat_jobs walk: for
+    every top level key of a job the first matching node in post-order is
+    considered a hit.
+    """
+
+    def __init__(self, queries: list["Query"]):
+        self.queries = list(queries)
+        self.keys = {q.key for q in self.queries}
+
+    def __repr__(self) -> str:
+        return f"QueryMatcher({self.queries})"
+
+    def hits(self, query: "Query", table: FlatTable) -> dict[int, list]:
+        """Find the first hit per job and top level key
+
+        Returns: a dictionary mapping job_idx to a list of (state, sub_keys)
+        ordered by top level key
+        """
+        column = table.columns.get(query.key)
+        if column is None:
+            return {}
+        rows, values = evaluate_column(query, column)
+        if not len(rows):
+            return {}
+
+        job_idx = np.asarray(column.job_idx, dtype=np.int64)[rows]
+        top_idx = np.asarray(column.top_idx, dtype=np.int64)[rows]
+        order = np.asarray(column.order, dtype=np.int64)[rows]
+        sort = np.lexsort((order, top_idx, job_idx))
+        job_idx, top_idx = job_idx[sort], top_idx[sort]
+        first = np.ones(len(sort), dtype=bool)
+        first[1:] = (job_idx[1:] != job_idx[:-1]) | (top_idx[1:] != top_idx[:-1])
+
+        ret: dict[int, list] = {}
+        for i in np.flatnonzero(first):
+            hit = sort[i]
+            row = rows[hit]
+            ret.setdefault(int(job_idx[i]), []).append(
+                ({query.key: values[hit]}, list(column.paths[row]))
+            )
+        return ret
+
+    def evaluate(self, table: FlatTable, strict: bool = False) -> list["query_result"]:
+        """Execute the compiled queries over a FlatTable
+
+        Parameters:
+        table -- the flattened job documents
+        strict -- needs all queries to be successful to return a result
+        """
+        from obr.core.queries import query_result
+
+        hits = [self.hits(q, table) for q in self.queries]
+
+        ret = []
+        for job_idx, job_id in enumerate(table.job_ids):
+            res = query_result(job_id)
+            all_required = True
+            for q, q_hits in zip(self.queries, hits):
+                found = False
+                for state, sub_keys in q_hits.get(job_idx, []):
+                    # a filter query was hit
+                    if q.negate:
+                        all_required = False
+                        break
+                    found = True
+                    res.result.append(state)
+                    res.sub_keys.append(sub_keys)
+                if q.value and not found:
+                    all_required = False
+
+            # in strict mode all queries need to have some result
+            if strict:
+                all_required = len(res.result) == len(self.queries)
+
+            # merge all results to a single dictionary
+            merged: dict = {}
+            for d in res.result:
+                merged.update(d)
+            res.result = [merged]
+
+            if all_required:
+                ret.append(res)
+        return ret
+
+    def __call__(
+        self, jobs: dict[str, dict], latest_only: bool = True, strict: bool = False
+    ) -> list["query_result"]:
+        """Flatten the given merged job documents and execute the queries"""
+        table = FlatTable.from_flat_jobs(jobs, latest_only, keys=self.keys)
+        return self.evaluate(table, strict)
@@ -0,0 +1,135 @@
+"""Resolved statepoints of jobs in a variation tree
+
+A statepoint only holds the values set by its own variation and references
+its parent by parent_id. The effective key/values of a job, ie. the values of
+all its ancestors overridden by its own values, are resolved by walking the
+tree once via parent_id. Since statepoints are immutable the resolved
+statepoints are cached by job id for the lifetime of the process.
+
+Statepoints of workspaces created before, which embed a copy of the parent
+statepoint under "parent", are resolved from the embedded copy if the parent
+job does not exist.
+"""
+
+import os
+import json
+import logging
+
+from pathlib import Path
+from signac.job import Job
+from typing import Optional, Union
+
+logger = logging.getLogger("OBR")
+
+
+def merge_statepoint(parent: dict, statepoint: dict) -> dict:
+    """Returns the resolved statepoint of a job given the resolved statepoint
+    of its parent"""
+    ret = dict(parent)
+    ret.update({k: v for k, v in statepoint.items() if k != "parent"})
+    return ret
+
+
+def _resolve_embedded(statepoint: dict) -> dict:
+    """Resolve a statepoint embedding its ancestors under parent"""
+    chain = []
+    while statepoint:
+        chain.append(statepoint)
+        statepoint = statepoint.get("parent") or {}
+    ret: dict = {}
+    for statepoint in reversed(chain):
+        ret = merge_statepoint(ret, statepoint)
+    return ret
+
+
+class StatepointResolver:
+    """Cache of the raw and resolved statepoints of a workspace
+
+    Parameters:
+    workspace -- the workspace folder, ie. the folder containing the job folders
+    """
+
+    def __init__(self, workspace: Union[str, Path]):
+        self.workspace = Path(workspace)
+        self.statepoints: dict[str, Optional[dict]] = {}
+        self.resolved: dict[str, dict] = {}
+
+    def statepoint(self, job_id: str) -> Optional[dict]:
+        """Returns the statepoint of a job as stored on disk or None if the job
+        does not exist"""
+        if job_id not in self.statepoints:
+            try:
+                with open(self.workspace / job_id / Job.FN_STATE_POINT) as fh:
+                    self.statepoints[job_id] = json.load(fh)
+            except FileNotFoundError:
+                # the job might be created later, thus don't cache the miss
+                return None
+        return self.statepoints[job_id]
+
+    def register(self, job_id: str, statepoint: dict) -> None:
+        """Add the statepoint of a job which is not yet written to disk"""
+        self.statepoints.setdefault(job_id, statepoint)
+
+    def resolve(self, job_id: str) -> dict:
+        """Returns the resolved statepoint of a job
+
+        The parent chain is walked until the first job with an already resolved
+        statepoint, afterwards all statepoints of the chain are resolved top
+        down and cached.
+        """
+        if job_id in self.resolved:
+            return self.resolved[job_id]
+
+        chain: list[tuple[str, dict]] = []
+        base: dict = {}
+        current: Optional[str] = job_id
+        seen: set[str] = set()
+        while current:
+            if current in self.resolved:
+                base = self.resolved[current]
+                break
+            statepoint = self.statepoint(current)
+            if statepoint is None:
+                if chain:
+                    # the parent does not exist (anymore), fall back to an
+                    # embedded copy of the parent statepoint
+                    base = _resolve_embedded(chain[-1][1].get("parent") or {})
+                    logger.debug(f"Parent {current} of {chain[-1][0]} not found")
+                break
+            chain.append((current, statepoint))
+            seen.add(current)
+            current = statepoint.get("parent_id")
+            if current in seen:
+                raise ValueError(f"Cyclic parent_id chain at job {current}")
+
+        for current, statepoint in reversed(chain):
+            base = merge_statepoint(base, statepoint)
+            self.resolved[current] = base
+        return base
+
+
+RESOLVERS: dict[str, StatepointResolver] = {}
+
+
+def resolver(workspace: Union[str, Path]) -> StatepointResolver:
+    """Returns the process wide resolver of a workspace"""
+    key = os.path.abspath(workspace)
+    if key not in RESOLVERS:
+        RESOLVERS[key] = StatepointResolver(key)
+    return RESOLVERS[key]
+
+
+def register_statepoint(job: Job, statepoint: dict) -> None:
+    """Make the statepoint of a planned job known to the resolver"""
+    resolver(Path(job.path).parent).register(job.id, statepoint)
+
+
+def resolved_path(job_path: Union[str, Path]) -> dict:
+    """Returns a copy of the resolved statepoint of the job at job_path"""
+    job_path = Path(job_path)
+    return dict(resolver(job_path.parent).resolve(job_path.name))
+
+
+def resolved_statepoint(job: Job) -> dict:
+    """Returns a copy of the resolved statepoint of a job"""
+    return resolved_path(job.path)
@@ -1,15 +1,36 @@
 import os
+import re
 import sys
+import json
+import shutil
 
+from collections import Counter
 from collections.abc import MutableMapping
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from subprocess import check_output
-from signac.job import Job
+from signac.job import Job, calc_id
+from typing import Callable, Iterable, Iterator, Optional
 from obr.signac_wrapper.operations import OpenFOAMProject
+from obr.core.core import timed
 from obr.core.queries import statepoint_query
+from obr.core.caseOrigins import instantiate_origin_class
+from obr.core.index import INDEX_FOLDER
+from obr.core.statepoint import (
+    merge_statepoint,
+    register_statepoint,
+    resolved_statepoint,
+    resolver,
+)
 from obr.core.parse_yaml import eval_generator_expressions
 from obr.core.logger_setup import logger
-from copy import deepcopy
+
+
+# number of jobs initialised by a worker at once
+JOB_BATCH_SIZE = 256
+# the id_path_mapping the view was generated from
+VIEW_MAPPING = INDEX_FOLDER / "view.json"
+END_TIME_REGEX = re.compile(r"^\s*endTime\s+([^;\s]+)\s*;", re.M)
 
 
 def flatten(d, parent_key="", sep="/"):
@@ -74,38 +95,178 @@ def extract_from_operation(operation: dict, value) -> dict:
     return {"keys": keys, "path": path, "args": args}
 
 
+def read_view_links(view_path: Path) -> dict[str, str]:
+    """Returns the symlinks below view_path, relative to view_path, and their
+    targets"""
+    ret: dict[str, str] = {}
+    for root, dirs, files in os.walk(view_path):
+        # os.walk lists symlinks to folders as folders without following them
+        for fn in dirs + files:
+            path = os.path.join(root, fn)
+            if os.path.islink(path):
+                ret[os.path.relpath(path, view_path)] = os.readlink(path)
+    return ret
+
+
+def _replace_with_link(path: Path, target: str) -> None:
+    """Atomically point path to target, a folder at path is removed first"""
+    if path.is_dir() and not path.is_symlink():
+        shutil.rmtree(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.symlink_to(target)
+    os.replace(tmp, path)
+
+
+def _remove_empty_parents(path: Path, view_path: Path) -> None:
+    for parent in path.parents:
+        if parent == view_path or not parent.is_relative_to(view_path):
+            return
+        try:
+            parent.rmdir()
+        except OSError:
+            # not empty
+            return
+
+
+def sync_view(view_path: Path, links: dict[str, str]) -> tuple[int, int]:
+    """Bring the symlinks below view_path in line with links
+
+    Only changed links are touched. New and changed links are swapped in
+    atomically, thus concurrent readers of the view never see a missing link
+    of an unchanged or changed job.
+
+    Returns: the number of added or changed and of removed links
+    """
+    view_path = Path(view_path)
+    existing = read_view_links(view_path) if view_path.is_dir() else {}
+    removed = [path for path in existing if path not in links]
+    changed = [path for path, target in links.items() if existing.get(path) != target]
+    for path in removed:
+        link = view_path / path
+        link.unlink()
+        _remove_empty_parents(link, view_path)
+    for path in changed:
+        _replace_with_link(view_path / path, links[path])
+    return len(changed), len(removed)
+
+
 def generate_view(
     project: OpenFOAMProject, workspace: Path, view_path: Path, id_path_mapping: dict
 ):
-    """
+    """Synchronise the view with the final jobs of id_path_mapping
+
     Parameters:
         - workspace: folder that contains the workspace folder
         - view_path: path where the view should be created
         - id_path_mapping: dictionary from job.id to relative path name
     """
+    view_path = Path(view_path)
+    statepoints = resolver(project.workspace)
+    links = {}
+    for job_id, path in id_path_mapping.items():
+        statepoint = statepoints.statepoint(job_id)
+        # jobs which are no longer part of the configuration are not in the
+        # view, neither are jobs with children
+        if statepoint is None or statepoint.get("has_child"):
+            continue
+        link = view_path / path.rstrip("/")
+        links[str(link.relative_to(view_path))] = os.path.relpath(
+            Path(project.workspace) / job_id, link.parent
+        )
+    added, removed = sync_view(view_path, links)
+    logger.debug(f"Updated {added} and removed {removed} view links")
+
+
+def view_is_current(workspace: Path, view_path: Path, id_path_mapping: dict) -> bool:
+    """Checks whether the view was generated from the same id_path_mapping"""
+    if not view_path.exists():
+        return False
+    try:
+        with open(Path(workspace) / VIEW_MAPPING) as fh:
+            return json.load(fh) == id_path_mapping
+    except (OSError, ValueError):
+        return False
+
+
+def store_view_mapping(workspace: Path, id_path_mapping: dict) -> None:
+    path = Path(workspace) / VIEW_MAPPING
+    tmp = path.with_name(f".{path.name}.{os.getpid()}")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp, "w") as fh:
+            json.dump(id_path_mapping, fh)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning(f"Could not store the view mapping {path}: {e}")
+
+
+def existing_job_ids(project: OpenFOAMProject) -> set[str]:
+    """Returns the ids of all jobs on disk by listing the workspace folder"""
+    try:
+        with os.scandir(project.workspace) as entries:
+            return {entry.name for entry in entries if entry.is_dir()}
+    except FileNotFoundError:
+        return set()
+
+
+def descendant_job_ids(
+    project: OpenFOAMProject, base_id: str, job_ids: Iterable[str]
+) -> set[str]:
+    """Returns the jobs of job_ids whose parent_id chain leads to base_id, ie.
+    the jobs of the variation tree of the base case"""
+    statepoints = resolver(project.workspace)
+    # whether the chain of a job leads to base_id
+    on_tree: dict[str, bool] = {base_id: True}
+    job_ids = list(job_ids)
+    for job_id in job_ids:
+        chain: list[str] = []
+        current: Optional[str] = job_id
+        while current and current not in on_tree and current not in chain:
+            chain.append(current)
+            statepoint = statepoints.statepoint(current)
+            current = statepoint.get("parent_id") if statepoint else None
+        found = on_tree.get(current, False) if current else False
+        for chain_id in chain:
+            on_tree[chain_id] = found
+    return {job_id for job_id in job_ids if job_id != base_id and on_tree[job_id]}
+
+
+def has_run(job: Job) -> bool:
+    """Whether an operation was started on the job, ie. it might hold results"""
+    return bool(job.doc.get("state", {}).get("global"))
+
+
+def prune_jobs(
+    project: OpenFOAMProject, job_ids: Iterable[str], force: bool = False
+) -> int:
+    """Removes the given jobs including their case folders
 
-    def ln(src, dst):
-        src = Path(src)
-        dst = Path(dst).absolute()
-        relpath = os.path.relpath(src, dst)
-        # for some reason the relpath has one ../ too much
-        relpath = relpath[3:]
-        dst.symlink_to(relpath)
-
-    if (view_path).exists():
-        check_output(["rm", "-rf", str(view_path)])
-
-    if not id_path_mapping:
-        return
+    Parameters:
+    job_ids -- the jobs to remove
+    force -- also remove jobs on which an operation was started
 
-    project.find_jobs(filter={"has_child": False}).export_to(
-        str(workspace),
-        path=lambda job: "view/" + id_path_mapping[job.id],
-        copytree=lambda src, dst: ln(src, dst),
-    )
+    Returns: the number of removed jobs
+    """
+    removed = 0
+    for job_id in sorted(job_ids):
+        try:
+            job = project.open_job(id=job_id)
+            if not force and has_run(job):
+                logger.warning(
+                    f"Not removing job {job_id} in state"
+                    f" {job.doc['state']['global']}, use --force to remove it"
+                )
+                continue
+            logger.info(f"Removing job {job_id}")
+            job.remove()
+            removed += 1
+        except (LookupError, OSError) as e:
+            logger.warning(f"Could not remove job {job_id}: {e}")
+    return removed
 
 
-def is_on_requested_parent(operation, parent_job) -> bool:
+def is_on_requested_parent(operation, parent_statepoint) -> bool:
     """Check if operation requests to be on specific parent
 
 
@@ -117,15 +278,15 @@ def is_on_requested_parent(operation, parent_job) -> bool:
     if not requests_parent:
         return True
 
-    intersect_keys = requests_parent.keys() & parent_job.sp.keys()
+    intersect_keys = requests_parent.keys() & parent_statepoint.keys()
     intersect_dict = {
         k: requests_parent[k]
         for k in intersect_keys
-        if requests_parent[k] == parent_job.sp[k]
+        if requests_parent[k] == parent_statepoint[k]
     }
     # Filter out variations that have not the specified parent statepoint
     # does not work on python 3.8
-    # if not dict(parent.items() & parent_job.sp.items()):
+    # if not dict(parent.items() & parent_statepoint.items()):
     #    continue
 
     if intersect_dict:
@@ -142,10 +303,6 @@ def clean_path(path_name: str) -> str:
     return path
 
 
-def to_dict(synced_dict) -> dict:
-    return {k: v for k, v in synced_dict.items()}
-
-
 def expand_generator_block(operation):
     """given an operation this function"""
     # check if we have a generator
@@ -178,95 +335,121 @@ def expand_generator_block(operation):
     return operation["values"]
 
 
+def variation_statepoints(
+    operation: dict, parent_id: str, parent_statepoint: Callable[[], dict]
+) -> Iterator[tuple[dict, str]]:
+    """Expands the values of a variation operation into statepoints
+
+    Parameters:
+    operation -- the operation of the variation
+    parent_id -- job id of the parent job
+    parent_statepoint -- returns the resolved statepoint of the parent job,
+        only called to evaluate if filters
+
+    Returns: the statepoint and view path of every value which passes its if
+    filters
+    """
+    sub_variation = operation.get("variation", {})
+    values = expand_generator_block(operation)
+
+    for value in values:
+        # support if statetment when values are a subdictionary
+        if isinstance(value, dict) and not value.get("if", True):
+            continue
+
+        if isinstance(value, dict):
+            for k, v in value.items():
+                if isinstance(v, str):
+                    value[k] = eval_generator_expressions(v)
+
+        # derive path name from schema or key value
+        parse_res = extract_from_operation(operation, value)
+
+        # filter any if statements from operation dict
+        parse_res["keys"] = [k for k in parse_res["keys"] if k != "if"]
+        parse_res["args"] = {k: v for k, v in parse_res["args"].items() if k != "if"}
+
+        clean_path(parse_res["path"])
+
+        statepoint = {
+            "keys": parse_res["keys"],
+            "parent_id": parent_id,
+            "operation": operation["operation"],
+            "has_child": True if sub_variation else False,
+            "pre_build": operation.get("pre_build", []),
+            "post_build": operation.get("post_build", []),
+            **parse_res["args"],
+        }
+
+        # check for statepoint filters
+        skip = False
+        if (
+            isinstance(value, dict)
+            and value.get("if", False)
+            and isinstance(value["if"], list)
+        ):
+            # statepoints only reference their parent, thus the filters
+            # are evaluated on the values inherited from all ancestors
+            resolved = {**parent_statepoint(), **statepoint}
+            for filter_record in value["if"]:
+                predicate = filter_record.pop("predicate", "==")
+                if len(filter_record) != 1:
+                    raise AssertionError(
+                        "Exact one key-value pair is required for an if record"
+                    )
+                key, value = list(filter_record.items())[0]
+                skip = not statepoint_query(resolved, key, value, predicate)
+                if skip:
+                    logger.debug(
+                        f"skipping generating statepoint {statepoint} because of"
+                        f" {key}=={value} filter"
+                    )
+                    break
+            if skip:
+                continue
+
+        yield statepoint, parse_res["path"]
+
+
 def add_variations(
     operations: list,
     project: OpenFOAMProject,
     variation: list,
     parent_job: Job,
     id_path_mapping: dict,
+    planned: Optional[list[Job]] = None,
 ) -> list[str]:
     """Recursively adds variations to the project and initialises the jobs. This
     creates the workspace/uid folder and signac files as sideeffect.
 
+    If planned is given the jobs are only opened in memory and appended to
+    planned instead, see materialize_jobs.
+
     Returns: A list of all operation names
     """
     for operation in variation:
         sub_variation = operation.get("variation", {})
 
-        if not is_on_requested_parent(operation, parent_job):
+        if not is_on_requested_parent(operation, parent_job.sp):
             continue
 
-        values = expand_generator_block(operation)
-
-        for value in values:
-            # support if statetment when values are a subdictionary
-            if isinstance(value, dict) and not value.get("if", True):
-                continue
-
-            if isinstance(value, dict):
-                for k, v in value.items():
-                    if isinstance(v, str):
-                        value[k] = eval_generator_expressions(v)
-
-            # derive path name from schema or key value
-            parse_res = extract_from_operation(operation, value)
-
-            # filter any if statements from operation dict
-            parse_res["keys"] = [k for k in parse_res["keys"] if k != "if"]
-            parse_res["args"] = {
-                k: v for k, v in parse_res["args"].items() if k != "if"
-            }
-
-            clean_path(parse_res["path"])
-            base_dict = deepcopy(to_dict(parent_job.sp))
-
-            statepoint = {
-                "keys": parse_res["keys"],
-                "parent_id": parent_job.id,
-                "operation": operation["operation"],
-                "has_child": True if sub_variation else False,
-                "pre_build": operation.get("pre_build", []),
-                "post_build": operation.get("post_build", []),
-                **parse_res["args"],
-            }
-            statepoint["parent"] = base_dict
-
-            # check for statepoint filters
-            skip = False
-            if (
-                isinstance(value, dict)
-                and value.get("if", False)
-                and isinstance(value["if"], list)
-            ):
-                for filter_record in value["if"]:
-                    predicate = filter_record.pop("predicate", "==")
-                    if len(filter_record) != 1:
-                        raise AssertionError(
-                            "Exact one key-value pair is required for an if record"
-                        )
-                    key, value = list(filter_record.items())[0]
-                    skip = not statepoint_query(statepoint, key, value, predicate)
-                    if skip:
-                        logger.debug(
-                            f"skipping generating statepoint {statepoint} because of"
-                            f" {key}=={value} filter"
-                        )
-                        break
-                if skip:
-                    continue
-
+        for statepoint, path in variation_statepoints(
+            operation, parent_job.id, lambda: resolved_statepoint(parent_job)
+        ):
             job = project.open_job(statepoint)
-            setup_job_doc(job)
-            job.init()
-            job.doc["state"]["global"] = ""
+            if planned is None:
+                initialize_job(job)
+            else:
+                # the job is not yet written, hence filters of its children
+                # can not read its statepoint from disk
+                register_statepoint(job, statepoint)
+                planned.append(job)
 
-            id_path_mapping[job.id] = (
-                id_path_mapping.get(parent_job.id, "") + parse_res["path"]
-            )
+            id_path_mapping[job.id] = id_path_mapping.get(parent_job.id, "") + path
 
             if sub_variation:
                 operations = add_variations(
-                    operations, project, sub_variation, job, id_path_mapping
+                    operations, project, sub_variation, job, id_path_mapping, planned
                 )
 
         operations.append(operation.get("operation"))
@@ -280,10 +463,220 @@ def setup_job_doc(job: Job, reset: bool = False) -> None:
     # triggering rerunning operations
     if job.doc.get("state"):
         return
-    job.doc["state"] = {}
-    job.doc["data"] = []  # store results data here
-    job.doc["history"] = []  # history of executed operations
-    job.doc["cache"] = {}
+    # a single update writes the job document once
+    job.doc.update({
+        "state": {},
+        "data": [],  # store results data here
+        # entries written before obr.core.history existed, new entries are
+        # appended to the history journal of the job
+        "history": [],
+        "cache": {},
+    })
+
+
+def initialize_job(job: Job) -> None:
+    """Creates the job folder, statepoint and job document of a variation"""
+    setup_job_doc(job)
+    job.init()
+    job.doc["state"]["global"] = ""
+
+
+def _initialize_batch(jobs: list[Job]) -> int:
+    for job in jobs:
+        initialize_job(job)
+    return len(jobs)
+
+
+def materialize_jobs(
+    jobs: list[Job],
+    max_workers: Optional[int] = None,
+    batch_size: int = JOB_BATCH_SIZE,
+) -> int:
+    """Initialises planned jobs concurrently in batches
+
+    Returns: the number of initialised jobs
+    """
+    unique = list({job.id: job for job in jobs}.values())
+    batches = [
+        unique[start : start + batch_size]
+        for start in range(0, len(unique), batch_size)
+    ]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return sum(executor.map(_initialize_batch, batches))
+
+
+def base_statepoint(config: dict) -> dict:
+    """Returns the statepoint of the base case"""
+    base_case_state = {
+        "has_child": True,
+        "parent_id": None,
+        "pre_build": config["case"].get("pre_build", []),
+        "post_build": config["case"].get("post_build", []),
+        "keys": list(config["case"].keys()),
+    }
+    base_case_state.update({k: v for k, v in config["case"].items()})
+    return base_case_state
+
+
+def legacy_base_id(config: dict) -> str:
+    """Returns the id the base case had in workspaces created before statepoints
+    referenced their parent only by parent_id, ie. which embed the statepoint
+    of the parent under "parent"."""
+    return calc_id({**base_statepoint(config), "parent": {}})
+
+
+@dataclass
+class TreePlan:
+    """Size and cost estimate of a variation tree, see plan_tree
+
+    Disk usage is estimated from the size of the base case, if it is available
+    locally: jobs of shell operations copy the case, all other jobs link the
+    files of their parent. Every decomposePar job writes processor folders
+    holding about another copy of the case.
+    """
+
+    jobs_per_level: list[int] = field(default_factory=list)
+    jobs_per_operation: Counter = field(default_factory=Counter)
+    linked_jobs: int = 0
+    copied_jobs: int = 0
+    decomposed_jobs: int = 0
+    processor_folders: int = 0
+    # sum of numberOfSubdomains x endTime of all final jobs
+    core_time: float = 0.0
+    # final jobs for which endTime is unknown
+    unknown_end_time: int = 0
+    case_size: Optional[int] = None
+    case_files: Optional[int] = None
+
+    @property
+    def n_jobs(self) -> int:
+        return sum(self.jobs_per_level)
+
+    @property
+    def disk_usage(self) -> Optional[int]:
+        """Estimated bytes written to the workspace"""
+        if self.case_size is None:
+            return None
+        return self.case_size * (1 + self.copied_jobs + self.decomposed_jobs)
+
+    def report(self) -> str:
+        lines = [f"Planned {self.n_jobs} jobs"]
+        for level, n_jobs in enumerate(self.jobs_per_level):
+            lines.append(f"  level {level}: {n_jobs} jobs")
+        for operation, n_jobs in sorted(self.jobs_per_operation.items()):
+            lines.append(f"  {operation}: {n_jobs} jobs")
+        lines.append(
+            f"Jobs linking the parent case {self.linked_jobs}, copying the parent"
+            f" case {self.copied_jobs}"
+        )
+        lines.append(
+            f"Processor folders {self.processor_folders} in"
+            f" {self.decomposed_jobs} decomposed jobs"
+        )
+        if self.disk_usage is None:
+            lines.append("Disk usage unknown, the base case is not available locally")
+        else:
+            lines.append(
+                f"Estimated disk usage {self.disk_usage / 2**30:.2f} GiB, base case"
+                f" {self.case_size / 2**20:.2f} MiB in {self.case_files} files,"
+                f" {self.case_files * self.linked_jobs} links"
+            )
+        lines.append(f"Total numberOfSubdomains x endTime {self.core_time:g}")
+        if self.unknown_end_time:
+            lines.append(f"  endTime unknown for {self.unknown_end_time} jobs")
+        return "\n".join(lines)
+
+
+def _case_size(path: Path) -> tuple[int, int]:
+    """Returns the number of bytes and files below path"""
+    size, files = 0, 0
+    for root, _, fns in os.walk(path):
+        for fn in fns:
+            try:
+                size += os.lstat(os.path.join(root, fn)).st_size
+                files += 1
+            except FileNotFoundError:
+                continue
+    return size, files
+
+
+def _end_time(case_path: Path) -> Optional[float]:
+    """Read endTime from the controlDict of a case without parsing it"""
+    try:
+        text = (case_path / "system" / "controlDict").read_text(errors="replace")
+    except OSError:
+        return None
+    if match := END_TIME_REGEX.search(text):
+        try:
+            return float(match.group(1))
+        except ValueError:
+            return None
+    return None
+
+
+def plan_tree(config: dict) -> TreePlan:
+    """Expand the variation tree in memory without creating any job
+
+    Uses the same expansion as add_variations, ie. generator blocks, if
+    filters and parent requests are applied.
+    """
+    plan = TreePlan()
+    case = config["case"]
+    local_path = None
+    try:
+        origin = instantiate_origin_class(case.get("type", ""), case)
+        local_path = origin.local_path if origin else None
+    except (KeyError, TypeError) as e:
+        # eg. FOAM_TUTORIALS not set
+        logger.debug(f"Could not locate the base case: {e}")
+    base_end_time = None
+    if local_path:
+        plan.case_size, plan.case_files = _case_size(local_path)
+        base_end_time = _end_time(local_path)
+
+    base = base_statepoint(config)
+    plan.jobs_per_level.append(1)
+    level: list[tuple[list, str, dict, dict]] = [
+        (config.get("variation", []), calc_id(base), base, merge_statepoint({}, base))
+    ]
+    while level:
+        next_level = []
+        for variation, parent_id, parent, parent_resolved in level:
+            for operation in variation:
+                if not is_on_requested_parent(operation, parent):
+                    continue
+                sub_variation = operation.get("variation", [])
+                for statepoint, _ in variation_statepoints(
+                    operation, parent_id, lambda: parent_resolved
+                ):
+                    resolved = merge_statepoint(parent_resolved, statepoint)
+                    next_level.append(
+                        (sub_variation, calc_id(statepoint), statepoint, resolved)
+                    )
+        level = next_level
+        if not level:
+            break
+        plan.jobs_per_level.append(len(level))
+
+        for _, _, statepoint, resolved in level:
+            operation = statepoint["operation"]
+            plan.jobs_per_operation[operation] += 1
+            if operation == "shell":
+                plan.copied_jobs += 1
+            else:
+                plan.linked_jobs += 1
+            n_procs = int(resolved.get("numberOfSubdomains") or 1)
+            if operation == "decomposePar":
+                plan.decomposed_jobs += 1
+                plan.processor_folders += n_procs
+            if statepoint["has_child"]:
+                continue
+            end_time = resolved.get("endTime", base_end_time)
+            try:
+                plan.core_time += n_procs * float(end_time)
+            except (TypeError, ValueError):
+                plan.unknown_end_time += 1
+    return plan
 
 
 def create_tree(
@@ -296,30 +689,63 @@ def create_tree(
         logger.error("Error OpenFOAM not sourced")
         sys.exit(-1)
 
+    # the ids of all jobs of legacy workspaces differ, thus initialising would
+    # create a second tree next to the existing one
+    if (Path(project.workspace) / legacy_base_id(config)).is_dir():
+        logger.error(
+            "The workspace was created by a previous version of OBR, whose"
+            " statepoints embed the statepoint of their parent. The ids of all"
+            " jobs have changed since, thus obr init would create a second"
+            " variation tree next to the existing one. Initialise the"
+            " configuration in a new workspace or use the previous version of"
+            " OBR for this workspace."
+        )
+        sys.exit(-1)
+
     # Add base case
-    base_case_state = {
-        "has_child": True,
-        "parent_id": None,
-        "parent": {},
-        "pre_build": config["case"].get("pre_build", []),
-        "post_build": config["case"].get("post_build", []),
-        "keys": list(config["case"].keys()),
-    }
-    base_case_state.update({k: v for k, v in config["case"].items()})
-    of_case = project.open_job(base_case_state)
+    of_case = project.open_job(base_statepoint(config))
 
     setup_job_doc(of_case)
     of_case.init()
 
+    # the variation tree is expanded in memory first, afterwards only jobs
+    # which do not exist yet are written concurrently
+    timings: dict[str, float] = {}
     operations: list = []
+    planned: list[Job] = []
     id_path_mapping = {of_case.id: "base/"}
-    operations = add_variations(
-        operations,
-        project,
-        config.get("variation", {}),
-        of_case,
-        id_path_mapping,
+    existing = existing_job_ids(project)
+    with timed("plan variations", timings):
+        operations = add_variations(
+            operations,
+            project,
+            config.get("variation", {}),
+            of_case,
+            id_path_mapping,
+            planned,
+        )
+    new_jobs = [job for job in planned if job.id not in existing]
+    logger.info(
+        f"Planned {len(planned)} jobs in {timings['plan variations']:.2f}s,"
+        f" {len(new_jobs)} jobs are new"
     )
+    with timed("create jobs", timings):
+        created = materialize_jobs(new_jobs)
+    logger.info(f"Created {created} jobs in {timings['create jobs']:.2f}s")
+
+    # jobs of trees of other configurations in the same workspace are kept
+    stale = descendant_job_ids(
+        project, of_case.id, existing - {job.id for job in planned}
+    )
+    if stale and arguments.get("prune"):
+        with timed("prune jobs", timings):
+            pruned = prune_jobs(project, stale, arguments.get("force", False))
+        logger.info(f"Removed {pruned} jobs in {timings['prune jobs']:.2f}s")
+    elif stale:
+        logger.info(
+            f"{len(stale)} jobs are no longer part of the configuration, use"
+            " --prune to remove them"
+        )
 
     operations = list(set(operations))
 
@@ -327,9 +753,14 @@ def create_tree(
         project.run(names=["fetch_case"])
         project.run(names=operations, np=arguments.get("tasks", -1))
 
+    view_path = Path(arguments["folder"]) / "view"
+    if view_is_current(arguments["folder"], view_path, id_path_mapping):
+        logger.debug("View is up to date")
+        return
     generate_view(
         project,
         arguments["folder"],
-        Path(arguments["folder"]) / "view",
+        view_path,
         id_path_mapping,
     )
+    store_view_mapping(arguments["folder"], id_path_mapping)
@@ -6,18 +6,27 @@ import obr.core.caseOrigins as caseOrigins
 import traceback
 import logging
 import json
-import shutil
 
 from pathlib import Path
 from subprocess import check_output
 from signac.job import Job
-from typing import Union, Literal
+from typing import Iterable, Union, Literal, Optional
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import AbstractContextManager
+from synced_collections.errors import MetadataError
+from tqdm import tqdm
 
 from .labels import owns_mesh, final, finished
-from ..core.core import execute_shell, GLOBAL_INIT_COUNT  # noqa
+from .workspace import WorkspaceSnapshot
+from ..core import fsops
+from ..core.core import execute_shell
+from ..core.history import history
+from ..core.statepoint import resolved_statepoint
 from obr.OpenFOAM.case import OpenFOAMCase
-from obr.core.queries import filter_jobs, query_impl, Query, statepoint_get
+from obr.OpenFOAM.failure import classify_failures
+from obr.OpenFOAM.time_series import extract_time_series, is_solver_log
+from obr.core.queries import query_impl, Query, statepoint_get
 from obr.core.caseOrigins import instantiate_origin_class
 
 logger = logging.getLogger("OBR")
@@ -28,6 +37,24 @@ class OpenFOAMProject(flow.FlowProject):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self.snapshot_: Optional[WorkspaceSnapshot] = None
+
+    @property
+    def snapshot(self) -> WorkspaceSnapshot:
+        """Snapshot of the workspace, taken on first access"""
+        if self.snapshot_ is None:
+            self.snapshot_ = WorkspaceSnapshot(self)
+        return self.snapshot_
+
+    def operation_names(self, names: list[str]) -> set[str]:
+        """Resolve the given operation and group names to operation names"""
+        ret: set[str] = set()
+        for name in names:
+            if group := self.groups.get(name):
+                ret.update(group.operations)
+            else:
+                ret.add(name)
+        return ret
 
     def print_operations(self):
         ops = sorted(self.groups.keys())
@@ -39,9 +66,7 @@ class OpenFOAMProject(flow.FlowProject):
 
         The filters will be applied to all jobs inside the `OpenFOAMProject` instance and the filtered jobs will be returned as a list.
         """
-        self.filtered_jobs = (
-            filter_jobs(self, filters) if filters else [j for j in self]
-        )
+        self.filtered_jobs = self.snapshot.select(filters)
         return self.filtered_jobs
 
     def query(self, jobs: list[Job], query: list[Query]) -> list[dict]:
@@ -82,6 +107,77 @@ def operation_complete(job: Job, operation: str) -> bool:
         return False
 
 
+class EligibilityEvaluator:
+    """Evaluates the basic eligibility of many jobs in a single sweep
+
+    Statepoints are immutable and hence cached by job id. The state of a parent
+    job is read once and memoized by parent_id together with the mtime and size
+    of its job document, thus it is only re-read if the parent has changed, eg.
+    after an operation of the parent finished in a different process.
+    """
+
+    def __init__(self, initialize: bool = True):
+        self.statepoints: dict[str, dict] = {}
+        self.parent_states: dict[str, tuple[int, int, str]] = {}
+        # whether cases are initialized lazily once they are found eligible,
+        # see initialize_cases for the explicit alternative
+        self.initialize = initialize
+
+    def statepoint(self, job: Job) -> dict:
+        if job.id not in self.statepoints:
+            self.statepoints[job.id] = job.sp()
+        return self.statepoints[job.id]
+
+    def parent_state(self, job: Job) -> str:
+        """Returns the global state of the parent of job or an empty string"""
+        parent_id = self.statepoint(job).get("parent_id")
+        if not parent_id:
+            return ""
+        doc_path = Path(job.path).parent / parent_id / Job.FN_DOCUMENT
+        stat = os.stat(doc_path)
+        cached = self.parent_states.get(parent_id)
+        if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+        with open(doc_path, "r") as jh:
+            state = json.load(jh)["state"].get("global", "")
+        self.parent_states[parent_id] = (stat.st_mtime_ns, stat.st_size, state)
+        return state
+
+    def is_eligible(self, job: Job, operation: str) -> bool:
+        """See basic_eligible, cheap checks are performed first"""
+        if not operation == self.statepoint(job).get("operation"):
+            return False
+        if job.doc().get("state", {}).get("global") == "tmp_lock":
+            return False
+        if not self.parent_state(job) == "ready":
+            return False
+        # keep this here start initialization only if operation is requested
+        if self.initialize:
+            initialized = initialize_if_required(job)
+        else:
+            initialized = not needs_initialization(job)
+        return initialized and is_case(job)
+
+    def eligible_jobs(
+        self, jobs: Iterable[Job], operations: list[str]
+    ) -> dict[str, list[Job]]:
+        """Sweep once over all jobs and collect the eligible jobs of each
+        of the requested operations
+
+        Since each job has exactly one operation only the operation of the
+        statepoint needs to be checked for each job.
+        """
+        ret: dict[str, list[Job]] = {operation: [] for operation in operations}
+        for job in jobs:
+            operation = self.statepoint(job).get("operation")
+            if operation in ret and self.is_eligible(job, operation):
+                ret[operation].append(job)
+        return ret
+
+
+ELIGIBILITY = EligibilityEvaluator()
+
+
 def basic_eligible(job: Job, operation: str) -> bool:
     """Dispatches to standard checks if operations are eligible for given job
 
@@ -92,40 +188,12 @@ def basic_eligible(job: Job, operation: str) -> bool:
       - operation has been requested for job
       - copy and link files and folder
     """
-
-    if (
-        is_locked(job)
-        or not operation == job.sp().get("operation")
-        or not parent_job_is_ready(job) == "ready"
-        or not initialize_if_required(
-            job
-        )  # keep this here start initialization only if operation is requested
-        or not is_case(job)
-    ):
-        # For Debug purposes
-        if False and (operation == job.sp().get("operation")):
-            logger.info(f"check if job {job.id} is eligible is False")
-            if is_locked(job):
-                logger.info(f"\tis_locked=True, should be False")
-            if not parent_job_is_ready(job) == "ready":
-                state = parent_job_is_ready(job)
-                logger.info(f"\tparent_job_is_ready={state} should be ready")
-            if not initialize_if_required(job):
-                logger.info(f"\tinitialize_if_required=False should be True")
-            if not is_case(job):
-                logger.info("\tis_case=False should be True")
-        return False
-    return True
+    return ELIGIBILITY.is_eligible(job, operation)
 
 
 def parent_job_is_ready(job: Job) -> str:
     """Checks whether the parent of the given job is ready"""
-    if parent_id := job.sp().get("parent_id"):
-        project = OpenFOAMProject.get_project(path=job.path + "/../..")
-        with open(job.path + f"/../{parent_id}/signac_job_document.json", "r") as jh:
-            parent_job_dict = json.load(jh)
-            return parent_job_dict["state"].get("global", "")
-    return ""
+    return ELIGIBILITY.parent_state(job)
 
 
 def _link_path(base: Path, dst: Path, parent_id: str, copy_instead_link: bool):
@@ -136,14 +204,15 @@ def _link_path(base: Path, dst: Path, parent_id: str, copy_instead_link: bool):
     # just copy the full tree and are done
     if copy_instead_link:
         if dst.exists():
-            shutil.rmtree(f"{dst}")
-        shutil.copytree(src=f"{base}", dst=f"{dst}", symlinks=False)
+            fsops.remove(dst)
+        fsops.copy_tree(base, dst, symlinks=False)
         return
 
     # ensure dst path exists
-    check_output(["mkdir", "-p", str(dst)])
+    fsops.makedirs(dst)
     for root, folder, files in os.walk(Path(base)):
         relative_path = Path(root).relative_to(base)
+        dst_root = Path(dst) / relative_path
 
         # NOTE Treat processor folder separately
         # Dont recurse into processor folders for now since that can
@@ -159,22 +228,18 @@ def _link_path(base: Path, dst: Path, parent_id: str, copy_instead_link: bool):
                 trgt_proc_fold = f"{dst}/{fold}"
                 for proc_cont in proc_folder:
                     if proc_cont == "constant":
-                        check_output(["mkdir", "-p", trgt_proc_fold])
-                        check_output(
-                            [
-                                "ln",
-                                "-s",
-                                # we can use this folder format here because
-                                # we know where the parent job lies relative
-                                # to this one in the workspace
-                                f"../../../{parent_id}/case/{fold}/constant",
-                            ],
-                            cwd=trgt_proc_fold,
+                        fsops.makedirs(trgt_proc_fold)
+                        fsops.symlink(
+                            # we can use this folder format here because
+                            # we know where the parent job lies relative
+                            # to this one in the workspace
+                            f"../../../{parent_id}/case/{fold}/constant",
+                            f"{trgt_proc_fold}/constant",
                         )
                     else:
-                        shutil.copytree(
-                            src=f"{proc_root}/{proc_cont}",
-                            dst=f"{trgt_proc_fold}/{proc_cont}",
+                        fsops.copy_tree(
+                            f"{proc_root}/{proc_cont}",
+                            f"{trgt_proc_fold}/{proc_cont}",
                             symlinks=False,
                         )
             # pop all processor folder to avoid recursing
@@ -183,29 +248,12 @@ def _link_path(base: Path, dst: Path, parent_id: str, copy_instead_link: bool):
                 del folder[i]
 
         for fold in folder:
-            src = Path(root) / fold
-            dst_ = dst / relative_path / fold
-            if not dst_.exists():
-                check_output(
-                    [
-                        "mkdir",
-                        fold,
-                    ],
-                    cwd=dst / relative_path,
-                )
+            fsops.makedirs(dst_root / fold)
 
         for fn in files:
-            src = Path(root) / fn
-            dst_ = Path(dst) / relative_path / fn
-            if not dst_.exists():
-                check_output(
-                    [
-                        "ln",
-                        "-s",
-                        str(os.path.relpath(src, dst / relative_path)),
-                    ],
-                    cwd=dst / relative_path,
-                )
+            dst_ = dst_root / fn
+            if not os.path.lexists(dst_):
+                fsops.symlink(os.path.relpath(Path(root) / fn, dst_root), dst_)
 
 
 def needs_initialization(job: Job) -> bool:
@@ -216,38 +264,73 @@ def needs_initialization(job: Job) -> bool:
     return True
 
 
-def initialize_if_required(job: Job) -> bool:
-    """check if this job has been already linked to
+def initialize_case(job: Job) -> None:
+    """link the case of the parent job into the case folder of job
 
     The default strategy is to link all files. If a file is modified
     the modifying operations are responsible for unlinking and copying
     """
-    if parent_id := job.sp().get("parent_id"):
+    parent_id = job.sp().get("parent_id")
+    base_path = Path(job.path).parent / parent_id / "case"
+    dst_path = Path(job.path) / "case"
+    # shell scripts might change files as side effect hence we copy all files
+    # instead of linking to avoid side effects in future it might make sense to
+    # specify the files which are modified in the yaml file
+    copy_instead_link = job.sp().get("operation") == "shell"
+    _link_path(base_path, dst_path, parent_id, copy_instead_link)
+
+
+def initialize_if_required(job: Job) -> bool:
+    """check if this job has been already linked to and link it otherwise"""
+    if job.sp().get("parent_id"):
         if job.doc["state"].get("is_initialized"):
             return True
-        global GLOBAL_INIT_COUNT
-        GLOBAL_UNINIT_COUNT = os.environ.get("GLOBAL_UNINIT_COUNT")
-
-        GLOBAL_INIT_COUNT += 1
-        base_path = Path(job.path).parent / parent_id / "case"
-        dst_path = Path(job.path) / "case"
-        # logger.info(f"linking {base_path} to {dst_path}")
-        # shell scripts might change files as side effect hence we copy all files
-        # instead of linking to avoid side effects in future it might make sense to
-        # specify the files which are modified in the yaml file
-        copy_instead_link = job.sp().get("operation") == "shell"
-        _link_path(base_path, dst_path, parent_id, copy_instead_link)
+        initialize_case(job)
         job.doc["state"]["is_initialized"] = True
-        if GLOBAL_UNINIT_COUNT:
-            logger.info(
-                "Done initialization of case"
-                f" {job.id} [{GLOBAL_INIT_COUNT}/{int(GLOBAL_UNINIT_COUNT)}]\r"
-            )
         return True
     else:
         return False
 
 
+def initialize_cases(
+    jobs: Iterable[Job], operations: Iterable[str], max_workers: Optional[int] = None
+) -> int:
+    """Initialize all cases of the given jobs that are ready to be initialized
+
+    A case is ready to be initialized if its operation is requested, it is not
+    locked and its parent job is ready. Cases are linked concurrently by a
+    thread pool since linking is dominated by file system calls.
+
+    Parameters:
+    jobs -- the candidate jobs
+    operations -- names of the requested operations
+    max_workers -- number of threads, defaults to the ThreadPoolExecutor default
+
+    Returns: the number of initialized cases
+    """
+    operations = set(operations)
+    pending = [
+        job
+        for job in jobs
+        if ELIGIBILITY.statepoint(job).get("operation") in operations
+        and needs_initialization(job)
+        and not is_locked(job)
+        and ELIGIBILITY.parent_state(job) == "ready"
+    ]
+    if not pending:
+        return 0
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(initialize_case, job): job for job in pending}
+        for future in tqdm(
+            as_completed(futures), total=len(futures), desc="Initializing cases"
+        ):
+            future.result()
+            futures[future].doc["state"]["is_initialized"] = True
+    logger.info(f"Initialized {len(pending)} cases")
+    return len(pending)
+
+
 def get_args(job: Job, args: Union[dict, str]) -> Union[dict, str]:
     """operation can get args either via function call or it statepoint
     if no args are passed via function the args from the statepoint are taken
@@ -322,23 +405,96 @@ def end_job_state(_, job: Job) -> Literal[True]:
     return True
 
 
+# open job document transactions by job id and the job document at the
+# beginning of the transaction, see begin_transaction
+TRANSACTIONS: dict[str, tuple[AbstractContextManager, dict]] = {}
+
+
+def begin_transaction(job: Job) -> None:
+    """Buffer all modifications of the job document in memory until
+    commit_transaction is called, thus a hook writes the job document once
+    instead of once per modification.
+
+    NOTE transactions should be short, if the job document is written by
+    another process meanwhile, the buffered modifications are applied to the
+    reloaded job document on commit
+    """
+    # a transaction might not have been committed if a pre hook failed
+    commit_transaction(job)
+    before = job.doc()
+    transaction = job.doc.buffered()
+    transaction.__enter__()
+    TRANSACTIONS[job.id] = (transaction, before)
+
+
+def commit_transaction(job: Job) -> None:
+    """Write the buffered modifications of the job document"""
+    if job.id not in TRANSACTIONS:
+        return
+    transaction, before = TRANSACTIONS.pop(job.id)
+    after = job.doc()
+    try:
+        transaction.__exit__(None, None, None)
+    except MetadataError:
+        # the job document was written by another process, eg. obr status,
+        # and the buffer is discarded
+        logger.debug(f"Job document of {job.id} was modified, reapplying changes")
+        job.doc = _reapply(job.doc(), before, after)
+
+
+def _reapply(current: dict, before: dict, after: dict) -> dict:
+    """Returns current with all modifications from before to after applied"""
+    ret = dict(current)
+    for key, value in after.items():
+        if key in before and before[key] == value:
+            continue
+        if (
+            isinstance(value, dict)
+            and isinstance(before.get(key), dict)
+            and isinstance(current.get(key), dict)
+        ):
+            ret[key] = _reapply(current[key], before[key], value)
+        else:
+            ret[key] = value
+    for key in before.keys() - after.keys():
+        ret.pop(key, None)
+    return ret
+
+
 def dispatch_pre_hooks(operation_name: str, job: Job):
-    """just forwards to start_job_state and execute_pre_build"""
+    """Forwards to start_job_state and execute_pre_build
+
+    The job state is written before the job document transaction begins,
+    since other processes rely on it to skip started jobs.
+    """
     start_job_state(operation_name, job)
-    execute_pre_build(operation_name, job)
+    begin_transaction(job)
+    try:
+        execute_pre_build(operation_name, job)
+    finally:
+        commit_transaction(job)
 
 
 def dispatch_post_hooks(operation_name: str, job: Job):
-    """Forwards to `execute_post_build`, performs md5sum calculation of case files and finishes with `end_job_state`"""
-    execute_post_build(operation_name, job)
-    case = OpenFOAMCase(str(job.path) + "/case", job)
-    case.perform_post_md5sum_calculations()
-    end_job_state(operation_name, job)
+    """Forwards to `execute_post_build`, performs md5sum calculation of case files and finishes with `end_job_state`
+
+    The modifications of the job document by the post hooks are written in a
+    single transaction
+    """
+    begin_transaction(job)
+    try:
+        execute_post_build(operation_name, job)
+        case = OpenFOAMCase(str(job.path) + "/case", job)
+        case.perform_post_md5sum_calculations()
+        end_job_state(operation_name, job)
+    finally:
+        commit_transaction(job)
 
 
 def set_failure(operation_name: str, error, job: Job):
-    """just forwards to start_job_state and execute_pre_build"""
+    """Sets the global state to failure and commits the job document transaction"""
     job.doc["state"]["global"] = "failure"
+    commit_transaction(job)
 
 
 def copy_on_uses(args: dict, job: Job, path: str, target: str):
@@ -347,18 +503,17 @@ def copy_on_uses(args: dict, job: Job, path: str, target: str):
         return
     if uses := args.pop("uses", False):
         if path:
-            check_output([
-                "cp",
+            fsops.copy_file(
                 "{}/case/{}/{}".format(job.path, path, uses),
                 "{}/case/{}/{}".format(job.path, path, target),
-            ])
+            )
         else:
             src_path = "{}/case/{}".format(job.path, uses)
             trg_path = "{}/case/{}".format(job.path, target)
             # It should be alright if the source path does not exists
             # as long as the target path exists
             if not Path(trg_path).exists() and Path(src_path).exists():
-                check_output(["cp", "-r", src_path, trg_path])
+                fsops.copy(src_path, trg_path)
 
 
 @generate
@@ -508,6 +663,58 @@ def setKeyValuePair(job: Job, args={}):
     OpenFOAMCase(str(job.path) + "/case", job).setKeyValuePair(args)
 
 
+def run_shell_operation(job: Job) -> bool:
+    """Run the shell operation of a job including its hooks, like flow does
+
+    Returns: whether the operation succeeded
+    """
+    try:
+        dispatch_pre_hooks("shell", job)
+        shell(job)
+        dispatch_post_hooks("shell", job)
+    except Exception as e:
+        logger.error(f"shell operation of job {job.id} failed: {e}")
+        logger.debug(traceback.format_exc())
+        set_failure("shell", e, job)
+        return False
+    return True
+
+
+def execute_shell_operations(
+    jobs: Iterable[Job], max_workers: Optional[int] = None
+) -> list[Job]:
+    """Run the shell operations of all eligible jobs concurrently
+
+    The steps of a job are executed in order by a single worker, while the
+    steps of different jobs run concurrently. Since the workers mostly wait for
+    subprocesses a thread pool is used.
+
+    Parameters:
+    jobs -- the candidate jobs
+    max_workers -- number of concurrently processed jobs, see obr run --tasks
+
+    Returns: the jobs whose shell operation was executed, including failed
+    ones, these must not be passed to project.run again
+    """
+    pending = [
+        job
+        for job in ELIGIBILITY.eligible_jobs(jobs, ["shell"])["shell"]
+        if not operation_complete(job, "shell")
+    ]
+    if not pending:
+        return []
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(run_shell_operation, job) for job in pending]
+        for future in tqdm(
+            as_completed(futures), total=len(futures), desc="Executing shell steps"
+        ):
+            failed += not future.result()
+    logger.info(f"Executed {len(pending)} shell operations, {failed} failed")
+    return pending
+
+
 def has_mesh(job: Job) -> bool:
     """Check whether all mesh files are files (owning) or symlinks (non-owning)
 
@@ -620,7 +827,7 @@ def get_number_of_procs(job: Job) -> int:
     """Deduces the number of processors
     For performance reasons the cache is used to store the number of subdomains
     """
-    np = statepoint_get(job.sp(), "numberOfSubdomains")
+    np = statepoint_get(resolved_statepoint(job), "numberOfSubdomains")
     if np:
         return int(np)
     np = job.doc["cache"].get("numberOfSubdomains", False)
@@ -663,8 +870,6 @@ def run_cmd_builder(job: Job, cmd_format: str, args: dict) -> str:
     solver = case.controlDict.get("application")
     timestamp = datetime.now().strftime("%Y-%m-%d_%H:%M:%S")
 
-    res = job.doc["history"]
-
     cli_args = {
         "solver": solver,
         "path": job.path,
@@ -672,7 +877,7 @@ def run_cmd_builder(job: Job, cmd_format: str, args: dict) -> str:
         "np": get_number_of_procs(job),
     }
     cmd_str = cmd_format.format(**cli_args)
-    res.append({
+    history(job).append({
         "cmd": cmd_str,
         "type": "shell",
         "log": f"{solver}_{timestamp}.log",
@@ -681,7 +886,6 @@ def run_cmd_builder(job: Job, cmd_format: str, args: dict) -> str:
         "user": os.environ.get("USER"),
         "hostname": os.environ.get("HOST"),
     })
-    job.doc["history"] = res
 
     cli_args = {
         "solver": solver,
@@ -710,6 +914,30 @@ def validate_state_impl(_: str, job: Job) -> None:
     case.detailed_update()
 
 
+def validate_states(jobs: Iterable[Job], max_workers: Optional[int] = None) -> int:
+    """Perform a detailed update of the state of many jobs
+
+    The latest solver logs of all jobs are classified concurrently, see
+    obr.OpenFOAM.failure.classify_failures
+
+    Returns: the number of updated jobs
+    """
+    cases = []
+    for job in jobs:
+        case_path = Path(job.path) / "case"
+        if job.sp.get("has_child") or not (case_path / "system/controlDict").exists():
+            continue
+        case = OpenFOAMCase(case_path, job)
+        if case.latest_solver_log_path:
+            cases.append(case)
+    failures = classify_failures(
+        [case.latest_log_path_ for case in cases], max_workers=max_workers
+    )
+    for case in cases:
+        case.detailed_update(failures)
+    return len(cases)
+
+
 @OpenFOAMProject.pre(parent_job_is_ready)
 @OpenFOAMProject.pre(final)
 @OpenFOAMProject.pre(is_job)
@@ -727,7 +955,22 @@ def resetCase(job: Job, args={}) -> None:
 def validateState(job: Job, args={}) -> None:
     """Dummy operation which forwards to validate_state_impl. The reason for keeping this function
     is that it can be called from the cli to force a detailed update"""
-    validate_state_impl(job)
+    validate_state_impl("validateState", job)
+
+
+@OpenFOAMProject.pre(parent_job_is_ready)
+@OpenFOAMProject.pre(final)
+@OpenFOAMProject.pre(is_job)
+@OpenFOAMProject.operation
+def extractTimeSeries(job: Job, args={}) -> None:
+    """Store the time series of all solver logs of the case next to the logs,
+    see obr.OpenFOAM.time_series. Logs that did not change are skipped."""
+    case_path = Path(job.path) / "case"
+    if not case_path.exists():
+        return
+    for fn in os.listdir(case_path):
+        if is_solver_log(fn):
+            extract_time_series(case_path / fn)
 
 
 @simulate
@@ -774,7 +1017,7 @@ def archive(job: Job, args={}) -> Literal[True]:
             continue
         if (Path(root) / fn).is_symlink():
             continue
-        check_output(["cp", "-r", f"{job.path}/case/{fn}", f"obr_store/{job.id}_{fn}"])
+        fsops.copy(f"{job.path}/case/{fn}", f"obr_store/{job.id}_{fn}")
     return True
 
 
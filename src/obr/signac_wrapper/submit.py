@@ -6,7 +6,7 @@ from signac.job import Job
 from typing import Union
 from tqdm import tqdm
 
-from .operations import OpenFOAMProject, basic_eligible
+from .operations import OpenFOAMProject, EligibilityEvaluator
 from .labels import final
 from ..core.logger_setup import logger
 
@@ -75,16 +75,19 @@ def submit_impl(
             time.sleep(15)
     else:
         eligible_jobs = []
+        basic_operations = [op for op in operations if op != "runParallelSolver"]
+        if basic_operations:
+            logger.info(f"Collecting eligible jobs for operations: {basic_operations}.")
+            eligible_per_operation = EligibilityEvaluator().eligible_jobs(
+                tqdm(jobs), basic_operations
+            )
         for operation in operations:
             if operation == "runParallelSolver":
                 for job in tqdm(jobs):
                     if final(job):
                         eligible_jobs.append(job)
             else:
-                logger.info(f"Collecting eligible jobs for operation: {operation}.")
-                for job in tqdm(jobs):
-                    if basic_eligible(job, operation):
-                        eligible_jobs.append(job)
+                eligible_jobs.extend(eligible_per_operation[operation])
 
         logger.info(
             f"Submitting operations {operations}. In total {len(eligible_jobs)} of"
@@ -0,0 +1,77 @@
+import logging
+
+from signac.job import Job
+from typing import Optional, TYPE_CHECKING
+
+from ..core.core import timed
+from ..core.queries import build_filter_query, jobs_to_table, QueryMatcher
+
+if TYPE_CHECKING:
+    from .operations import OpenFOAMProject
+
+logger = logging.getLogger("OBR")
+
+
+class WorkspaceSnapshot:
+    """A snapshot of all jobs of a workspace, taken once per cli invocation
+
+    Listing the workspace is cheap, statepoints, documents and labels are read
+    on first access and cached for the remaining invocation. Commands should
+    use the snapshot instead of iterating the project again.
+    """
+
+    def __init__(self, project: "OpenFOAMProject"):
+        self.project = project
+        self.timings: dict[str, float] = {}
+        with timed("workspace scan", self.timings):
+            self.jobs: list[Job] = [job for job in project]
+        self.job_map: dict[str, Job] = {job.id: job for job in self.jobs}
+        self._statepoints: dict[str, dict] = {}
+        self._documents: dict[str, dict] = {}
+        self._labels: dict[str, list[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.jobs)
+
+    def select(
+        self, filters: Optional[list[str]] = None, job_id: Optional[str] = None
+    ) -> list[Job]:
+        """Select jobs either by a list of filters or by a job id"""
+        if job_id:
+            job = self.job_map.get(job_id)
+            return [job] if job else []
+        if not filters:
+            return list(self.jobs)
+        with timed("filter", self.timings):
+            matcher = QueryMatcher(build_filter_query(filters))
+            # the snapshot holds all jobs, thus removed jobs can be pruned
+            table = jobs_to_table(self.jobs, matcher.keys, prune=True)
+            sel_jobs = {res.id for res in matcher.evaluate(table)}
+        return [job for job in self.jobs if job.id in sel_jobs]
+
+    def statepoint(self, job: Job) -> dict:
+        """Returns a cached copy of the statepoint of job"""
+        if job.id not in self._statepoints:
+            self._statepoints[job.id] = job.sp()
+        return self._statepoints[job.id]
+
+    def document(self, job: Job) -> dict:
+        """Returns a cached copy of the job document of job
+
+        NOTE modifications of the job document during the invocation are not
+        reflected by the copy
+        """
+        if job.id not in self._documents:
+            self._documents[job.id] = job.doc()
+        return self._documents[job.id]
+
+    def labels(self, job: Job) -> list[str]:
+        """Returns the cached labels of job"""
+        if job.id not in self._labels:
+            with timed("labels", self.timings):
+                self._labels[job.id] = list(self.project.labels(job))
+        return self._labels[job.id]
+
+    def log_timings(self) -> None:
+        timings = ", ".join(f"{k} {v:.3f}s" for k, v in self.timings.items())
+        logger.debug(f"Workspace snapshot of {len(self)} jobs: {timings}")
@@ -0,0 +1,93 @@
+import os
+
+from obr.OpenFOAM.BlockMesh import (
+    BlockMeshDict,
+    calculate_simple_partition,
+    divisors,
+    mesh_shape,
+    prime_factors,
+    read_blocks,
+    set_cells,
+)
+
+BLOCK_MESH_DICT = """
+FoamFile
+{
+    format      ascii;
+    class       dictionary;
+    object      blockMeshDict;
+}
+// blocks ( hex (0 1 2 3 4 5 6 7) (1 1 1) simpleGrading (1 1 1) );
+convertToMeters 0.1;
+
+blocks
+(
+    hex (0 1 2 3 4 5 6 7) (200 100 1) simpleGrading (1 1 1)
+    /* hex (0 1 2 3 4 5 6 7) (2 2 2) simpleGrading (1 1 1) */
+    hex (8 9 10 11 12 13 14 15) inlet (20 50 1) simpleGrading (1 (0.5 0.5 1) 1)
+);
+
+edges
+(
+);
+"""
+
+
+def test_prime_factors():
+    assert prime_factors(1) == []
+    assert prime_factors(2) == [2]
+    assert prime_factors(360) == [2, 2, 2, 3, 3, 5]
+    assert prime_factors(2**31 - 1) == [2**31 - 1]
+    assert divisors(12) == [1, 2, 3, 4, 6, 12]
+
+
+def test_calculate_simple_partition():
+    assert calculate_simple_partition(1) == [1, 1, 1]
+    assert calculate_simple_partition(4) == [2, 2, 1]
+    assert calculate_simple_partition(8) == [2, 2, 2]
+    assert calculate_simple_partition(7) == [7, 1, 1]
+    assert calculate_simple_partition(4096) == [16, 16, 16]
+
+    # 2D meshes are not split normal to the plane
+    assert calculate_simple_partition(8, (100, 100, 1)) == [4, 2, 1]
+    # elongated meshes are split along their longest direction
+    assert calculate_simple_partition(8, (1000, 10, 10)) == [8, 1, 1]
+    assert calculate_simple_partition(64, (400, 100, 100)) == [16, 2, 2]
+
+
+def test_read_blocks(tmpdir):
+    fn = tmpdir / "blockMeshDict"
+    fn.write_text(BLOCK_MESH_DICT, encoding="utf-8")
+    blocks = read_blocks(fn)
+    assert blocks == [(200, 100, 1), (20, 50, 1)]
+    assert mesh_shape(blocks) == (200, 100, 1)
+    assert mesh_shape([]) is None
+
+
+def test_BlockMeshDict(tmpdir):
+    fn = tmpdir / "blockMeshDict"
+    fn.write_text(BLOCK_MESH_DICT, encoding="utf-8")
+    os.chmod(fn, 0o640)
+    editor = BlockMeshDict(fn)
+    assert editor.n_cells == 200 * 100 + 20 * 50
+
+    # commented blocks are not modified
+    assert editor.set_cells("(1 1 1)", "(2 2 2)") == 0
+    assert editor.set_cells("(200 100 1)", "(400 200 1)") == 1
+    assert editor.set_cells("(20  50 1)", "(40 100 1)") == 1
+    # nothing is written before write is called
+    assert read_blocks(fn) == [(200, 100, 1), (20, 50, 1)]
+    editor.write()
+    assert read_blocks(fn) == [(400, 200, 1), (40, 100, 1)]
+    assert BlockMeshDict(fn).n_cells == 400 * 200 + 40 * 100
+    assert "// blocks ( hex (0 1 2 3 4 5 6 7) (1 1 1)" in fn.read_text("utf-8")
+    assert os.stat(fn).st_mode & 0o777 == 0o640
+
+    # arbitrary text is replaced literally
+    set_cells(fn, "convertToMeters 0.1", "convertToMeters 1")
+    assert "convertToMeters 1;" in fn.read_text("utf-8")
+
+    # cell counts given by macros are unknown
+    fn.write_text(BLOCK_MESH_DICT.replace("(20 50 1)", "($nx $ny 1)"), encoding="utf-8")
+    assert BlockMeshDict(fn).blocks == [(200, 100, 1)]
+    assert BlockMeshDict(fn).n_cells is None
@@ -103,6 +103,19 @@ def test_OpenFOAMCaseFvSchemesGetter(set_up_of_case):
     assert of_case.fvSchemes.get("divSchemes")["div(phi,U)"] == "Gauss linear"
 
 
+def test_OpenFOAMCaseIsLazy(set_up_of_case):
+    of_case = OpenFOAMCase(set_up_of_case, {})
+    # files are discovered on first access only
+    assert of_case.file_dict == {}
+    assert of_case.get("system/controlDict") is not None
+    assert "system/fvSolution" in of_case.file_dict
+
+    # parsed files are shared between cases of the same process
+    other_case = OpenFOAMCase(set_up_of_case, {})
+    assert other_case.controlDict is of_case.controlDict
+    assert other_case.fvSolution is of_case.get("system/fvSolution")
+
+
 def test_OpenFOAMCaseSetter(set_up_of_case):
     of_case = OpenFOAMCase(set_up_of_case, {})
     # check file setter
@@ -1,13 +1,16 @@
 import obr
 import os
 import pytest
+import signac
 
 from obr.core.core import (
     get_mesh_stats,
     TemporaryFolder,
     link_folder_to_copy,
     DelinkFolder,
+    logged_execute,
 )
+from obr.core.history import history
 from pathlib import Path
 from subprocess import check_output
 
@@ -152,3 +155,25 @@ def test_DelinkFolder(tmpdir):
 
     # outside the create_unlink_dir the bck folder should not exist anymore
     assert not (tmpdir / "test.bck").exists()
+
+
+def test_logged_execute_spools_large_output(tmpdir):
+    project = signac.init_project(path=str(tmpdir))
+    job = project.open_job({"solver": "PCG"})
+    job.init()
+    script = "for i in $(seq 1 100000); do echo line $i; done"
+    log_path = logged_execute(["sh", "-c", script], Path(job.path), job)
+    assert log_path.read_text().splitlines()[-1] == "line 100000"
+    entry = history(job).last()
+    assert entry["log"] == log_path.name
+    assert entry["head"].startswith("line 1\n")
+    assert entry["tail"].endswith("line 100000\n")
+    assert len(entry["tail"]) == 1000
+    assert entry["duration"] > 0
+    # no temporary spool files are left
+    assert [p.name for p in Path(job.path).glob(".obr_*")] == []
+
+    assert logged_execute(["sh", "-c", "exit 1"], Path(job.path), job) is None
+    assert history(job).last()["state"] == "failure"
+    logged_execute(["not_a_command"], Path(job.path), job)
+    assert history(job).last()["log"] == "not_a_command not found"
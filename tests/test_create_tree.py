@@ -2,13 +2,19 @@ import pytest
 import os
 import shutil
 
+from copy import deepcopy
 from pathlib import Path
 
 from obr.create_tree import (
     create_tree,
     add_variations,
+    base_statepoint,
     extract_from_operation,
     expand_generator_block,
+    materialize_jobs,
+    plan_tree,
+    read_view_links,
+    sync_view,
 )
 from obr.signac_wrapper.operations import OpenFOAMProject
 
@@ -95,6 +101,168 @@ def test_add_variations():
     assert operations == ["n/a"]
 
 
+def test_materialize_jobs(tmpdir):
+    project = OpenFOAMProject.init_project(path=tmpdir)
+    base = project.open_job({"parent_id": None, "has_child": True, "keys": []})
+    base.init()
+
+    test_variation = [{
+        "operation": "decomposePar",
+        "key": "numberOfSubdomains",
+        "values": [2, 4],
+        "variation": [{
+            "operation": "fvSolution",
+            "schema": "{solver}",
+            "values": [
+                {"solver": "PCG"},
+                {"solver": "GKOCG", "if": [{"numberOfSubdomains": 4}]},
+            ],
+        }],
+    }]
+    planned = []
+    add_variations([], project, test_variation, base, {base.id: "base/"}, planned)
+
+    # jobs are planned in memory only
+    assert len(planned) == 5
+    assert len(project) == 1
+
+    assert materialize_jobs(planned, batch_size=2) == 5
+    assert len(project) == 6
+    for job in planned:
+        assert job.doc["state"] == {"global": ""}
+
+
+def test_plan_tree(tmpdir):
+    case = Path(tmpdir) / "case"
+    (case / "system").mkdir(parents=True)
+    (case / "system" / "controlDict").write_text("endTime 0.5;\n")
+    config = {
+        "case": {"type": "CaseOnDisk", "origin": str(case), "solver": "icoFoam"},
+        "variation": [{
+            "operation": "decomposePar",
+            "key": "numberOfSubdomains",
+            "values": [2, 4],
+            "variation": [
+                {"operation": "controlDict", "key": "endTime", "values": [1, 2]},
+                {
+                    "operation": "shell",
+                    "key": "run.sh",
+                    "values": [{"run.sh": 1, "if": [{"numberOfSubdomains": 4}]}],
+                },
+            ],
+        }],
+    }
+    plan = plan_tree(config)
+
+    assert plan.n_jobs == 8
+    assert plan.jobs_per_level == [1, 2, 5]
+    assert plan.copied_jobs == 1
+    assert plan.linked_jobs == 6
+    assert plan.processor_folders == 6
+    assert plan.case_files == 1
+    # controlDict variations set endTime, the shell job uses the endTime of
+    # the base case
+    assert plan.core_time == 2 * 3 + 4 * 3 + 4 * 0.5
+    # nothing is written
+    assert sorted(os.listdir(tmpdir)) == ["case"]
+
+
+def test_create_tree_incremental(tmpdir):
+    project = OpenFOAMProject.init_project(path=tmpdir)
+    config = {
+        "case": {"type": "CaseOnDisk", "origin": str(tmpdir), "solver": "icoFoam"},
+        "variation": [{
+            "operation": "fvSolution",
+            "schema": "{solver}",
+            "values": [{"solver": "PCG"}, {"solver": "PBiCGStab"}],
+        }],
+    }
+    arguments = {"folder": str(tmpdir)}
+    create_tree(project, deepcopy(config), arguments, skip_foam_src_check=True)
+    assert len(project) == 3
+    job = next(j for j in project if j.sp.get("solver") == "PCG")
+    job.doc["state"]["global"] = "ready"
+
+    # existing jobs are kept as they are
+    config["variation"][0]["values"][1] = {"solver": "GKOCG"}
+    create_tree(project, deepcopy(config), arguments, skip_foam_src_check=True)
+    assert len(project) == 4
+    assert job.doc["state"]["global"] == "ready"
+    assert sorted(os.listdir(tmpdir / "view" / "base")) == ["GKOCG", "PCG"]
+
+    # jobs of other configurations in the same workspace are not pruned
+    other = deepcopy(config)
+    other["case"]["solver"] = "pisoFoam"
+    create_tree(project, deepcopy(other), arguments, skip_foam_src_check=True)
+    assert len(project) == 7
+    create_tree(
+        project,
+        deepcopy(config),
+        {**arguments, "prune": True},
+        skip_foam_src_check=True,
+    )
+    assert len(project) == 6
+
+    # jobs which have been run are only pruned if forced
+    config["variation"][0]["values"] = [{"solver": "GKOCG"}]
+    create_tree(
+        project,
+        deepcopy(config),
+        {**arguments, "prune": True},
+        skip_foam_src_check=True,
+    )
+    assert len(project) == 6
+    create_tree(
+        project,
+        deepcopy(config),
+        {**arguments, "prune": True, "force": True},
+        skip_foam_src_check=True,
+    )
+    assert len(project) == 5
+    assert job not in project
+
+
+def test_create_tree_legacy_workspace(tmpdir):
+    project = OpenFOAMProject.init_project(path=tmpdir)
+    config = {
+        "case": {"type": "CaseOnDisk", "origin": str(tmpdir), "solver": "icoFoam"},
+        "variation": [{
+            "operation": "fvSolution",
+            "schema": "{solver}",
+            "values": [{"solver": "PCG"}],
+        }],
+    }
+    # the base case of workspaces created before parent_id was introduced
+    legacy_base = project.open_job({**base_statepoint(config), "parent": {}})
+    legacy_base.init()
+
+    with pytest.raises(SystemExit):
+        create_tree(
+            project, deepcopy(config), {"folder": str(tmpdir)}, skip_foam_src_check=True
+        )
+    assert len(project) == 1
+
+
+def test_sync_view(tmpdir):
+    view = Path(tmpdir) / "view"
+    links = {"a/1": "../../job1", "a/2": "../../job2", "b/1": "../../job3"}
+    assert sync_view(view, links) == (3, 0)
+    assert read_view_links(view) == links
+    inode = os.lstat(view / "a" / "1").st_ino
+
+    # only changed links are touched
+    links = {"a/1": "../../job1", "a/2": "../../job4"}
+    assert sync_view(view, links) == (1, 1)
+    assert read_view_links(view) == links
+    assert os.lstat(view / "a" / "1").st_ino == inode
+    # empty folders are removed
+    assert not (view / "b").exists()
+
+    # a folder is replaced by a link
+    assert sync_view(view, {"a": "../job5"}) == (1, 2)
+    assert read_view_links(view) == {"a": "../job5"}
+
+
 def test_create_tree(tmpdir, emit_test_config):
     project = OpenFOAMProject.init_project(path=tmpdir)
 
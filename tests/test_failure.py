@@ -0,0 +1,68 @@
+from pathlib import Path
+
+from obr.OpenFOAM.failure import classify_failure, classify_failures
+
+LOGS = Path(__file__).parent / "logs"
+
+
+def test_classify_failure():
+    assert classify_failure(LOGS / "icoFoamSuccess.log") is None
+    assert classify_failure(LOGS / "icoFoamIncomplete.log") is None
+
+    failure = classify_failure(LOGS / "icoFoamFailure.log")
+    assert failure.type == "FOAM ERROR"
+    lines = (LOGS / "icoFoamFailure.log").read_text().splitlines()
+    assert "FOAM FATAL IO ERROR" in lines[failure.line - 1]
+    assert failure.excerpt.startswith("--> FOAM FATAL IO ERROR")
+    assert "Wrong token type" in failure.excerpt
+
+    failure = classify_failure(LOGS / "icoFoamStartupFailure.log")
+    assert failure.type == "MPI startup error"
+    assert failure.to_dict()["line"] == 2
+
+
+def test_classify_failure_tail_window(tmpdir):
+    log = Path(tmpdir) / "icoFoam.log"
+    log.write_bytes(b"")
+    assert classify_failure(log) is None
+
+    # errors before the last completed time step are ignored
+    log.write_text(
+        "Time = 1\nsome error\nExecutionTime = 0.1 s  ClockTime = 0 s\n"
+        "Time = 2\ntime step continuity errors : sum local = 1e-09\n"
+    )
+    assert classify_failure(log) is None
+
+    with open(log, "a") as fh:
+        fh.write("\n" * 10**5 + "Floating point exception\n")
+    failure = classify_failure(log, window=1024)
+    assert failure.type == "floating point exception"
+    assert failure.line == 10**5 + 6
+
+
+def test_classify_failure_banner(tmpdir):
+    """The banner of a solver which is still starting up is not a failure"""
+    banner = (LOGS / "icoFoamSuccess.log").read_text().split("Starting time loop")[0]
+    log = Path(tmpdir) / "icoFoam.log"
+    log.write_text(
+        banner + "sigFpe : Enabling floating point exception trapping (FOAM_SIGFPE).\n"
+    )
+    assert classify_failure(log) is None
+
+    with open(log, "a") as fh:
+        fh.write(
+            "Starting time loop\n\nTime = 0.005\n\n"
+            "#0  Foam::error::printStack(Foam::Ostream&) at ??:?\n"
+            "#1  Foam::sigFpe::sigHandler(int) at ??:?\n"
+            "Floating point exception (core dumped)\n"
+        )
+    failure = classify_failure(log)
+    assert failure.type == "floating point exception"
+    assert "sigFpe::sigHandler" in failure.excerpt
+
+
+def test_classify_failures():
+    logs = [LOGS / f for f in ["icoFoamSuccess.log", "icoFoamFailure.log"]]
+    failures = classify_failures(logs)
+    assert failures[logs[0]] is None
+    assert failures[logs[1]].type == "FOAM ERROR"
@@ -0,0 +1,64 @@
+import os
+
+from pathlib import Path
+
+from obr.core import fsops
+
+
+def test_copy_file(tmpdir):
+    tmpdir = Path(tmpdir)
+    src = tmpdir / "src"
+    src.write_text("foo")
+    os.chmod(src, 0o750)
+
+    dst = fsops.copy_file(src, tmpdir / "dst")
+    assert dst.read_text() == "foo"
+    assert os.stat(dst).st_mode & 0o777 == 0o750
+
+    # copying into a folder keeps the file name
+    (tmpdir / "fold").mkdir()
+    assert fsops.copy_file(src, tmpdir / "fold") == tmpdir / "fold/src"
+
+    # symlinks at the destination are replaced, not written through
+    other = tmpdir / "other"
+    other.write_text("bar")
+    link = tmpdir / "link"
+    link.symlink_to(other)
+    fsops.copy_file(src, link)
+    assert not link.is_symlink()
+    assert other.read_text() == "bar"
+
+
+def test_copy_tree(tmpdir):
+    tmpdir = Path(tmpdir)
+    src = tmpdir / "case"
+    for i in range(2 * fsops.BATCH_THRESHOLD):
+        (src / f"processor{i}/0").mkdir(parents=True)
+        (src / f"processor{i}/0/U").write_text(str(i))
+    (src / "processor0/constant").symlink_to("../constant")
+
+    dst = fsops.copy_tree(src, tmpdir / "copy")
+    assert (dst / "processor0/constant").is_symlink()
+    for i in range(2 * fsops.BATCH_THRESHOLD):
+        assert (dst / f"processor{i}/0/U").read_text() == str(i)
+
+    # cp -r semantics, copy into existing folder
+    assert fsops.copy(src, dst) == dst / "case"
+
+
+def test_materialize_and_remove(tmpdir):
+    tmpdir = Path(tmpdir)
+    src = tmpdir / "src"
+    src.write_text("foo")
+    link = tmpdir / "link"
+    link.symlink_to(src)
+
+    assert fsops.materialize(link)
+    assert not link.is_symlink()
+    assert link.read_text() == "foo"
+    assert not fsops.materialize(link)
+
+    fsops.remove(link)
+    fsops.remove(link, missing_ok=True)
+    assert not link.exists()
+    assert src.exists()
@@ -0,0 +1,49 @@
+import os
+import hashlib
+
+from pathlib import Path
+
+from obr.core import hashing
+from obr.core.hashing import Md5Cache, compute_md5sum
+
+
+def test_compute_md5sum(tmpdir):
+    fn = Path(tmpdir) / "file"
+    content = os.urandom(3 * hashing.CHUNK_SIZE + 17)
+    fn.write_bytes(content)
+    assert compute_md5sum(fn) == hashlib.md5(content).hexdigest()
+
+
+def test_md5_cache_skips_unchanged_files(tmpdir, monkeypatch):
+    tmpdir = Path(tmpdir)
+    files = []
+    for i in range(4):
+        fn = tmpdir / f"file{i}"
+        fn.write_text(str(i))
+        files.append(fn)
+    link = tmpdir / "link"
+    link.symlink_to(files[0])
+
+    calls = []
+
+    def counting_md5sum(path):
+        calls.append(path)
+        return compute_md5sum(path)
+
+    monkeypatch.setattr(hashing, "compute_md5sum", counting_md5sum)
+    cache = Md5Cache()
+    md5sums = cache.md5sums(files + [link])
+    assert md5sums[link] == md5sums[files[0]]
+    assert len(calls) == 4
+
+    # unchanged files and links to hashed files are not read again
+    assert cache.md5sums(files + [link]) == md5sums
+    assert len(calls) == 4
+
+    files[1].write_text("modified")
+    assert cache.md5sum(files[1]) == hashlib.md5(b"modified").hexdigest()
+    assert len(calls) == 5
+
+    cache.invalidate(files[2])
+    cache.md5sum(files[2])
+    assert len(calls) == 6
@@ -0,0 +1,54 @@
+import os
+
+from pathlib import Path
+
+from obr.OpenFOAM import header
+from obr.OpenFOAM.header import has_openfoam_header
+
+OF_HEADER = r"""/*--------------------------------*- C++ -*----------------------------------*\
+| =========                 |                                                 |
+| \\      /  F ield         | OpenFOAM: The Open Source CFD Toolbox           |
+|  \\    /   O peration     | Version:  v2212                                 |
+|   \\  /    A nd           | Website:  www.openfoam.com                      |
+|    \\/     M anipulation  |                                                 |
+\*---------------------------------------------------------------------------*/
+FoamFile
+{
+    version     2.0;
+    format      ascii;
+    class       dictionary;
+    object      controlDict;
+}
+"""
+
+
+def test_has_openfoam_header(tmpdir):
+    tmpdir = Path(tmpdir)
+    dictionary = tmpdir / "controlDict"
+    dictionary.write_text(OF_HEADER + "application simpleFoam;\n" * 100000)
+    assert has_openfoam_header(dictionary)
+
+    plain = tmpdir / "data.csv"
+    plain.write_text("0, 1\n" * 100)
+    assert not has_openfoam_header(plain)
+
+    binary = tmpdir / "mesh.bin"
+    binary.write_bytes(OF_HEADER.encode() + b"\0" + os.urandom(1024))
+    assert not has_openfoam_header(binary)
+
+    compressed = tmpdir / "points.gz"
+    compressed.write_text(OF_HEADER)
+    assert not has_openfoam_header(compressed)
+
+
+def test_has_openfoam_header_cache(tmpdir):
+    dictionary = Path(tmpdir) / "fvSolution"
+    dictionary.write_text("no header")
+    header._has_openfoam_header.cache_clear()
+    assert not has_openfoam_header(dictionary)
+    assert not has_openfoam_header(dictionary)
+    assert header._has_openfoam_header.cache_info().hits == 1
+
+    # a modified file is checked again
+    dictionary.write_text(OF_HEADER)
+    assert has_openfoam_header(dictionary)
@@ -0,0 +1,74 @@
+import hashlib
+import json
+import signac
+
+from pathlib import Path
+
+from obr.core.core import logged_execute, logged_func, merge_job_documents
+from obr.core.history import JOURNAL, History, archived_document, history
+
+
+def test_history(tmpdir):
+    project = signac.init_project(path=str(tmpdir))
+    job = project.open_job({"solver": "PCG"})
+    job.init()
+    # entries of the job document are kept
+    job.doc["history"] = [{"cmd": "blockMesh"}]
+    job_history = history(job)
+    assert job_history.last() == {"cmd": "blockMesh"}
+    assert list(job_history) == [{"cmd": "blockMesh"}]
+
+    job_history.append({"cmd": "decomposePar"})
+    assert len(job_history) == 2
+    assert history(job).last() == {"cmd": "decomposePar"}
+    assert [e["cmd"] for e in history(job)[::-1]] == ["decomposePar", "blockMesh"]
+    # the job document is not rewritten
+    assert job.doc["history"] == [{"cmd": "blockMesh"}]
+
+    logged_execute(["echo", "hello"], job.path, job)
+    logged_func(lambda **kwargs: None, job, value=1)
+    entries = list(history(job))
+    assert entries[2]["cmd"] == "echo"
+    assert entries[2]["state"] == "success"
+    assert entries[2]["log"] == "hello\n"
+    assert entries[3]["type"] == "logged_func"
+    assert len((tmpdir / "workspace" / job.id / JOURNAL).readlines()) == 3
+
+
+def test_history_last_reads_tail(tmpdir):
+    job_history = History(tmpdir)
+    assert job_history.last() is None
+    for i in range(1000):
+        job_history.append({"cmd": "x" * 10 * i, "i": i})
+    assert History(tmpdir).last()["i"] == 999
+    assert len(History(tmpdir)) == 1000
+
+
+def test_archived_document(tmpdir):
+    project = signac.init_project(path=str(tmpdir / "project"))
+    job = project.open_job({"solver": "PCG"})
+    job.init()
+    job.doc["data"] = [{"timestep": 0}]
+    job.doc["history"] = [{"cmd": "blockMesh"}]
+    history(job).append({"cmd": "decomposePar"})
+
+    # archive the job document twice, as `obr archive` does on every call
+    archive = signac.init_project(path=str(tmpdir / "archive"))
+    archived = archive.open_job({"solver": "PCG"})
+    archived.init()
+    for cmd in ["PCG", "reconstructPar"]:
+        document = json.dumps(archived_document(job)).encode()
+        md5sum = hashlib.md5(document).hexdigest()
+        (Path(archived.path) / f"signac_job_document_{md5sum}.json").write_bytes(
+            document
+        )
+        history(job).append({"cmd": cmd})
+
+    # the journal is part of the archived document and entries of
+    # previous archives are not duplicated
+    merge_job_documents(archived)
+    assert [e["cmd"] for e in history(archived)] == [
+        "blockMesh",
+        "decomposePar",
+        "PCG",
+    ]
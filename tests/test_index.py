@@ -0,0 +1,85 @@
+import os
+import signac
+import pytest
+
+from obr.core.history import history
+from obr.core.index import JobIndex, indexed_table
+from obr.core.queries import flatten_jobs, query_impl, build_filter_query
+from obr.core.query_engine import FlatTable
+
+
+@pytest.fixture
+def project(tmpdir):
+    project = signac.init_project(path=str(tmpdir))
+    for i, solver in enumerate(["PCG", "PBiCGStab", "GKOCG"]):
+        job = project.open_job({"solver": solver, "parent": {"maxIter": 1000 * i}})
+        job.init()
+        job.doc["state"] = {"global": "completed" if i else "failure"}
+        job.doc["history"] = [{"cmd": "blockMesh"}, {"cmd": "decomposePar"}]
+    return project
+
+
+def columns(table: FlatTable) -> dict:
+    return {
+        key: sorted(
+            zip(
+                [table.job_ids[i] for i in col.job_idx],
+                col.top_idx,
+                col.order,
+                col.paths,
+                [str(v) for v in col.values],
+            )
+        )
+        for key, col in table.columns.items()
+    }
+
+
+def test_index_matches_job_documents(project):
+    jobs = list(project)
+    with JobIndex(project.path) as index:
+        assert index.update(jobs) == 3
+        table = index.table([j.id for j in jobs])
+
+    assert table.job_ids == [j.id for j in jobs]
+    assert columns(table) == columns(FlatTable.from_flat_jobs(flatten_jobs(jobs)))
+
+
+def test_index_is_incremental(project):
+    jobs = list(project)
+    with JobIndex(project.path) as index:
+        assert index.update(jobs) == 3
+        # nothing changed, hence nothing needs to be read again
+        assert index.update(jobs) == 0
+
+        jobs[0].doc["state"] = {"global": "completed", "latestTime": 1}
+        assert index.update(jobs) == 1
+        table = index.table([j.id for j in jobs], keys=["latestTime"])
+        assert table.columns["latestTime"].values == [1]
+
+        # appending to the history journal re-indexes the job
+        history(jobs[2]).append({"cmd": "icoFoam"})
+        assert index.update(jobs) == 1
+        table = index.table([j.id for j in jobs], keys=["cmd"])
+        assert sorted(table.columns["cmd"].values) == [
+            "decomposePar",
+            "decomposePar",
+            "icoFoam",
+        ]
+
+        # removed jobs are only pruned if requested
+        jobs[1].remove()
+        assert index.update(jobs[::2]) == 0
+        assert index.update(jobs[::2], prune=True) == 0
+        table = index.table([j.id for j in jobs])
+        assert sorted(table.columns["solver"].job_idx) == [0, 2]
+
+
+def test_query_uses_index(project, monkeypatch):
+    queries = build_filter_query(["global==completed"])
+    res = query_impl(project, queries)
+    assert len(res) == 2
+    assert os.path.exists(project.fn(".obr/index/jobs.sqlite"))
+
+    monkeypatch.setenv("OBR_DISABLE_INDEX", "1")
+    assert indexed_table(list(project)) is None
+    assert query_impl(project, queries) == res
@@ -0,0 +1,86 @@
+import os
+
+from pathlib import Path
+from types import SimpleNamespace
+
+from obr.core import log_catalog
+from obr.core.core import find_solver_logs
+from obr.core.log_catalog import LogCatalog, catalog, scan_solver_logs
+
+
+def make_job(root: Path, job_id: str):
+    path = root / "workspace" / job_id
+    for campaign, tags in [("c1", ["a", "b"]), ("c1", ["a", "c"]), ("c2", [])]:
+        case = path.joinpath(campaign, *tags)
+        case.mkdir(parents=True, exist_ok=True)
+        (case / "icoFoam_2024.log").write_text("Time = 0\n")
+        (case / "blockMesh_2024.log").write_text("")
+    return SimpleNamespace(
+        id=job_id, path=str(path), project=SimpleNamespace(path=str(root))
+    )
+
+
+def test_scan_solver_logs(tmpdir, monkeypatch):
+    root = Path(tmpdir)
+    jobs = [make_job(root, "job1"), make_job(root, "job2")]
+    entries = scan_solver_logs(jobs)
+    assert len(entries) == 6
+    assert {(e.job_id, e.campaign, e.tags) for e in entries if e.job_id == "job1"} == {
+        ("job1", "c1", ("a", "b")),
+        ("job1", "c1", ("a", "c")),
+        ("job1", "c2", ()),
+    }
+    assert all(e.size == 9 for e in entries)
+    assert sorted(find_solver_logs(jobs[0])) == sorted(
+        (e.path, e.campaign, list(e.tags)) for e in entries if e.job_id == "job1"
+    )
+    assert (root / ".obr/index/logs.json").exists()
+
+    # unchanged folders are not listed again
+    monkeypatch.setattr(log_catalog, "RACY_NS", -(10**12))
+    catalog = LogCatalog(root)
+    catalog.scan(jobs)
+    assert catalog.listed == 0
+
+    # new logs are found and appended logs are updated
+    case = Path(jobs[0].path) / "c2"
+    (case / "simpleFoam_2024.log").write_text("")
+    os.utime(case, ns=(10**18, 10**18))
+    with open(case / "icoFoam_2024.log", "a") as fh:
+        fh.write("Time = 1\n")
+    entries = {e.path: e for e in catalog.scan(jobs)}
+    assert catalog.listed == 1
+    assert len(entries) == 7
+    assert entries[str(case / "icoFoam_2024.log")].size == 18
+
+
+def test_catalog_is_shared(tmpdir, monkeypatch):
+    root = Path(tmpdir)
+    jobs = [make_job(root, "job1"), make_job(root, "job2")]
+    monkeypatch.setattr(log_catalog, "RACY_NS", -(10**12))
+    scan_solver_logs(jobs)
+    manifest = root / ".obr/index/logs.json"
+    os.utime(manifest, ns=(0, 0))
+
+    # the catalog of the project is reused and the unchanged manifest is
+    # not written again
+    assert catalog(root) is catalog(str(root / "workspace" / ".."))
+    list(find_solver_logs(jobs[0]))
+    scan_solver_logs(jobs)
+    assert catalog(root).listed == 0
+    assert manifest.stat().st_mtime_ns == 0
+
+    # without save the manifest is written once after all batches
+    with open(Path(jobs[1].path) / "c2" / "icoFoam_2024.log", "a") as fh:
+        fh.write("Time = 1\n")
+    for job in jobs:
+        scan_solver_logs([job], save=False)
+    assert manifest.stat().st_mtime_ns == 0
+    catalog(root).save()
+    assert manifest.stat().st_mtime_ns != 0
+    assert LogCatalog(root).logs == catalog(root).logs
+
+    # a manifest read from disk is not changed by scanning the same logs
+    fresh = LogCatalog(root)
+    fresh.scan(jobs, save=False)
+    assert not fresh.changed
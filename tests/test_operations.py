@@ -1,8 +1,28 @@
-from obr.signac_wrapper.operations import _link_path
+import time
+import shutil
+import signac
+import threading
+
+import obr.signac_wrapper.operations as operations
+
+from obr.core.history import history
+from obr.signac_wrapper.operations import (
+    _link_path,
+    EligibilityEvaluator,
+    initialize_cases,
+    begin_transaction,
+    commit_transaction,
+    set_failure,
+    execute_shell_operations,
+    validate_states,
+)
+from obr.OpenFOAM.case import OpenFOAMCase
 
 from subprocess import check_output
 from pathlib import Path
 
+LOGS = Path(__file__).parent / "logs"
+
 
 def test_link_path(tmpdir):
     check_output(["mkdir", "src"], cwd=tmpdir)
@@ -23,3 +43,199 @@ def test_link_path(tmpdir):
 
     dst_fold = dst / "fold1"
     assert dst_fold.exists() == True
+
+
+def test_eligibility_evaluator_memoizes_parent_state(tmpdir):
+    project = signac.init_project(path=str(tmpdir))
+    parent = project.open_job({"operation": "blockMesh"})
+    parent.init()
+    parent.doc["state"] = {"global": ""}
+    children = []
+    for solver in ["PCG", "PBiCGStab"]:
+        child = project.open_job(
+            {"operation": "fvSolution", "solver": solver, "parent_id": parent.id}
+        )
+        child.init()
+        child.doc["state"] = {}
+        children.append(child)
+
+    evaluator = EligibilityEvaluator()
+    assert evaluator.parent_state(children[0]) == ""
+    assert evaluator.eligible_jobs(children, ["fvSolution"]) == {"fvSolution": []}
+    assert list(evaluator.parent_states) == [parent.id]
+
+    # a changed parent document is picked up
+    parent.doc["state"] = {"global": "ready"}
+    assert evaluator.parent_state(children[1]) == "ready"
+    assert evaluator.eligible_jobs(children, ["blockMesh"]) == {"blockMesh": []}
+
+
+def test_initialize_cases(tmpdir):
+    project = signac.init_project(path=str(tmpdir))
+    parent = project.open_job({"operation": "blockMesh"})
+    parent.init()
+    parent.doc["state"] = {"global": "ready"}
+    (Path(parent.path) / "case/system").mkdir(parents=True)
+    (Path(parent.path) / "case/system/controlDict").touch()
+    children = []
+    for i in range(4):
+        child = project.open_job(
+            {"operation": "fvSolution", "i": i, "parent_id": parent.id}
+        )
+        child.init()
+        child.doc["state"] = {}
+        children.append(child)
+
+    assert initialize_cases(children, ["blockMesh"]) == 0
+    assert initialize_cases(children, ["fvSolution"], max_workers=2) == 4
+    assert initialize_cases(children, ["fvSolution"]) == 0
+    for child in children:
+        assert child.doc["state"]["is_initialized"]
+        assert (Path(child.path) / "case/system/controlDict").is_symlink()
+
+
+def test_job_document_transaction(tmpdir):
+    project = signac.init_project(path=str(tmpdir))
+    job = project.open_job({"solver": "PCG"})
+    job.init()
+    job.doc["state"] = {"global": "started"}
+
+    begin_transaction(job)
+    job.doc["state"]["global"] = "tmp_lock"
+    job.doc["cache"] = {"md5sum": {"file": ["abc"]}}
+    # nothing is written until the transaction is committed
+    assert project.open_job(id=job.id).doc["state"]["global"] == "started"
+    commit_transaction(job)
+    assert project.open_job(id=job.id).doc["cache"]["md5sum"]["file"] == ["abc"]
+
+    # failures commit the transaction as well
+    begin_transaction(job)
+    set_failure("blockMesh", None, job)
+    assert project.open_job(id=job.id).doc["state"]["global"] == "failure"
+    # committing twice is a no op
+    commit_transaction(job)
+
+
+def test_job_document_transaction_external_write(tmpdir):
+    project = signac.init_project(path=str(tmpdir))
+    job = project.open_job({"solver": "PCG"})
+    job.init()
+    job.doc["state"] = {"global": "started"}
+    job.doc["cache"] = {"md5sum": {}}
+
+    begin_transaction(job)
+    job.doc["state"]["global"] = "ready"
+    job.doc["cache"]["md5sum"] = {"file": ["abc"]}
+    # another process, eg. obr status, writes the job document
+    other = signac.get_project(path=str(tmpdir)).open_job(id=job.id)
+    other.doc["cache"]["nCells"] = 400
+    other.doc["obr"] = {"view": "view/PCG"}
+    commit_transaction(job)
+
+    # modifications of both are kept
+    doc = signac.get_project(path=str(tmpdir)).open_job(id=job.id).doc
+    assert doc["state"]["global"] == "ready"
+    assert doc["cache"]() == {"md5sum": {"file": ["abc"]}, "nCells": 400}
+    assert doc["obr"]["view"] == "view/PCG"
+
+
+def shell_jobs(tmpdir, n_jobs: int) -> list:
+    """Returns initialized shell jobs of a ready parent case"""
+    project = signac.init_project(path=str(tmpdir))
+    parent = project.open_job({"operation": "blockMesh"})
+    parent.init()
+    parent.doc["state"] = {"global": "ready"}
+    (Path(parent.path) / "case/system").mkdir(parents=True)
+    (Path(parent.path) / "case/system/controlDict").touch()
+    jobs = []
+    for i in range(n_jobs):
+        job = project.open_job({
+            "operation": "shell",
+            "keys": ["touch"],
+            "touch": f"file{i}",
+            "parent_id": parent.id,
+        })
+        job.init()
+        job.doc["state"] = {}
+        job.doc["cache"] = {}
+        jobs.append(job)
+    initialize_cases(jobs, ["shell"])
+    return jobs
+
+
+def test_execute_shell_operations(tmpdir):
+    jobs = shell_jobs(tmpdir, 4)
+    assert execute_shell_operations(jobs, max_workers=2) == jobs
+    for i, job in enumerate(jobs):
+        assert job.doc["state"]["global"] == "ready"
+        assert (Path(job.path) / f"case/file{i}").exists()
+        assert history(job).last()["cmd"] == "touch"
+
+    # completed operations are not executed again
+    assert execute_shell_operations(jobs) == []
+
+
+def test_execute_shell_operations_failure(tmpdir, monkeypatch):
+    jobs = shell_jobs(tmpdir, 3)
+    shell = operations.shell
+
+    def failing_shell(job, args={}):
+        if job.sp["touch"] == "file1":
+            raise RuntimeError("shell failed")
+        shell(job, args)
+
+    monkeypatch.setattr(operations, "shell", failing_shell)
+    # failed jobs are returned as well, hence obr run does not pass them to
+    # flow which would execute them again
+    assert execute_shell_operations(jobs) == jobs
+    states = [job.doc["state"]["global"] for job in jobs]
+    assert states == ["ready", "failure", "ready"]
+    assert not (Path(jobs[1].path) / "case/file1").exists()
+
+
+def test_execute_shell_operations_max_workers(tmpdir, monkeypatch):
+    jobs = shell_jobs(tmpdir, 6)
+    lock = threading.Lock()
+    running = [0]
+    peak = [0]
+
+    def counting_shell(job, args={}):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+
+    monkeypatch.setattr(operations, "shell", counting_shell)
+    assert len(execute_shell_operations(jobs, max_workers=2)) == 6
+    assert peak[0] == 2
+
+
+def test_validate_states(tmpdir, monkeypatch):
+    monkeypatch.setattr(OpenFOAMCase, "solver", property(lambda self: "icoFoam"))
+    project = signac.init_project(path=str(tmpdir))
+    logs = {
+        "PCG": "icoFoamSuccess.log",
+        "PBiCGStab": "icoFoamFailure.log",
+        "GKOCG": "icoFoamStartupFailure.log",
+    }
+    for solver, log in logs.items():
+        job = project.open_job({"solver": solver, "has_child": False})
+        job.init()
+        job.doc["state"] = {}
+        job.doc["cache"] = {}
+        system = Path(job.path) / "case" / "system"
+        system.mkdir(parents=True)
+        (system / "controlDict").write_text("")
+        shutil.copy(LOGS / log, Path(job.path) / "case" / "icoFoam_2024.log")
+
+    # the logs of all jobs are classified at once
+    assert validate_states(project) == 3
+    states = {job.sp["solver"]: job.doc["state"]() for job in project}
+    assert states["PCG"]["global"] == "completed"
+    assert states["PBiCGStab"]["global"] == "failure"
+    # failureState is a string usable in filters
+    assert states["PBiCGStab"]["failureState"] == "FOAM ERROR"
+    assert states["PBiCGStab"]["failureDetails"]["line"] > 0
+    assert states["GKOCG"]["failureState"] == "MPI startup error"
@@ -0,0 +1,48 @@
+from pathlib import Path
+
+from obr.core.parse_cache import ParseCache
+
+
+def test_parse_cache_shares_linked_files(tmpdir):
+    tmpdir = Path(tmpdir)
+    parent = tmpdir / "controlDict"
+    parent.write_text("application icoFoam;")
+    child = tmpdir / "child"
+    child.symlink_to(parent)
+
+    calls = []
+
+    def parse(path):
+        calls.append(path)
+        return Path(path).read_text()
+
+    cache = ParseCache()
+    assert cache.get(parent, parse) == "application icoFoam;"
+    assert cache.get(child, parse) == "application icoFoam;"
+    assert len(calls) == 1
+    assert cache.hits == 1
+
+    # modified files are parsed again
+    parent.write_text("application simpleFoam;")
+    assert cache.get(child, parse) == "application simpleFoam;"
+    assert len(calls) == 2
+
+    cache.invalidate(child)
+    cache.get(parent, parse)
+    assert len(calls) == 3
+
+
+def test_parse_cache_is_bounded(tmpdir):
+    tmpdir = Path(tmpdir)
+    cache = ParseCache(max_entries=3, max_bytes=250)
+    for i in range(5):
+        fn = tmpdir / f"file{i}"
+        fn.write_text("x" * 100)
+        cache.get(fn, lambda path: path)
+    # the byte budget allows two files only
+    assert len(cache) == 2
+    assert cache.size == 200
+
+    cache.invalidate()
+    assert len(cache) == 0
+    assert cache.size == 0
@@ -0,0 +1,91 @@
+from obr.core.queries import (
+    query_flat_jobs,
+    query_flat_jobs_legacy,
+    build_filter_query,
+    Query,
+)
+from obr.core.query_engine import FlatTable, QueryMatcher
+import pytest
+
+
+@pytest.fixture
+def mock_job_dict():
+    return {
+        "a": {
+            "solver": "pisoFoam",
+            "state": {"global": "completed", "latestTime": 0.5},
+            "parent": {"maxIter": 3000, "preconditioner": "IC"},
+        },
+        "b": {
+            "solver": "icoFoam",
+            "state": {"global": "failure", "latestTime": 0.1},
+            "history": [{"cmd": "blockMesh"}, {"cmd": "decomposePar"}],
+        },
+        "c": {
+            "solver": "pisoFoam",
+            "preconditioner": "none",
+            "obr": {"preconditioner": "DIC", "maxIter": 1000},
+        },
+    }
+
+
+def test_flat_table(mock_job_dict):
+    table = FlatTable.from_flat_jobs(mock_job_dict)
+
+    assert table.job_ids == ["a", "b", "c"]
+    assert table.columns["solver"].values == ["pisoFoam", "icoFoam", "pisoFoam"]
+    assert table.columns["latestTime"].paths == [("state",), ("state",)]
+    # only the latest history entry is stored
+    assert table.columns["cmd"].values == ["decomposePar"]
+
+    table = FlatTable.from_flat_jobs(mock_job_dict, keys=["solver"])
+    assert list(table.columns.keys()) == ["solver"]
+
+
+def test_query_matcher_numeric_values(mock_job_dict):
+    matcher = QueryMatcher(build_filter_query(["maxIter>=2000"]))
+    res = matcher(mock_job_dict)
+
+    assert [r.id for r in res] == ["a"]
+    # numbers are compared and returned as floats
+    assert res[0].result == [{"maxIter": 3000.0}]
+    assert res[0].sub_keys == [["parent"]]
+
+
+def test_query_matcher_multiple_hits(mock_job_dict):
+    res = QueryMatcher([Query(key="preconditioner")])(mock_job_dict)
+
+    # job c has a top level hit and a hit under obr, later hits take precedence
+    assert [(r.id, r.result) for r in res] == [
+        ("a", [{"preconditioner": "IC"}]),
+        ("b", [{}]),
+        ("c", [{"preconditioner": "DIC"}]),
+    ]
+    assert res[2].sub_keys == [[], ["obr"]]
+
+    # in strict mode the number of hits needs to match the number of queries
+    res = QueryMatcher([Query(key="preconditioner")])(mock_job_dict, strict=True)
+    assert [r.id for r in res] == ["a"]
+
+
+@pytest.mark.parametrize(
+    "filters",
+    [
+        ["solver==pisoFoam"],
+        ["solver!=pisoFoam", "global"],
+        ["latestTime>0.2"],
+        ["latestTime<=0.5", "preconditioner"],
+        ["maxIter<3000"],
+        ["cmd==decomposePar"],
+        ["state"],
+        ["global==completed", "solver==icoFoam"],
+    ],
+)
+@pytest.mark.parametrize("latest_only", [True, False])
+@pytest.mark.parametrize("strict", [True, False])
+def test_query_matcher_matches_legacy(mock_job_dict, filters, latest_only, strict):
+    queries = build_filter_query(filters)
+    legacy = query_flat_jobs_legacy(mock_job_dict, queries, False, latest_only, strict)
+    compiled = query_flat_jobs(mock_job_dict, queries, False, latest_only, strict)
+
+    assert [(r.id, r.result) for r in compiled] == [(r.id, r.result) for r in legacy]
@@ -0,0 +1,78 @@
+import shutil
+
+from pathlib import Path
+
+from obr.OpenFOAM.solver_log import follow_log, LogState
+
+LOGS = Path(__file__).parent / "logs"
+
+
+def test_follow_log():
+    state = follow_log(LOGS / "icoFoamSuccess.log")
+    assert state.latestTime == 0.5
+    assert state.completed
+    assert state.CourantNumber["CourantNumber_max"] == 0.852134
+    assert state.continuityErrors["timeStepContErrors_sumLocal"] == 9.66354e-09
+    assert state.ExecutionTime == 0.05
+
+    state = follow_log(LOGS / "icoFoamIncomplete.log")
+    assert state.latestTime == 0.49
+    assert not state.completed
+
+    state = follow_log(LOGS / "icoFoamFailure.log")
+    assert state.latestTime == 9
+    assert not state.completed
+    assert "FOAM FATAL IO ERROR" in state.footer
+    assert follow_log(LOGS / "icoFoamStartupFailure.log").latestTime is None
+
+
+def test_follow_log_parses_appended_bytes(tmpdir):
+    content = (LOGS / "icoFoamSuccess.log").read_bytes()
+    log = Path(tmpdir) / "icoFoam.log"
+    # write the log up to a partial line
+    log.write_bytes(content[: len(content) // 2])
+    state = follow_log(log)
+    assert not state.completed
+    first_offset = state.offset
+    assert content[first_offset - 1 : first_offset] == b"\n"
+
+    with open(log, "ab") as fh:
+        fh.write(content[len(content) // 2 :])
+    state = follow_log(log, LogState.from_dict(state.to_dict()))
+    assert state.offset == len(content)
+    assert state.completed
+    assert state.latestTime == 0.5
+
+    # unchanged logs are not read again
+    assert follow_log(log, state) is state
+
+    # logs overwritten in place are parsed from the start
+    shutil.copyfile(LOGS / "icoFoamFailure.log", log)
+    state = follow_log(log, state)
+    assert state.latestTime == 9
+    shutil.copyfile(LOGS / "icoFoamIncomplete.log", log)
+    state = follow_log(log, state)
+    assert "ERROR" not in state.footer
+    assert state.latestTime == 0.49
+
+
+def test_follow_log_restores_footer(tmpdir):
+    for name in ["icoFoamSuccess.log", "icoFoamFailure.log", "icoFoamIncomplete.log"]:
+        state = follow_log(LOGS / name)
+        # only the offset of the footer is stored in the job document
+        stored = state.to_dict()
+        assert "footer" not in stored
+        restored = follow_log(LOGS / name, LogState.from_dict(stored))
+        assert restored.footer == state.footer
+        assert restored.completed == state.completed
+
+    # the footer of a partially written log is completed by appended bytes
+    content = (LOGS / "icoFoamFailure.log").read_bytes()
+    log = Path(tmpdir) / "icoFoam.log"
+    log.write_bytes(content[: len(content) - 200])
+    state = LogState.from_dict(follow_log(log).to_dict())
+    with open(log, "ab") as fh:
+        fh.write(content[len(content) - 200 :])
+    assert (
+        follow_log(log, state).footer == follow_log(LOGS / "icoFoamFailure.log").footer
+    )
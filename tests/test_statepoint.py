@@ -0,0 +1,65 @@
+import signac
+import pytest
+
+from obr.core.queries import flatten_jobs, statepoint_get, statepoint_query
+from obr.core.statepoint import StatepointResolver, resolved_statepoint
+
+
+@pytest.fixture
+def leaf(tmpdir):
+    """Returns the leaf of a chain of variations"""
+    project = signac.init_project(path=str(tmpdir))
+    base = project.open_job({"parent_id": None, "solver": "icoFoam", "keys": []})
+    base.init()
+    parent = base
+    for operation, key, value in [
+        ("decomposePar", "numberOfSubdomains", 4),
+        ("fvSolution", "preconditioner", "IC"),
+        ("fvSolution", "solver", "pisoFoam"),
+    ]:
+        job = project.open_job(
+            {"parent_id": parent.id, "operation": operation, key: value}
+        )
+        job.init()
+        parent = job
+    return parent
+
+
+def test_resolve(leaf):
+    resolved = resolved_statepoint(leaf)
+    assert resolved["numberOfSubdomains"] == 4
+    assert resolved["preconditioner"] == "IC"
+    # own values override values of ancestors
+    assert resolved["solver"] == "pisoFoam"
+    assert resolved["operation"] == "fvSolution"
+    assert resolved["parent_id"] == leaf.sp["parent_id"]
+
+    # the resolved statepoints of all ancestors are cached
+    resolver = StatepointResolver(leaf.project.workspace)
+    resolver.resolve(leaf.id)
+    assert len(resolver.resolved) == 4
+    assert resolver.resolved[leaf.id] == resolved
+
+    assert statepoint_get(resolved, "numberOfSubdomains") == 4
+    assert statepoint_get(resolved, "nCells") is False
+    assert statepoint_query(resolved, "preconditioner", "IC")
+    assert not statepoint_query(resolved, "preconditioner", "DIC")
+
+    # queries see inherited values
+    docs = flatten_jobs([leaf])
+    assert docs[leaf.id]["numberOfSubdomains"] == 4
+
+
+def test_resolve_embedded_parent(tmpdir):
+    """Statepoints of older workspaces embed the parent statepoint"""
+    project = signac.init_project(path=str(tmpdir))
+    job = project.open_job({
+        "parent_id": "0" * 32,
+        "solver": "pisoFoam",
+        "parent": {"solver": "icoFoam", "parent": {"numberOfSubdomains": 2}},
+    })
+    job.init()
+    resolved = resolved_statepoint(job)
+    assert "parent" not in resolved
+    assert resolved["solver"] == "pisoFoam"
+    assert resolved["numberOfSubdomains"] == 2
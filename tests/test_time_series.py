@@ -0,0 +1,70 @@
+import os
+import shutil
+
+import pandas as pd
+
+from pathlib import Path
+from types import SimpleNamespace
+
+from obr.core.queries import join_time_series
+from obr.OpenFOAM.time_series import (
+    extract_time_series,
+    find_time_series,
+    load_time_series,
+    parse_time_series,
+)
+
+LOGS = Path(__file__).parent / "logs"
+
+
+def test_parse_time_series():
+    series = parse_time_series(LOGS / "icoFoamSuccess.log")
+    assert len(series["Time"]) == 100
+    assert series["Time"][-1] == 0.5
+    assert series["CourantNumber_max"][-1] == 0.852134
+    assert series["Ux_initialResidual"][0] == 1
+    assert series["Ux_iterations"][0] == 19
+    # p is solved twice per time step
+    assert series["p_iterations"][0] == 47
+    assert series["p_finalResidual"][0] == 2.65225e-07
+
+    # the incomplete last time step of a failed run is dropped
+    series = parse_time_series(LOGS / "icoFoamFailure.log")
+    assert series["Time"][-1] == 8.5
+    assert series["Ux_finalResidual"][-1] == 1.10297e16
+
+    assert parse_time_series(LOGS / "icoFoamStartupFailure.log") == {}
+
+
+def test_extract_time_series(tmpdir):
+    case = Path(tmpdir)
+    log = case / "icoFoam_2024-01-01_00:00:00.log"
+    shutil.copyfile(LOGS / "icoFoamIncomplete.log", log)
+    archive = extract_time_series(log)
+    assert archive == case / "icoFoam_2024-01-01_00:00:00.npz"
+    assert find_time_series(case) == [archive]
+    assert load_time_series(log)["Time"].iloc[-1] == 0.485
+
+    # unchanged logs are not parsed again
+    mtime = archive.stat().st_mtime_ns
+    assert extract_time_series(log).stat().st_mtime_ns == mtime
+
+    shutil.copyfile(LOGS / "icoFoamSuccess.log", log)
+    os.utime(log, ns=(mtime + 10**9, mtime + 10**9))
+    assert load_time_series(extract_time_series(log))["Time"].iloc[-1] == 0.5
+
+
+def test_join_time_series(tmpdir):
+    jobs = []
+    for job_id in ["a", "b"]:
+        case = Path(tmpdir) / job_id / "case"
+        case.mkdir(parents=True)
+        jobs.append(SimpleNamespace(id=job_id, path=str(case.parent)))
+    shutil.copyfile(LOGS / "icoFoamSuccess.log", case / "icoFoam_2024.log")
+    extract_time_series(case / "icoFoam_2024.log")
+
+    records = pd.DataFrame({"jobid": ["a", "b"], "solver": ["GKO", "PETSC"]})
+    df = join_time_series(jobs, records)
+    assert len(df) == 101
+    assert df[df["jobid"] == "a"]["Time"].isna().all()
+    assert (df[df["jobid"] == "b"]["solver"] == "PETSC").all()
@@ -0,0 +1,55 @@
+import flow
+import pytest
+
+from obr.signac_wrapper.workspace import WorkspaceSnapshot
+
+
+class LabeledProject(flow.FlowProject):
+    pass
+
+
+@LabeledProject.label
+def completed(job):
+    return job.doc["state"].get("global") == "completed"
+
+
+@pytest.fixture
+def project(tmpdir):
+    project = LabeledProject.init_project(path=str(tmpdir))
+    for i, solver in enumerate(["PCG", "PBiCGStab", "GKOCG"]):
+        job = project.open_job({"solver": solver, "operation": "fvSolution"})
+        job.init()
+        job.doc["state"] = {"global": "completed" if i else "failure"}
+    return project
+
+
+def test_snapshot_select(project):
+    snapshot = WorkspaceSnapshot(project)
+    assert len(snapshot) == 3
+    assert "workspace scan" in snapshot.timings
+
+    assert snapshot.select() == snapshot.jobs
+    assert len(snapshot.select(["global==completed"])) == 2
+    assert [j.sp.solver for j in snapshot.select(("solver==PCG",))] == ["PCG"]
+    assert "filter" in snapshot.timings
+
+    job_id = snapshot.jobs[0].id
+    assert snapshot.select(job_id=job_id) == [snapshot.jobs[0]]
+    assert snapshot.select(job_id="unknown") == []
+
+
+def test_snapshot_caches(project):
+    snapshot = WorkspaceSnapshot(project)
+    job = snapshot.select(["solver==PCG"])[0]
+
+    assert snapshot.statepoint(job)["solver"] == "PCG"
+    # labels registered on FlowProject by other modules apply as well, thus
+    # only check the label defined here
+    assert "completed" not in snapshot.labels(job)
+    assert snapshot.document(job)["state"]["global"] == "failure"
+
+    # the snapshot is not updated by later modifications
+    job.doc["state"] = {"global": "completed"}
+    assert "completed" not in snapshot.labels(job)
+    assert snapshot.document(job)["state"]["global"] == "failure"
+    assert "completed" in WorkspaceSnapshot(project).labels(job)